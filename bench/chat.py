@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+from bench.common import environment, free_port, percentiles, synthetic_questions
+from bench.fake_ollama import FakeOllama
+from bench.ingestion import ensure_index
+
+READY_TIMEOUT_SECONDS = 120.0
+REQUEST_TIMEOUT_SECONDS = 120.0
+
+CHAT_ENV = {
+    "ANSWER_CACHE_ENABLED": "false",
+    "EMBED_CACHE_ENABLED": "false",
+    "CONTEXT_MIN_RELEVANCE": "0",
+    "INDEX_WATCH_INTERVAL_SECONDS": "0",
+}
+
+
+class _AppServer:
+    def __init__(self, port: int) -> None:
+        import uvicorn
+
+        from src.app.main import create_app
+
+        self.base_url = f"http://127.0.0.1:{port}"
+        config = uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="bench-app", daemon=True)
+
+    def start(self) -> "_AppServer":
+        self._thread.start()
+        deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{self.base_url}/ready", timeout=2.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"The backend did not become ready within {READY_TIMEOUT_SECONDS:.0f}s.")
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+async def _invoke(client: httpx.AsyncClient, question: str) -> Dict[str, object]:
+    started = time.perf_counter()
+    response = await client.post("/chat/invoke", json={"input": question})
+    elapsed = (time.perf_counter() - started) * 1000
+    response.raise_for_status()
+    return {"latency_ms": elapsed, "ttft_ms": None}
+
+
+async def _stream(client: httpx.AsyncClient, question: str) -> Dict[str, object]:
+    started = time.perf_counter()
+    first: Optional[float] = None
+    event = ""
+    async with client.stream("POST", "/chat/stream", json={"input": question}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:") and event == "data" and first is None:
+                first = time.perf_counter()
+            elif line.startswith("data:") and event == "error":
+                raise RuntimeError(f"Stream error: {line[len('data:'):].strip()}")
+    finished = time.perf_counter()
+    return {
+        "latency_ms": (finished - started) * 1000,
+        "ttft_ms": (first - started) * 1000 if first is not None else None,
+    }
+
+
+async def _load(base_url: str, endpoint: str, questions: List[str], concurrency: int) -> Dict[str, object]:
+    call = _stream if endpoint == "stream" else _invoke
+    pending: Iterator[str] = iter(questions)
+    samples: List[Dict[str, object]] = []
+    errors: List[str] = []
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for question in pending:
+            try:
+                samples.append(await call(client, question))
+            except Exception as exc:  # noqa: BLE001 - counted and reported in the results
+                errors.append(str(exc))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=REQUEST_TIMEOUT_SECONDS, limits=limits
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        seconds = time.perf_counter() - started
+
+    result: Dict[str, object] = {
+        "requests": len(questions),
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(samples) / seconds, 2) if seconds else 0.0,
+        "latency": percentiles([s["latency_ms"] for s in samples]),
+    }
+    if endpoint == "stream":
+        result["ttft"] = percentiles([s["ttft_ms"] for s in samples if s["ttft_ms"] is not None])
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def run_chat(
+    server: FakeOllama,
+    work_dir: Path,
+    corpus_size: int,
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Dict[str, object]]:
+    storage_dir = ensure_index(server, work_dir, corpus_size)
+    questions = synthetic_questions(requests * 2, corpus_size)
+    env = dict(CHAT_ENV, OLLAMA_BASE_URL=server.base_url, VECTORSTORE_DIR=str(storage_dir))
+    results: Dict[str, Dict[str, object]] = {}
+    with environment(**env):
+        app = _AppServer(free_port()).start()
+        try:
+            for offset, endpoint in enumerate(("invoke", "stream")):
+                batch = questions[offset * requests:(offset + 1) * requests]
+                result = asyncio.run(_load(app.base_url, endpoint, batch, concurrency))
+                result["docs"] = corpus_size
+                ttft = result.get("ttft", {}).get("p50_ms")
+                print(
+                    f"[chat] /chat/{endpoint} x{requests} @ {concurrency}: "
+                    f"p50 {result['latency']['p50_ms']}ms p95 {result['latency']['p95_ms']}ms "
+                    f"p99 {result['latency']['p99_ms']}ms"
+                    + (f", ttft p50 {ttft}ms" if ttft is not None else "")
+                    + f", {result['requests_per_second']} req/s, {result['errors']} errors"
+                )
+                results[endpoint] = result
+        finally:
+            app.stop()
+    return results
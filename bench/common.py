@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import random
+import socket
+import statistics
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence
+
+from langchain_core.documents import Document
+
+CORPUS_SEED = 7
+VOCABULARY_SIZE = 5000
+WORDS_PER_DOC = 400
+TOPIC_WORDS = 12
+TOPIC_EVERY = 3
+QUESTION_WORDS = 6
+
+
+def percentiles(samples_ms: Sequence[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def pick(fraction: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+        return round(ordered[index], 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "min_ms": round(ordered[0], 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def _vocabulary() -> List[str]:
+    return [f"term{i}" for i in range(VOCABULARY_SIZE)]
+
+
+def _topic(vocabulary: List[str], doc: int, seed: int) -> List[str]:
+    return random.Random(seed * 1_000_003 + doc).sample(vocabulary, TOPIC_WORDS)
+
+
+def synthetic_documents(count: int, seed: int = CORPUS_SEED) -> Iterator[Document]:
+    rng = random.Random(seed)
+    vocabulary = _vocabulary()
+    for i in range(count):
+        topic = _topic(vocabulary, i, seed)
+        words = rng.choices(vocabulary, k=WORDS_PER_DOC)
+        for n, position in enumerate(range(0, len(words), TOPIC_EVERY)):
+            words[position] = topic[n % TOPIC_WORDS]
+        sentences = [" ".join(words[j:j + 20]) + "." for j in range(0, len(words), 20)]
+        yield Document(
+            page_content=f"Document {i}. " + " ".join(sentences),
+            metadata={"source": f"https://bench.local/doc/{i}", "title": f"Document {i}"},
+        )
+
+
+def synthetic_questions(count: int, corpus_size: int, seed: int = CORPUS_SEED) -> List[str]:
+    rng = random.Random(seed + 1)
+    vocabulary = _vocabulary()
+    questions = []
+    for i in range(count):
+        doc = rng.randrange(corpus_size)
+        words = rng.sample(_topic(vocabulary, doc, seed), QUESTION_WORDS)
+        questions.append(f"{' '.join(words)}? q{i}")
+    return questions
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def environment(**values: str) -> Iterator[None]:
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
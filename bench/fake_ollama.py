@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_DIM = 256
+DEFAULT_TOKEN_LATENCY_MS = 20.0
+DEFAULT_EMBED_LATENCY_MS = 2.0
+DEFAULT_ANSWER_TOKENS = 40
+
+ANSWER_WORDS = (
+    "Promtior builds generative AI solutions that help companies adopt "
+    "language models in their products and internal processes."
+).split()
+
+
+@dataclass(frozen=True)
+class FakeOllamaConfig:
+    dim: int = DEFAULT_DIM
+    token_latency_ms: float = DEFAULT_TOKEN_LATENCY_MS
+    embed_latency_ms: float = DEFAULT_EMBED_LATENCY_MS
+    answer_tokens: int = DEFAULT_ANSWER_TOKENS
+
+
+def embed_text(text: str, dim: int) -> List[float]:
+    vector = [0.0] * dim
+    for word in text.lower().split():
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % dim] += 1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def answer_tokens(count: int) -> List[str]:
+    return [
+        (" " if i else "") + ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(count)
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._json({"models": []})
+        elif self.path == "/api/version":
+            self._json({"version": "bench"})
+        else:
+            self._json({"error": "not found"}, status=404)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        config = self.server.config
+        if self.path in ("/api/embed", "/api/embeddings"):
+            texts = body.get("input", body.get("prompt", ""))
+            texts = [texts] if isinstance(texts, str) else list(texts)
+            self.server.count("embed_requests")
+            self.server.count("embed_inputs", len(texts))
+            time.sleep(config.embed_latency_ms / 1000)
+            vectors = [embed_text(text, config.dim) for text in texts]
+            if self.path == "/api/embeddings":
+                self._json({"embedding": vectors[0]})
+            else:
+                self._json({"model": body.get("model"), "embeddings": vectors})
+        elif self.path in ("/api/generate", "/api/chat"):
+            self.server.count("generate_requests")
+            self._generate(body, chat=self.path == "/api/chat")
+        else:
+            self._json({"error": "not found"}, status=404)
+
+    def _generate(self, body: Dict, chat: bool) -> None:
+        config = self.server.config
+        count = int(body.get("options", {}).get("num_predict") or config.answer_tokens)
+        if count < 0:
+            count = config.answer_tokens
+        tokens = answer_tokens(min(count, config.answer_tokens))
+
+        def message(token: str, done: bool) -> Dict:
+            payload: Dict = {"model": body.get("model"), "done": done}
+            if chat:
+                payload["message"] = {"role": "assistant", "content": token}
+            else:
+                payload["response"] = token
+            if done:
+                payload["eval_count"] = len(tokens)
+            return payload
+
+        if not body.get("stream", True):
+            time.sleep(config.token_latency_ms * len(tokens) / 1000)
+            self._json(message("".join(tokens), done=True))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            time.sleep(config.token_latency_ms / 1000)
+            self._chunk(message(token, done=False))
+        self._chunk(message("", done=True))
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _chunk(self, payload: Dict) -> None:
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _json(self, payload: Dict, status: int = 200) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeOllamaConfig) -> None:
+        super().__init__(address, _Handler)
+        self.config = config
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + amount
+
+
+class FakeOllama:
+    def __init__(
+        self,
+        config: Optional[FakeOllamaConfig] = None,
+        host: str = DEFAULT_HOST,
+        port: int = 0,
+    ) -> None:
+        self.config = config or FakeOllamaConfig()
+        self._server = _Server((host, port), self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def calls(self) -> Dict[str, int]:
+        with self._server._lock:
+            return dict(self._server.calls)
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-ollama", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Deterministic Ollama stand-in for benchmarks.")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--token-latency-ms", type=float, default=DEFAULT_TOKEN_LATENCY_MS)
+    parser.add_argument("--embed-latency-ms", type=float, default=DEFAULT_EMBED_LATENCY_MS)
+    parser.add_argument("--answer-tokens", type=int, default=DEFAULT_ANSWER_TOKENS)
+    args = parser.parse_args()
+
+    server = FakeOllama(
+        FakeOllamaConfig(
+            dim=args.dim,
+            token_latency_ms=args.token_latency_ms,
+            embed_latency_ms=args.embed_latency_ms,
+            answer_tokens=args.answer_tokens,
+        ),
+        port=args.port,
+    ).start()
+    print(f"Fake Ollama listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Sequence
+
+from bench.common import environment, synthetic_documents
+from bench.fake_ollama import FakeOllama
+
+INGEST_ENV = {
+    "INDEX_INCREMENTAL": "false",
+    "FAISS_INDEX_REPORT": "false",
+    "INGEST_EMBED_CHECKPOINT": "false",
+}
+
+
+def build_index(server: FakeOllama, storage_dir: Path, docs: int) -> Dict[str, object]:
+    from src.app.ingest.indexer import index_documents
+
+    shutil.rmtree(storage_dir, ignore_errors=True)
+    before = server.calls
+    with environment(OLLAMA_BASE_URL=server.base_url, **INGEST_ENV):
+        started = time.perf_counter()
+        stats = index_documents(synthetic_documents(docs), storage_dir=storage_dir)
+        seconds = time.perf_counter() - started
+    after = server.calls
+    return {
+        "docs": stats.doc_count,
+        "chunks": stats.chunk_count,
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(stats.doc_count / seconds, 2),
+        "chunks_per_second": round(stats.chunk_count / seconds, 2),
+        "embed_requests": after.get("embed_requests", 0) - before.get("embed_requests", 0),
+    }
+
+
+def ensure_index(server: FakeOllama, work_dir: Path, docs: int) -> Path:
+    storage_dir = work_dir / f"ingest-{docs}"
+    if not (storage_dir / "manifest.json").exists():
+        build_index(server, storage_dir, docs)
+    return storage_dir
+
+
+def run_ingestion(
+    server: FakeOllama,
+    work_dir: Path,
+    sizes: Sequence[int],
+) -> Dict[str, Dict[str, object]]:
+    results: Dict[str, Dict[str, object]] = {}
+    for size in sizes:
+        result = build_index(server, work_dir / f"ingest-{size}", size)
+        print(
+            f"[ingest] {size} docs: {result['chunks']} chunks in {result['seconds']}s "
+            f"({result['docs_per_second']} docs/s, {result['chunks_per_second']} chunks/s)"
+        )
+        results[str(size)] = result
+    return results
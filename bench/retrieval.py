@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Dict, Sequence
+
+import numpy as np
+
+from bench.common import environment, percentiles, synthetic_questions
+from bench.fake_ollama import FakeOllama, embed_text
+from bench.ingestion import ensure_index
+
+WARMUP_QUERIES = 5
+
+
+def run_retrieval(
+    server: FakeOllama,
+    work_dir: Path,
+    sizes: Sequence[int],
+    queries: int,
+) -> Dict[str, Dict[str, object]]:
+    from src.app.rag.chain import TOP_K, _get_embeddings, _load_vectorstore
+    from src.app.rag.versions import resolve_index_dir
+
+    results: Dict[str, Dict[str, object]] = {}
+    for size in sizes:
+        storage_dir = ensure_index(server, work_dir, size)
+        questions = synthetic_questions(queries + WARMUP_QUERIES, size)
+        with environment(OLLAMA_BASE_URL=server.base_url, VECTORSTORE_DIR=str(storage_dir)):
+            vectorstore = _load_vectorstore(_get_embeddings(), resolve_index_dir(storage_dir))
+            retriever = vectorstore.as_retriever(search_kwargs={"k": TOP_K})
+
+            retriever_ms = []
+            for i, question in enumerate(questions):
+                started = time.perf_counter()
+                retriever.invoke(question)
+                if i >= WARMUP_QUERIES:
+                    retriever_ms.append((time.perf_counter() - started) * 1000)
+
+            dim = vectorstore.index.d
+            vectors = [np.asarray(embed_text(q, dim), dtype=np.float32) for q in questions]
+            search_ms = []
+            for i, vector in enumerate(vectors):
+                started = time.perf_counter()
+                vectorstore.similarity_search_with_score_by_vector(vector, k=TOP_K)
+                if i >= WARMUP_QUERIES:
+                    search_ms.append((time.perf_counter() - started) * 1000)
+
+        result = {
+            "docs": size,
+            "vectors": int(vectorstore.index.ntotal),
+            "retriever": percentiles(retriever_ms),
+            "search": percentiles(search_ms),
+        }
+        print(
+            f"[retrieval] {size} docs / {result['vectors']} vectors: "
+            f"retriever p50 {result['retriever']['p50_ms']}ms p99 {result['retriever']['p99_ms']}ms, "
+            f"search p50 {result['search']['p50_ms']}ms p99 {result['search']['p99_ms']}ms"
+        )
+        results[str(size)] = result
+    return results
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from bench.chat import run_chat
+from bench.fake_ollama import DEFAULT_DIM, FakeOllama, FakeOllamaConfig
+from bench.ingestion import run_ingestion
+from bench.retrieval import run_retrieval
+
+RESULTS_SCHEMA = 1
+RESULTS_DIR = ROOT / "bench" / "results"
+SUITES = ("ingest", "retrieval", "chat")
+DEFAULT_SIZES = "200,1000,5000"
+DEFAULT_TOLERANCE = 0.10
+
+
+def _sizes(value: str) -> List[int]:
+    sizes = [int(part) for part in value.split(",") if part.strip()]
+    if not sizes or any(size <= 0 for size in sizes):
+        raise argparse.ArgumentTypeError("Sizes must be a comma-separated list of positive integers.")
+    return sizes
+
+
+def _suites(value: str) -> List[str]:
+    suites = [part.strip() for part in value.split(",") if part.strip()]
+    unknown = sorted(set(suites) - set(SUITES))
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown suites: {', '.join(unknown)}.")
+    return suites
+
+
+def _git_info() -> Dict[str, object]:
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def _metrics(results: Dict[str, object], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _metrics(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+
+def _higher_is_better(metric: str) -> Optional[bool]:
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("per_second"):
+        return True
+    if name.endswith("_ms") or name == "seconds":
+        return False
+    return None
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], tolerance: float) -> List[str]:
+    previous = dict(_metrics(baseline.get("results", {})))
+    regressions: List[str] = []
+    for metric, value in _metrics(current.get("results", {})):
+        higher_is_better = _higher_is_better(metric)
+        old = previous.get(metric)
+        if higher_is_better is None or not old:
+            continue
+        change = (value - old) / old
+        worse = -change if higher_is_better else change
+        if worse > tolerance:
+            regressions.append(f"{metric}: {old:g} -> {value:g} ({change:+.1%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a fake Ollama server.")
+    parser.add_argument("--suites", type=_suites, default=list(SUITES), help="ingest,retrieval,chat")
+    parser.add_argument("--sizes", type=_sizes, default=_sizes(DEFAULT_SIZES), help="corpus sizes in docs")
+    parser.add_argument("--queries", type=int, default=200, help="retrieval queries per corpus size")
+    parser.add_argument("--requests", type=int, default=100, help="chat requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent chat clients")
+    parser.add_argument("--chat-docs", type=int, default=None, help="corpus size for the chat suite")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--token-latency-ms", type=float, default=20.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=2.0)
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--output", type=Path, default=None, help="results file (JSON)")
+    parser.add_argument("--baseline", type=Path, default=None, help="earlier results to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--work-dir", type=Path, default=None, help="keep indexes here instead of a temp dir")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        dim=args.dim,
+        token_latency_ms=args.token_latency_ms,
+        embed_latency_ms=args.embed_latency_ms,
+        answer_tokens=args.answer_tokens,
+    )
+    git = _git_info()
+    output = {
+        "schema": RESULTS_SCHEMA,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git": git,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "suites": args.suites,
+            "sizes": args.sizes,
+            "queries": args.queries,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "fake_ollama": config.__dict__,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp, FakeOllama(config) as server:
+        work_dir = args.work_dir or Path(tmp)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        results = output["results"]
+        if "ingest" in args.suites:
+            results["ingestion"] = run_ingestion(server, work_dir, args.sizes)
+        if "retrieval" in args.suites:
+            results["retrieval"] = run_retrieval(server, work_dir, args.sizes, args.queries)
+        if "chat" in args.suites:
+            results["chat"] = run_chat(
+                server,
+                work_dir,
+                args.chat_docs or args.sizes[0],
+                args.requests,
+                args.concurrency,
+            )
+        output["fake_ollama_calls"] = server.calls
+
+    path = args.output
+    if path is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        commit = (git["commit"] or "nogit")[:10]
+        path = RESULTS_DIR / f"{stamp}-{commit}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"Results: {path}")
+
+    if args.baseline:
+        with args.baseline.open("r", encoding="utf-8") as f:
+            regressions = compare(output, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%} vs {args.baseline}:")
+            for line in regressions:
+                print(f"- {line}")
+            if args.fail_on_regression:
+                raise SystemExit(1)
+        else:
+            print(f"No regressions beyond {args.tolerance:.0%} vs {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
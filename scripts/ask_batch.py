@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import statistics
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.app.metrics import end_trace, start_trace
+from src.app.rag.chain import (
+    NOT_FOUND_ANSWER,
+    build_chain,
+    get_query_embeddings,
+    manifest_path,
+    open_index,
+)
+from src.app.rag.registry import collection_dir, collections_root
+from src.app.rag.scheduler import Scheduler, SchedulerConfig
+
+SOURCES_MARKER = "\n\nSources:\n"
+DEFAULT_CONCURRENCY = 4
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+Question = Tuple[str, str]
+
+
+def iter_questions(path: Path) -> Iterator[Question]:
+    with path.open("r", encoding="utf-8-sig", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            reader = csv.DictReader(f)
+            if not reader.fieldnames or "question" not in reader.fieldnames:
+                raise ValueError(f"{path} must have a 'question' column.")
+            rows = (row for row in reader)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for number, row in enumerate(rows, start=1):
+            question = str(row.get("question") or "").strip()
+            if not question:
+                raise ValueError(f"{path}: record {number} has no question.")
+            raw_id = row.get("id")
+            question_id = (str(raw_id).strip() if raw_id is not None else "") or question
+            yield question_id, question
+
+
+def unique_questions(questions: Iterator[Question], done: Set[str]) -> Iterator[Question]:
+    seen = set(done)
+    for question_id, question in questions:
+        if question_id not in seen:
+            seen.add(question_id)
+            yield question_id, question
+
+
+def errors_path(output: Path) -> Path:
+    return output.with_name(f"{output.stem}.errors{output.suffix or '.jsonl'}")
+
+
+def answered_ids(output: Path) -> Set[str]:
+    if not output.exists():
+        return set()
+    done: Set[str] = set()
+    with output.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "answer" in record and "error" not in record:
+                done.add(str(record["id"]))
+    return done
+
+
+def split_answer(text: str) -> Tuple[str, List[str]]:
+    if SOURCES_MARKER not in text:
+        return text.strip(), []
+    answer, block = text.rsplit(SOURCES_MARKER, 1)
+    sources = [line[2:].strip() for line in block.splitlines() if line.startswith("- ")]
+    return answer.strip(), sources
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return round(ordered[index], 1)
+
+
+def summarize(
+    latencies_ms: List[float],
+    stages: Dict[str, List[float]],
+    seconds: float,
+) -> Dict[str, object]:
+    ordered = sorted(latencies_ms)
+    summary: Dict[str, object] = {
+        "answered": len(ordered),
+        "seconds": round(seconds, 2),
+        "questions_per_second": round(len(ordered) / seconds, 3) if seconds > 0 else 0.0,
+    }
+    if ordered:
+        summary["latency_ms"] = {
+            "mean": round(statistics.fmean(ordered), 1),
+            "p50": _percentile(ordered, 0.50),
+            "p95": _percentile(ordered, 0.95),
+            "p99": _percentile(ordered, 0.99),
+            "max": round(ordered[-1], 1),
+        }
+        summary["stage_mean_ms"] = {
+            stage: round(statistics.fmean(values), 1) for stage, values in stages.items() if values
+        }
+    return summary
+
+
+class BatchRunner:
+    def __init__(self, chain, output: TextIO, errors: TextIO, concurrency: int) -> None:
+        self.chain = chain
+        self.output = output
+        self.errors = errors
+        self.concurrency = concurrency
+        self.answered = 0
+        self.failed = 0
+        self.latencies_ms: List[float] = []
+        self.stages: Dict[str, List[float]] = {}
+
+    async def run(self, questions: Iterator[Question]) -> None:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        progress = asyncio.create_task(self._progress())
+        try:
+            for item in questions:
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            progress.cancel()
+            for worker in workers:
+                worker.cancel()
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            record = await self._ask(*item)
+            self._write(self.errors if "error" in record else self.output, record)
+
+    async def _ask(self, question_id: str, question: str) -> Dict[str, object]:
+        trace, token = start_trace(question_id)
+        started = time.perf_counter()
+        try:
+            pieces = [piece async for piece in self.chain.astream({"question": question})]
+        except Exception as exc:  # noqa: BLE001 - recorded and retried on the next run
+            self.failed += 1
+            error = f"{type(exc).__name__}: {exc}"
+            return {"id": question_id, "question": question, "error": error}
+        finally:
+            end_trace(token)
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        answer, sources = split_answer("".join(pieces))
+        timings = {stage: round(seconds * 1000, 1) for stage, seconds in trace.stages.items()}
+        self.answered += 1
+        self.latencies_ms.append(latency_ms)
+        for stage, value in timings.items():
+            self.stages.setdefault(stage, []).append(value)
+        return {
+            "id": question_id,
+            "question": question,
+            "answer": answer,
+            "sources": sources,
+            "not_found": answer.startswith(NOT_FOUND_ANSWER.rstrip(".")),
+            "latency_ms": round(latency_ms, 1),
+            "timings_ms": timings,
+        }
+
+    def _write(self, stream: TextIO, record: Dict[str, object]) -> None:
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        stream.flush()
+
+    async def _progress(self) -> None:
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL_SECONDS)
+            print(f"Answered: {self.answered}, failed: {self.failed}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Answer a file of questions with one chain and write results as JSONL."
+    )
+    parser.add_argument(
+        "input", type=Path, help="questions as .jsonl or .csv ('question', optional 'id')"
+    )
+    parser.add_argument("output", type=Path, help="results .jsonl; existing answers are skipped")
+    parser.add_argument(
+        "--errors", type=Path, help="failed questions .jsonl (default: <output>.errors.jsonl)"
+    )
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--collection", help="answer from a named collection")
+    parser.add_argument("--summary", type=Path, help="also write the summary as JSON here")
+    args = parser.parse_args()
+    if args.concurrency <= 0:
+        parser.error("--concurrency must be greater than zero.")
+    return args
+
+
+def build_batch_chain(concurrency: int, collection: Optional[str] = None):
+    embeddings = get_query_embeddings()
+    storage_dir = None
+    if collection:
+        storage_dir = collection_dir(collections_root(manifest_path().parent), collection)
+    scheduler = Scheduler(
+        replace(SchedulerConfig.from_env(), max_concurrency=concurrency, max_queue=concurrency)
+    )
+    return build_chain(
+        embeddings=embeddings,
+        index=open_index(embeddings, storage_dir=storage_dir),
+        scheduler=scheduler,
+    )
+
+
+def main() -> None:
+    load_dotenv(ROOT / ".env")
+    args = parse_args()
+
+    done = answered_ids(args.output)
+    pending = unique_questions(iter_questions(args.input), done)
+    errors = args.errors or errors_path(args.output)
+    if done:
+        print(f"Resuming: {len(done)} questions already answered in {args.output}")
+
+    try:
+        chain = build_batch_chain(args.concurrency, args.collection)
+    except Exception as exc:
+        print(f"ERROR: {exc}")
+        raise SystemExit(1) from exc
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    errors.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    with args.output.open("a", encoding="utf-8") as output:
+        with errors.open("w", encoding="utf-8") as error_output:
+            runner = BatchRunner(chain, output, error_output, args.concurrency)
+            try:
+                asyncio.run(runner.run(pending))
+            except KeyboardInterrupt:
+                print("Interrupted; re-run the same command to resume.")
+            except (OSError, ValueError) as exc:
+                print(f"ERROR: {exc}")
+                raise SystemExit(1) from exc
+    seconds = time.perf_counter() - started
+    if not runner.failed:
+        errors.unlink(missing_ok=True)
+
+    summary = summarize(runner.latencies_ms, runner.stages, seconds)
+    summary.update(failed=runner.failed, skipped=len(done))
+    print(json.dumps(summary, indent=2))
+    if args.summary:
+        args.summary.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    if runner.failed:
+        print(f"{runner.failed} questions failed; see {errors}. Re-run to retry them.")
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    main()
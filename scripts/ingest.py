@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import argparse
+import itertools
 import os
 import sys
 from pathlib import Path
@@ -9,42 +11,87 @@ from dotenv import load_dotenv
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT))
 
-from src.app.ingest.loader import DEFAULT_SEEDS, load_urls, load_presentation_pdf
+from src.app.ingest.loader import DEFAULT_SEEDS, iter_presentation_pdf, iter_web_documents
+from src.app.ingest.embedding_pipeline import EmbedProgress
 from src.app.ingest.indexer import index_documents
+from src.app.rag.registry import collection_dir, collections_root
+
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+
+def make_progress_printer():
+    last_printed = [float("-inf")]
+
+    def report(progress: EmbedProgress) -> None:
+        finished = progress.done == progress.total
+        if not finished and progress.seconds - last_printed[0] < PROGRESS_INTERVAL_SECONDS:
+            return
+        last_printed[0] = progress.seconds
+        resumed = f", {progress.resumed} resumed" if progress.resumed else ""
+        print(
+            f"Embedding: {progress.done}/{progress.total} chunks{resumed} "
+            f"({progress.chunks_per_second} chunks/s, {progress.seconds:.1f}s)"
+        )
+
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build or update a vector index.")
+    parser.add_argument(
+        "--collection",
+        help="Write a named collection under COLLECTIONS_DIR instead of the default index.",
+    )
+    parser.add_argument(
+        "--seed",
+        action="append",
+        dest="seeds",
+        help="Seed URL to load (repeatable). Defaults to the built-in Promtior seeds.",
+    )
+    parser.add_argument(
+        "--pdf",
+        help=(
+            "PDF file, directory or glob to add. Defaults to PRESENTATION_PATH for the "
+            "default index; collections get no PDFs unless this is given."
+        ),
+    )
+    return parser.parse_args()
 
 
 def main() -> None:
     load_dotenv(ROOT / ".env")
+    args = parse_args()
 
     storage_dir = os.getenv("VECTORSTORE_DIR")
     if storage_dir:
         storage_dir = Path(storage_dir)
     else: 
         storage_dir = ROOT / "storage"
+    if args.collection:
+        storage_dir = collection_dir(collections_root(storage_dir), args.collection)
+    seeds = args.seeds or DEFAULT_SEEDS
 
     try:
-        web_docs = load_urls(DEFAULT_SEEDS)
+        web_docs = iter_web_documents(seeds, cache_dir=storage_dir)
 
-        presentation_path = os.getenv("PRESENTATION_PATH", "").strip()
+        presentation_path = args.pdf
+        if presentation_path is None and not args.collection:
+            presentation_path = os.getenv("PRESENTATION_PATH", "").strip()
 
 
         if presentation_path:
-            print(f"Loading presentation from: {presentation_path}")
-            if not os.path.isfile(presentation_path):
-                raise FileNotFoundError(f"PRESENTATION_PATH does not exist: {presentation_path}")
-    
-            pdf_docs = load_presentation_pdf(presentation_path)
+            print(f"Loading presentation PDFs from: {presentation_path}")
+            pdf_docs = iter_presentation_pdf(presentation_path)
         else:
-            pdf_docs = []
+            pdf_docs = iter(())
             
-        docs = web_docs + pdf_docs
-
-        print(f"Total documents before chunking: {len(docs)}")
+        docs = itertools.chain(web_docs, pdf_docs)
 
         stats = index_documents(
             docs=docs,
-            seeds=DEFAULT_SEEDS,
+            seeds=seeds,
             storage_dir=storage_dir,
+            progress=make_progress_printer(),
         )
     except Exception as exc:
         print(f"ERROR: {exc}")
@@ -52,8 +99,18 @@ def main() -> None:
 
     print("Ingestion complete.")
     print(f"Documents: {stats.doc_count}")
-    print(f"Chunks: {stats.chunk_count}")
+    print(f"Chunks: {stats.chunk_count} ({stats.duplicates} near-duplicates merged)")
     print(f"Vector store: {stats.storage_dir}")
+    print(f"Index version: {stats.version}")
+    print(f"Index type: {stats.index_type}")
+    print(
+        f"Chunks added: {stats.added}, removed: {stats.removed}, unchanged: {stats.unchanged}"
+        + (f" (incremental from {stats.base_version})" if stats.base_version else "")
+    )
+    if stats.pruned_versions:
+        print(f"Pruned versions: {', '.join(stats.pruned_versions)}")
+    if stats.report_path:
+        print(f"Recall/latency report: {stats.report_path}")
     print(f"Manifest: {stats.manifest_path}")
 
 
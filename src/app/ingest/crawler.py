@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from langchain_core.documents import Document
+
+from src.app import settings
+from src.app.ingest.fetch_cache import FetchCache
+from src.app.ingest.loader import ROBOTS_AGENT, USER_AGENT
+from src.app.ingest.parsing import ParsePool, parse_html
+
+ENV_CRAWL_MAX_PAGES = "CRAWL_MAX_PAGES"
+ENV_CRAWL_MAX_DEPTH = "CRAWL_MAX_DEPTH"
+ENV_CRAWL_CONCURRENCY = "CRAWL_CONCURRENCY"
+ENV_CRAWL_PER_HOST_CONCURRENCY = "CRAWL_PER_HOST_CONCURRENCY"
+ENV_CRAWL_PER_HOST_RPS = "CRAWL_PER_HOST_RPS"
+ENV_CRAWL_MAX_RETRIES = "CRAWL_MAX_RETRIES"
+ENV_CRAWL_TIMEOUT = "CRAWL_TIMEOUT"
+ENV_CRAWL_USE_SITEMAP = "CRAWL_USE_SITEMAP"
+ENV_CRAWL_RESPECT_ROBOTS = "CRAWL_RESPECT_ROBOTS"
+
+DEFAULT_CRAWL_MAX_PAGES = 50
+DEFAULT_CRAWL_MAX_DEPTH = 2
+DEFAULT_CRAWL_CONCURRENCY = 16
+DEFAULT_CRAWL_PER_HOST_CONCURRENCY = 4
+DEFAULT_CRAWL_PER_HOST_RPS = 5.0
+DEFAULT_CRAWL_MAX_RETRIES = 3
+DEFAULT_CRAWL_TIMEOUT = 20.0
+DEFAULT_CRAWL_USE_SITEMAP = True
+DEFAULT_CRAWL_RESPECT_ROBOTS = True
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+MAX_SITEMAP_DEPTH = 2
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js",
+    ".zip", ".gz", ".mp4", ".mp3", ".woff", ".woff2", ".ttf", ".xml", ".json",
+)
+
+
+@dataclass(frozen=True)
+class CrawlConfig:
+    max_pages: int = DEFAULT_CRAWL_MAX_PAGES
+    max_depth: int = DEFAULT_CRAWL_MAX_DEPTH
+    concurrency: int = DEFAULT_CRAWL_CONCURRENCY
+    per_host_concurrency: int = DEFAULT_CRAWL_PER_HOST_CONCURRENCY
+    per_host_rps: float = DEFAULT_CRAWL_PER_HOST_RPS
+    max_retries: int = DEFAULT_CRAWL_MAX_RETRIES
+    timeout: float = DEFAULT_CRAWL_TIMEOUT
+    use_sitemap: bool = DEFAULT_CRAWL_USE_SITEMAP
+    respect_robots: bool = DEFAULT_CRAWL_RESPECT_ROBOTS
+
+    @classmethod
+    def from_env(cls) -> "CrawlConfig":
+        config = cls(
+            max_pages=settings.get_int(ENV_CRAWL_MAX_PAGES, DEFAULT_CRAWL_MAX_PAGES),
+            max_depth=settings.get_int(ENV_CRAWL_MAX_DEPTH, DEFAULT_CRAWL_MAX_DEPTH),
+            concurrency=settings.get_int(ENV_CRAWL_CONCURRENCY, DEFAULT_CRAWL_CONCURRENCY),
+            per_host_concurrency=settings.get_int(
+                ENV_CRAWL_PER_HOST_CONCURRENCY, DEFAULT_CRAWL_PER_HOST_CONCURRENCY
+            ),
+            per_host_rps=settings.get_float(ENV_CRAWL_PER_HOST_RPS, DEFAULT_CRAWL_PER_HOST_RPS),
+            max_retries=settings.get_int(ENV_CRAWL_MAX_RETRIES, DEFAULT_CRAWL_MAX_RETRIES),
+            timeout=settings.get_float(ENV_CRAWL_TIMEOUT, DEFAULT_CRAWL_TIMEOUT),
+            use_sitemap=settings.get_bool(ENV_CRAWL_USE_SITEMAP, DEFAULT_CRAWL_USE_SITEMAP),
+            respect_robots=settings.get_bool(
+                ENV_CRAWL_RESPECT_ROBOTS, DEFAULT_CRAWL_RESPECT_ROBOTS
+            ),
+        )
+        config.validate()
+        return config
+
+    def validate(self) -> None:
+        if self.max_pages <= 0:
+            raise ValueError("CRAWL_MAX_PAGES must be greater than zero.")
+        if self.max_depth < 0:
+            raise ValueError("CRAWL_MAX_DEPTH must not be negative.")
+        if self.concurrency <= 0 or self.per_host_concurrency <= 0:
+            raise ValueError("Crawl concurrency limits must be greater than zero.")
+        if self.per_host_rps < 0:
+            raise ValueError("CRAWL_PER_HOST_RPS must not be negative (0 disables it).")
+        if self.max_retries < 0:
+            raise ValueError("CRAWL_MAX_RETRIES must not be negative.")
+
+
+@dataclass
+class CrawlStats:
+    pages: int = 0
+    failed: int = 0
+    retries: int = 0
+    skipped_robots: int = 0
+    skipped_non_html: int = 0
+    sitemap_urls: int = 0
+    seconds: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def normalize_url(url: str) -> str:
+    url, _ = urldefrag(url.strip())
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}{path}{query}"
+
+
+def _site_key(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _crawlable(url: str) -> bool:
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and not parts.path.lower().endswith(SKIPPED_EXTENSIONS)
+
+
+class _HostLimiter:
+    def __init__(self, concurrency: int, rps: float) -> None:
+        self._slots = asyncio.Semaphore(concurrency)
+        self._interval = 1.0 / rps if rps > 0 else 0.0
+        self._lock = asyncio.Lock()
+        self._next_at = 0.0
+
+    async def __aenter__(self) -> None:
+        await self._slots.acquire()
+        if self._interval:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._next_at - now
+                self._next_at = max(now, self._next_at) + self._interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._slots.release()
+
+
+class Crawler:
+    def __init__(
+        self,
+        seeds: Iterable[str],
+        config: Optional[CrawlConfig] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[FetchCache] = None,
+        pool: Optional[ParsePool] = None,
+    ) -> None:
+        self.seeds = [normalize_url(url) for url in seeds]
+        if not self.seeds:
+            raise ValueError("The crawler needs at least one seed URL.")
+        self.config = config or CrawlConfig.from_env()
+        self.config.validate()
+        self.stats = CrawlStats()
+        self._client = client
+        self._cache = cache
+        self._pool = pool
+        self._sites = {_site_key(url) for url in self.seeds}
+        self._limiters: Dict[str, _HostLimiter] = {}
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+        self._robots_locks: Dict[str, asyncio.Lock] = {}
+        self._seen: Set[str] = set()
+        self._queue: "asyncio.Queue[Tuple[str, int]]" = asyncio.Queue()
+        self._results: "asyncio.Queue[Optional[Document]]" = asyncio.Queue()
+        self._fetched_at = datetime.now(timezone.utc).isoformat()
+
+    async def run(self) -> List[Document]:
+        documents = [doc async for doc in self.iter_documents()]
+        documents.sort(key=lambda doc: (doc.metadata["depth"], doc.metadata["source"]))
+        return documents
+
+    async def iter_documents(self) -> AsyncIterator[Document]:
+        started = time.perf_counter()
+        owns_client = self._client is None
+        owns_pool = self._pool is None
+        if owns_pool:
+            self._pool = ParsePool(tasks=self.config.max_pages)
+        if owns_client:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                timeout=self.config.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.config.concurrency,
+                    max_keepalive_connections=self.config.concurrency,
+                ),
+            )
+        tasks: List[asyncio.Task] = []
+        try:
+            for url in self.seeds:
+                self._enqueue(url, 0)
+            if self.config.use_sitemap:
+                await self._enqueue_sitemaps()
+
+            tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.config.concurrency)
+            ]
+            tasks.append(asyncio.create_task(self._finish_when_drained()))
+            while True:
+                document = await self._results.get()
+                if document is None:
+                    break
+                yield document
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if owns_client:
+                await self._client.aclose()
+            if owns_pool:
+                self._pool.close()
+            self.stats.seconds = round(time.perf_counter() - started, 3)
+
+    async def _finish_when_drained(self) -> None:
+        await self._queue.join()
+        self._results.put_nowait(None)
+
+    def _enqueue(self, url: str, depth: int) -> bool:
+        url = normalize_url(url)
+        if url in self._seen or len(self._seen) >= self.config.max_pages:
+            return False
+        if depth > self.config.max_depth or not _crawlable(url):
+            return False
+        if _site_key(url) not in self._sites:
+            return False
+        self._seen.add(url)
+        self._queue.put_nowait((url, depth))
+        return True
+
+    def _limiter(self, url: str) -> _HostLimiter:
+        host = urlsplit(url).netloc.lower()
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = _HostLimiter(self.config.per_host_concurrency, self.config.per_host_rps)
+            self._limiters[host] = limiter
+        return limiter
+
+    async def _get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Optional[httpx.Response]:
+        for attempt in range(self.config.max_retries + 1):
+            retry_after: Optional[float] = None
+            try:
+                async with self._limiter(url):
+                    response = await self._client.get(url, headers=headers)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                header = response.headers.get("Retry-After", "")
+                retry_after = float(header) if header.isdigit() else None
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as exc:
+                error = f"{type(exc).__name__}: {exc}"
+
+            if attempt == self.config.max_retries:
+                self.stats.errors[url] = error
+                return None
+            self.stats.retries += 1
+            delay = retry_after
+            if delay is None:
+                delay = BACKOFF_BASE_SECONDS * (2 ** attempt) * (1 + random.random())
+            await asyncio.sleep(min(delay, BACKOFF_MAX_SECONDS))
+        return None
+
+    async def _robots_for(self, url: str) -> Optional[RobotFileParser]:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin in self._robots:
+            return self._robots[origin]
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            if origin not in self._robots:
+                parser: Optional[RobotFileParser] = None
+                response = await self._get(f"{origin}/robots.txt")
+                if response is not None and response.status_code == 200:
+                    parser = RobotFileParser()
+                    parser.parse(response.text.splitlines())
+                self._robots[origin] = parser
+        return self._robots[origin]
+
+    async def _allowed(self, url: str) -> bool:
+        if not self.config.respect_robots:
+            return True
+        parser = await self._robots_for(url)
+        return parser is None or parser.can_fetch(ROBOTS_AGENT, url)
+
+    async def _enqueue_sitemaps(self) -> None:
+        origins = {
+            f"{urlsplit(url).scheme}://{urlsplit(url).netloc}" for url in self.seeds
+        }
+        sitemap_urls: List[str] = []
+        for origin in sorted(origins):
+            parser = await self._robots_for(origin + "/") if self.config.respect_robots else None
+            listed = parser.site_maps() if parser is not None else None
+            sitemap_urls.extend(listed or [f"{origin}/sitemap.xml"])
+
+        pending = [(url, 0) for url in sitemap_urls]
+        visited: Set[str] = set()
+        while pending:
+            sitemap_url, level = pending.pop(0)
+            if sitemap_url in visited or level > MAX_SITEMAP_DEPTH:
+                continue
+            visited.add(sitemap_url)
+            response = await self._get(sitemap_url)
+            if response is None or response.status_code != 200:
+                continue
+            try:
+                root = ET.fromstring(response.content)
+            except ET.ParseError:
+                continue
+            tag = root.tag.rsplit("}", 1)[-1]
+            for loc in root.iter():
+                if loc.tag.rsplit("}", 1)[-1] != "loc" or not loc.text:
+                    continue
+                if tag == "sitemapindex":
+                    pending.append((loc.text.strip(), level + 1))
+                elif self._enqueue(loc.text.strip(), 1):
+                    self.stats.sitemap_urls += 1
+
+    async def _worker(self) -> None:
+        while True:
+            url, depth = await self._queue.get()
+            try:
+                await self._crawl_one(url, depth)
+            except Exception as exc:  # noqa: BLE001 - one bad page must not stop the crawl
+                self.stats.failed += 1
+                self.stats.errors[url] = f"{type(exc).__name__}: {exc}"
+            finally:
+                self._queue.task_done()
+
+    async def _crawl_one(self, url: str, depth: int) -> None:
+        if not await self._allowed(url):
+            self.stats.skipped_robots += 1
+            return
+
+        cached = self._cache.get(url) if self._cache is not None else None
+        headers = self._cache.conditional_headers(cached) if self._cache is not None else None
+        response = await self._get(url, headers=headers)
+        hit = None
+        if response is not None and self._cache is not None:
+            hit = self._cache.resolve(
+                cached, response.status_code, response.headers, response.content
+            )
+
+        if hit is not None:
+            links = list(hit.links)
+            document = Document(
+                page_content=hit.document.page_content,
+                metadata={**hit.document.metadata, "depth": depth},
+            )
+        else:
+            if response is None or response.status_code != 200:
+                self.stats.failed += 1
+                if response is not None:
+                    self.stats.errors[url] = f"HTTP {response.status_code}"
+                return
+            if "html" not in response.headers.get("Content-Type", "text/html").lower():
+                self.stats.skipped_non_html += 1
+                return
+
+            page = await asyncio.wrap_future(
+                self._pool.submit(parse_html, response.text, str(response.url))
+            )
+            links = list(page.links)
+            document = Document(
+                page_content=page.text,
+                metadata={
+                    "source": url,
+                    "fetched_at": self._fetched_at,
+                    "title": page.title,
+                    "depth": depth,
+                },
+            )
+            if self._cache is not None:
+                self._cache.put(url, response.headers, response.content, document, links)
+
+        if depth < self.config.max_depth:
+            for link in links:
+                self._enqueue(link, depth + 1)
+        self.stats.pages += 1
+        self._results.put_nowait(document)
+
+
+def crawl_site(
+    seeds: Iterable[str],
+    config: Optional[CrawlConfig] = None,
+    cache: Optional[FetchCache] = None,
+) -> Iterator[Document]:
+    crawler = Crawler(seeds, config=config, cache=cache)
+    loop = asyncio.new_event_loop()
+    documents = crawler.iter_documents()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(documents.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(documents.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.app import settings
+from src.app.rag.docstore import MERGED_SOURCES_FILENAME
+
+ENV_DEDUP_ENABLED = "DEDUP_ENABLED"
+ENV_DEDUP_THRESHOLD = "DEDUP_THRESHOLD"
+ENV_DEDUP_NUM_PERM = "DEDUP_NUM_PERM"
+ENV_DEDUP_SHINGLE_SIZE = "DEDUP_SHINGLE_SIZE"
+
+DEFAULT_DEDUP_ENABLED = True
+DEFAULT_DEDUP_THRESHOLD = 0.85
+DEFAULT_DEDUP_NUM_PERM = 64
+DEFAULT_DEDUP_SHINGLE_SIZE = 5
+
+DEDUP_METHOD = "minhash-lsh"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_PERMUTATION_SEED = 1
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class DedupConfig:
+    enabled: bool = DEFAULT_DEDUP_ENABLED
+    threshold: float = DEFAULT_DEDUP_THRESHOLD
+    num_perm: int = DEFAULT_DEDUP_NUM_PERM
+    shingle_size: int = DEFAULT_DEDUP_SHINGLE_SIZE
+
+    @classmethod
+    def from_env(cls) -> "DedupConfig":
+        config = cls(
+            enabled=settings.get_bool(ENV_DEDUP_ENABLED, DEFAULT_DEDUP_ENABLED),
+            threshold=settings.get_float(ENV_DEDUP_THRESHOLD, DEFAULT_DEDUP_THRESHOLD),
+            num_perm=settings.get_int(ENV_DEDUP_NUM_PERM, DEFAULT_DEDUP_NUM_PERM),
+            shingle_size=settings.get_int(ENV_DEDUP_SHINGLE_SIZE, DEFAULT_DEDUP_SHINGLE_SIZE),
+        )
+        config.validate()
+        return config
+
+    def validate(self) -> None:
+        if not 0.0 < self.threshold <= 1.0:
+            raise ValueError("DEDUP_THRESHOLD must be greater than 0 and at most 1.")
+        if self.num_perm < 2:
+            raise ValueError("DEDUP_NUM_PERM must be at least 2.")
+        if self.shingle_size <= 0:
+            raise ValueError("DEDUP_SHINGLE_SIZE must be greater than zero.")
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    # Highest (1/b)^(1/r) below the threshold: near-duplicates almost always
+    # share a band, and the signature comparison drops the false candidates.
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+def shingles(text: str, size: int) -> List[str]:
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) <= size:
+        return [" ".join(tokens)]
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+class MinHasher:
+    def __init__(self, num_perm: int, shingle_size: int) -> None:
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(_PERMUTATION_SEED)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashed = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+                for shingle in set(shingles(text, self.shingle_size))
+            ),
+            dtype=np.uint64,
+        )
+        with np.errstate(over="ignore"):
+            permuted = (np.outer(hashed, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class Deduplicator:
+    def __init__(self, config: Optional[DedupConfig] = None) -> None:
+        self.config = config or DedupConfig.from_env()
+        self.config.validate()
+        self.bands, self.rows = lsh_bands(self.config.num_perm, self.config.threshold)
+        self._hasher = MinHasher(self.bands * self.rows, self.config.shingle_size)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+        self._sources: List[str] = []
+        self.merged_sources: Dict[int, List[str]] = {}
+        self.chunks_in = 0
+        self.duplicates = 0
+
+    @property
+    def kept(self) -> int:
+        return self.chunks_in - self.duplicates
+
+    def filter(self, chunks: Iterable[Document]) -> Iterator[Document]:
+        for chunk in chunks:
+            self.chunks_in += 1
+            if not self.config.enabled:
+                yield chunk
+                continue
+
+            signature = self._hasher.signature(chunk.page_content)
+            keys = [
+                signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)
+            ]
+            canonical = self._find(signature, keys)
+            source = str(chunk.metadata.get("source", ""))
+            if canonical is not None:
+                self.duplicates += 1
+                self._merge(canonical, source)
+                continue
+
+            position = len(self._signatures)
+            self._signatures.append(signature)
+            self._sources.append(source)
+            for bucket, key in zip(self._buckets, keys):
+                bucket.setdefault(key, []).append(position)
+            yield chunk
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "enabled": self.config.enabled,
+            "method": DEDUP_METHOD,
+            "threshold": self.config.threshold,
+            "num_perm": self.bands * self.rows,
+            "bands": self.bands,
+            "rows": self.rows,
+            "shingle_size": self.config.shingle_size,
+            "chunks_in": self.chunks_in,
+            "duplicates": self.duplicates,
+            "kept": self.kept,
+            "merged_sources_file": MERGED_SOURCES_FILENAME if self.merged_sources else None,
+        }
+
+    def save(self, storage_dir: Union[str, Path]) -> Optional[Path]:
+        if not self.merged_sources:
+            return None
+        path = Path(storage_dir) / MERGED_SOURCES_FILENAME
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({str(k): v for k, v in sorted(self.merged_sources.items())}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def _find(self, signature: np.ndarray, keys: List[bytes]) -> Optional[int]:
+        seen = set()
+        for bucket, key in zip(self._buckets, keys):
+            for candidate in bucket.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= self.config.threshold:
+                    return candidate
+        return None
+
+    def _merge(self, canonical: int, source: str) -> None:
+        if not source or source == self._sources[canonical]:
+            return
+        merged = self.merged_sources.setdefault(canonical, [])
+        if source not in merged:
+            merged.append(source)
+
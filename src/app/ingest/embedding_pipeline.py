@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.app import settings
+
+ENV_INGEST_EMBED_BATCH_SIZE = "INGEST_EMBED_BATCH_SIZE"
+ENV_INGEST_EMBED_CONCURRENCY = "INGEST_EMBED_CONCURRENCY"
+ENV_INGEST_EMBED_RETRIES = "INGEST_EMBED_RETRIES"
+ENV_INGEST_EMBED_CHECKPOINT = "INGEST_EMBED_CHECKPOINT"
+
+DEFAULT_INGEST_EMBED_BATCH_SIZE = 64
+DEFAULT_INGEST_EMBED_CONCURRENCY = 4
+DEFAULT_INGEST_EMBED_RETRIES = 2
+DEFAULT_INGEST_EMBED_CHECKPOINT = True
+
+EMBED_CHECKPOINT_DIRNAME = "embed_checkpoint"
+CHECKPOINT_META_FILENAME = "meta.json"
+VECTORS_SUFFIX = ".vectors.npy"
+HASHES_SUFFIX = ".hashes.npy"
+RETRY_BACKOFF_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class EmbedProgress:
+    done: int
+    total: int
+    resumed: int
+    seconds: float
+
+    @property
+    def chunks_per_second(self) -> float:
+        embedded = self.done - self.resumed
+        return round(embedded / self.seconds, 2) if self.seconds > 0 else 0.0
+
+
+ProgressCallback = Callable[[EmbedProgress], None]
+
+
+@dataclass(frozen=True)
+class EmbedSettings:
+    batch_size: int = DEFAULT_INGEST_EMBED_BATCH_SIZE
+    concurrency: int = DEFAULT_INGEST_EMBED_CONCURRENCY
+    retries: int = DEFAULT_INGEST_EMBED_RETRIES
+    checkpoint: bool = DEFAULT_INGEST_EMBED_CHECKPOINT
+
+    @classmethod
+    def from_env(cls) -> "EmbedSettings":
+        config = cls(
+            batch_size=settings.get_int(ENV_INGEST_EMBED_BATCH_SIZE, DEFAULT_INGEST_EMBED_BATCH_SIZE),
+            concurrency=settings.get_int(
+                ENV_INGEST_EMBED_CONCURRENCY, DEFAULT_INGEST_EMBED_CONCURRENCY
+            ),
+            retries=settings.get_int(ENV_INGEST_EMBED_RETRIES, DEFAULT_INGEST_EMBED_RETRIES),
+            checkpoint=settings.get_bool(
+                ENV_INGEST_EMBED_CHECKPOINT, DEFAULT_INGEST_EMBED_CHECKPOINT
+            ),
+        )
+        config.validate()
+        return config
+
+    def validate(self) -> None:
+        if self.batch_size <= 0:
+            raise ValueError("INGEST_EMBED_BATCH_SIZE must be greater than zero.")
+        if self.concurrency <= 0:
+            raise ValueError("INGEST_EMBED_CONCURRENCY must be greater than zero.")
+        if self.retries < 0:
+            raise ValueError("INGEST_EMBED_RETRIES must not be negative.")
+
+
+class EmbeddingCheckpoint:
+    def __init__(self, directory: Union[str, Path], model: str) -> None:
+        self.directory = Path(directory)
+        self.model = model
+        meta_path = self.directory / CHECKPOINT_META_FILENAME
+        if meta_path.exists():
+            with meta_path.open("r", encoding="utf-8") as f:
+                if json.load(f).get("model") != model:
+                    self.clear()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if not meta_path.exists():
+            with meta_path.open("w", encoding="utf-8") as f:
+                json.dump({"model": model}, f)
+        self._rows: Optional[Dict[str, Tuple[Path, int]]] = None
+        self._open_path: Optional[Path] = None
+        self._open_vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def get(self, digest: str) -> Optional[np.ndarray]:
+        location = self._index().get(digest)
+        if location is None:
+            return None
+        path, row = location
+        if path != self._open_path:
+            self._open_vectors = np.load(path, mmap_mode="r")
+            self._open_path = path
+        return np.array(self._open_vectors[row], dtype=np.float32)
+
+    def save(self, hashes: Sequence[str], vectors: np.ndarray) -> None:
+        name = f"batch-{hashes[0][:16]}-{len(hashes)}"
+        self._write(self.directory / f"{name}{VECTORS_SUFFIX}", np.asarray(vectors, dtype=np.float32))
+        self._write(self.directory / f"{name}{HASHES_SUFFIX}", np.asarray(hashes, dtype="S64"))
+
+    def clear(self) -> None:
+        self._rows = None
+        self._open_path = self._open_vectors = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write(self, path: Path, array: np.ndarray) -> None:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    def _index(self) -> Dict[str, Tuple[Path, int]]:
+        if self._rows is None:
+            rows: Dict[str, Tuple[Path, int]] = {}
+            for hashes_path in sorted(self.directory.glob(f"batch-*{HASHES_SUFFIX}")):
+                vectors_path = hashes_path.with_name(
+                    hashes_path.name[: -len(HASHES_SUFFIX)] + VECTORS_SUFFIX
+                )
+                try:
+                    hashes = np.load(hashes_path)
+                except (OSError, ValueError):
+                    continue
+                if not vectors_path.exists():
+                    continue
+                for row, digest in enumerate(hashes):
+                    rows[digest.decode("ascii")] = (vectors_path, row)
+            self._rows = rows
+        return self._rows
+
+
+def _embed_batch(embeddings: Embeddings, texts: List[str], retries: int) -> np.ndarray:
+    attempt = 0
+    while True:
+        try:
+            vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        except Exception:  # noqa: BLE001 - retried, then surfaced to the caller
+            if attempt >= retries:
+                raise
+            time.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt))
+            attempt += 1
+            continue
+        if len(vectors) != len(texts):
+            raise RuntimeError(
+                f"The embedding server returned {len(vectors)} vectors for {len(texts)} texts."
+            )
+        return vectors
+
+
+class BatchEmbedder:
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        config: Optional[EmbedSettings] = None,
+        checkpoint: Optional[EmbeddingCheckpoint] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.config = config or EmbedSettings.from_env()
+        self.config.validate()
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.done = 0
+        self.total = 0
+        self.resumed = 0
+        self._started = time.perf_counter()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.concurrency, thread_name_prefix="ingest-embed"
+        )
+
+    def embed(self, texts: Sequence[str], hashes: Sequence[str]) -> np.ndarray:
+        if len(texts) != len(hashes):
+            raise ValueError("Every text to embed needs a matching chunk hash.")
+        self.total += len(texts)
+
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        if self.checkpoint is not None:
+            for position, digest in enumerate(hashes):
+                results[position] = self.checkpoint.get(digest)
+        pending = [position for position, vector in enumerate(results) if vector is None]
+        resumed = len(texts) - len(pending)
+        self.resumed += resumed
+        self.done += resumed
+        self._report()
+
+        batch_size = self.config.batch_size
+        futures: Dict[Future, List[int]] = {
+            self._executor.submit(
+                _embed_batch, self.embeddings, [texts[i] for i in batch], self.config.retries
+            ): batch
+            for batch in (
+                pending[start:start + batch_size] for start in range(0, len(pending), batch_size)
+            )
+        }
+        remaining = set(futures)
+        error: Optional[BaseException] = None
+        while remaining:
+            finished, remaining = wait(remaining, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future.cancelled():
+                    continue
+                batch = futures[future]
+                try:
+                    vectors = future.result()
+                except Exception as exc:  # noqa: BLE001 - re-raised once in-flight batches land
+                    if error is None:
+                        error = exc
+                        for other in remaining:
+                            other.cancel()
+                    continue
+                if self.checkpoint is not None:
+                    self.checkpoint.save([hashes[i] for i in batch], vectors)
+                for position, vector in zip(batch, vectors):
+                    results[position] = vector
+                self.done += len(batch)
+                self._report()
+
+        if error is not None:
+            hint = ""
+            if self.checkpoint is not None:
+                hint = "; re-run the ingestion to resume from the checkpoint"
+            raise RuntimeError(f"Embedding failed after {self.done} chunks{hint}: {error}") from error
+        if not results:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack(results).astype(np.float32, copy=False)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "BatchEmbedder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _report(self) -> None:
+        if self.progress is not None:
+            self.progress(
+                EmbedProgress(
+                    done=self.done,
+                    total=self.total,
+                    resumed=self.resumed,
+                    seconds=round(time.perf_counter() - self._started, 3),
+                )
+            )
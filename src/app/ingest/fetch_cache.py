@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+from langchain_core.documents import Document
+
+from src.app import settings
+
+ENV_FETCH_CACHE_ENABLED = "FETCH_CACHE_ENABLED"
+
+DEFAULT_FETCH_CACHE_ENABLED = True
+
+FETCH_CACHE_FILENAME = "fetch_cache.sqlite"
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+    document: Document
+    links: Tuple[str, ...] = ()
+
+
+class FetchCache:
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = self._open(self.path)
+        self._counters: Dict[str, int] = {
+            "not_modified": 0,
+            "unchanged": 0,
+            "changed": 0,
+            "new": 0,
+        }
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, content_hash, document, links "
+                "FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, digest, document, links = row
+        record = json.loads(document)
+        return CachedPage(
+            url=url,
+            etag=etag,
+            last_modified=last_modified,
+            content_hash=digest,
+            document=Document(page_content=record["page_content"], metadata=record["metadata"]),
+            links=tuple(json.loads(links)),
+        )
+
+    def conditional_headers(self, cached: Optional[CachedPage]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if cached is None:
+            return headers
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def resolve(
+        self,
+        cached: Optional[CachedPage],
+        status_code: int,
+        headers: Mapping[str, str],
+        body: bytes,
+    ) -> Optional[CachedPage]:
+        if cached is None:
+            return None
+        if status_code == 304:
+            self._refresh(cached, headers)
+            self._count("not_modified")
+            return cached
+        if status_code == 200 and content_hash(body) == cached.content_hash:
+            self._refresh(cached, headers)
+            self._count("unchanged")
+            return cached
+        return None
+
+    def put(
+        self,
+        url: str,
+        headers: Mapping[str, str],
+        body: bytes,
+        document: Document,
+        links: Optional[List[str]] = None,
+    ) -> None:
+        record = json.dumps(
+            {"page_content": document.page_content, "metadata": document.metadata},
+            ensure_ascii=False,
+            default=str,
+        )
+        with self._lock:
+            existed = self._db.execute(
+                "SELECT 1 FROM pages WHERE url = ?", (url,)
+            ).fetchone() is not None
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, content_hash, body, document, links, "
+                "fetched_at, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    content_hash(body),
+                    zlib.compress(body),
+                    record,
+                    json.dumps(links or []),
+                    time.time(),
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+            self._counters["changed" if existed else "new"] += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            return {**self._counters, "entries": entries, "path": str(self.path)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _refresh(self, cached: CachedPage, headers: Mapping[str, str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified), checked_at = ? WHERE url = ?",
+                (headers.get("ETag"), headers.get("Last-Modified"), time.time(), cached.url),
+            )
+            self._db.commit()
+
+    def _open(self, path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+            "content_hash TEXT NOT NULL, body BLOB NOT NULL, document TEXT NOT NULL, "
+            "links TEXT NOT NULL, fetched_at REAL NOT NULL, checked_at REAL NOT NULL)"
+        )
+        db.commit()
+        return db
+
+
+def build_fetch_cache(cache_dir: Optional[Union[str, Path]]) -> Optional[FetchCache]:
+    if cache_dir is None:
+        return None
+    if not settings.get_bool(ENV_FETCH_CACHE_ENABLED, DEFAULT_FETCH_CACHE_ENABLED):
+        return None
+    return FetchCache(Path(cache_dir) / FETCH_CACHE_FILENAME)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.app.rag.versions import (
+    MANIFEST_FILENAME,
+    current_version,
+    read_manifest,
+    resolve_index_dir,
+)
+
+ENV_INDEX_INCREMENTAL = "INDEX_INCREMENTAL"
+
+DEFAULT_INDEX_INCREMENTAL = True
+
+VECTORS_FILENAME = "vectors.npy"
+CHUNK_HASHES_FILENAME = "chunk_hashes.npy"
+CHUNK_HASH_ALGORITHM = "sha256(source, page_content)"
+HASH_DTYPE = "S64"
+
+
+def chunk_hash(chunk: Document) -> str:
+    source = str(chunk.metadata.get("source", ""))
+    payload = f"{source}\x00{chunk.page_content}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass(frozen=True)
+class PreviousIndex:
+    version: Optional[str]
+    rows: Dict[str, int]
+    vectors: np.ndarray
+
+
+@dataclass(frozen=True)
+class IncrementalPlan:
+    vectors: np.ndarray
+    to_embed: List[int]
+    unchanged: int
+
+
+class ChunkDataWriter:
+    def __init__(self, storage_dir: Union[str, Path]) -> None:
+        self.storage_path = Path(storage_dir)
+        self._vectors_tmp = self.storage_path / f".{VECTORS_FILENAME}.{os.getpid()}.tmp"
+        self._hashes_tmp = self.storage_path / f".{CHUNK_HASHES_FILENAME}.{os.getpid()}.tmp"
+        self._vectors = self._vectors_tmp.open("wb")
+        self._hashes = self._hashes_tmp.open("wb")
+        self.count = 0
+        self.dim: Optional[int] = None
+
+    def add(self, hashes: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(hashes):
+            raise ValueError("Every chunk hash needs exactly one vector.")
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension changed from {self.dim} to {vectors.shape[1]}.")
+        self._vectors.write(vectors.tobytes())
+        self._hashes.write(np.asarray(hashes, dtype=HASH_DTYPE).tobytes())
+        self.count += len(hashes)
+
+    def close(self) -> np.ndarray:
+        for f in (self._vectors, self._hashes):
+            if not f.closed:
+                f.close()
+        if not self.count:
+            self.discard()
+            return np.empty((0, 0), dtype=np.float32)
+
+        raw_vectors = np.memmap(
+            self._vectors_tmp, dtype=np.float32, mode="r", shape=(self.count, self.dim)
+        )
+        np.save(self.storage_path / VECTORS_FILENAME, raw_vectors)
+        del raw_vectors
+        raw_hashes = np.memmap(self._hashes_tmp, dtype=HASH_DTYPE, mode="r", shape=(self.count,))
+        np.save(self.storage_path / CHUNK_HASHES_FILENAME, raw_hashes)
+        del raw_hashes
+        self.discard()
+        return np.load(self.storage_path / VECTORS_FILENAME, mmap_mode="r")
+
+    def discard(self) -> None:
+        for f in (self._vectors, self._hashes):
+            if not f.closed:
+                f.close()
+        for path in (self._vectors_tmp, self._hashes_tmp):
+            path.unlink(missing_ok=True)
+
+
+def load_previous_index(
+    storage_dir: Union[str, Path],
+    embed_model: str,
+) -> Optional[PreviousIndex]:
+    index_dir = resolve_index_dir(storage_dir)
+    manifest = read_manifest(index_dir / MANIFEST_FILENAME)
+    if not manifest:
+        return None
+    if manifest.get("embeddings", {}).get("model") != embed_model:
+        return None
+
+    vectors_path = index_dir / VECTORS_FILENAME
+    hashes_path = index_dir / CHUNK_HASHES_FILENAME
+    if not vectors_path.exists() or not hashes_path.exists():
+        return None
+
+    vectors = np.load(vectors_path, mmap_mode="r")
+    hashes = np.load(hashes_path, mmap_mode="r")
+    if vectors.ndim != 2 or len(vectors) != len(hashes):
+        return None
+    rows = {digest.decode("ascii"): row for row, digest in enumerate(hashes)}
+    return PreviousIndex(version=current_version(storage_dir), rows=rows, vectors=vectors)
+
+
+class ChangeTracker:
+    def __init__(self, previous: Optional[PreviousIndex]) -> None:
+        self.previous = previous
+        self.added = 0
+        self.unchanged = 0
+        self._reused = np.zeros(len(previous.vectors) if previous else 0, dtype=bool)
+
+    @property
+    def base_version(self) -> Optional[str]:
+        return self.previous.version if self.previous else None
+
+    @property
+    def removed(self) -> int:
+        if self.previous is None:
+            return 0
+        return len(self.previous.rows) - int(self._reused.sum())
+
+    def plan(self, hashes: Sequence[str]) -> IncrementalPlan:
+        previous = self.previous
+        if previous is None:
+            self.added += len(hashes)
+            return IncrementalPlan(
+                vectors=np.empty((len(hashes), 0), dtype=np.float32),
+                to_embed=list(range(len(hashes))),
+                unchanged=0,
+            )
+
+        vectors = np.empty((len(hashes), previous.vectors.shape[1]), dtype=np.float32)
+        to_embed: List[int] = []
+        for position, digest in enumerate(hashes):
+            row = previous.rows.get(digest)
+            if row is None:
+                to_embed.append(position)
+            else:
+                vectors[position] = previous.vectors[row]
+                self._reused[row] = True
+
+        unchanged = len(hashes) - len(to_embed)
+        self.added += len(to_embed)
+        self.unchanged += unchanged
+        return IncrementalPlan(vectors=vectors, to_embed=to_embed, unchanged=unchanged)
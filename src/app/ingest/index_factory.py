@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import json
+import math
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+
+from src.app import settings
+
+ENV_INDEX_TYPE = "FAISS_INDEX_TYPE"
+ENV_INDEX_NLIST = "FAISS_NLIST"
+ENV_INDEX_NPROBE = "FAISS_NPROBE"
+ENV_INDEX_HNSW_M = "FAISS_HNSW_M"
+ENV_INDEX_EF_CONSTRUCTION = "FAISS_EF_CONSTRUCTION"
+ENV_INDEX_EF_SEARCH = "FAISS_EF_SEARCH"
+ENV_INDEX_PQ_M = "FAISS_PQ_M"
+ENV_INDEX_PQ_BITS = "FAISS_PQ_BITS"
+
+INDEX_TYPES = ("flat", "sq8", "ivf", "ivfsq8", "ivfpq", "hnsw", "hnswsq8")
+
+DEFAULT_INDEX_TYPE = "flat"
+DEFAULT_NPROBE = 8
+DEFAULT_HNSW_M = 32
+DEFAULT_EF_CONSTRUCTION = 40
+DEFAULT_EF_SEARCH = 64
+DEFAULT_PQ_M = 16
+DEFAULT_PQ_BITS = 8
+
+MIN_POINTS_PER_CENTROID = 39
+MAX_TRAINING_POINTS_PER_CENTROID = 256
+REPORT_FILENAME = "index_report.json"
+REPORT_QUERIES = 200
+REPORT_K = 10
+NPROBE_SWEEP = (1, 2, 4, 8, 16, 32, 64, 128)
+EF_SEARCH_SWEEP = (16, 32, 64, 128, 256)
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    index_type: str = DEFAULT_INDEX_TYPE
+    nlist: int = 0
+    nprobe: int = DEFAULT_NPROBE
+    hnsw_m: int = DEFAULT_HNSW_M
+    ef_construction: int = DEFAULT_EF_CONSTRUCTION
+    ef_search: int = DEFAULT_EF_SEARCH
+    pq_m: int = DEFAULT_PQ_M
+    pq_bits: int = DEFAULT_PQ_BITS
+
+    @classmethod
+    def from_env(cls) -> "IndexConfig":
+        config = cls(
+            index_type=settings.get_str(ENV_INDEX_TYPE, DEFAULT_INDEX_TYPE).lower(),
+            nlist=settings.get_int(ENV_INDEX_NLIST, 0),
+            nprobe=settings.get_int(ENV_INDEX_NPROBE, DEFAULT_NPROBE),
+            hnsw_m=settings.get_int(ENV_INDEX_HNSW_M, DEFAULT_HNSW_M),
+            ef_construction=settings.get_int(ENV_INDEX_EF_CONSTRUCTION, DEFAULT_EF_CONSTRUCTION),
+            ef_search=settings.get_int(ENV_INDEX_EF_SEARCH, DEFAULT_EF_SEARCH),
+            pq_m=settings.get_int(ENV_INDEX_PQ_M, DEFAULT_PQ_M),
+            pq_bits=settings.get_int(ENV_INDEX_PQ_BITS, DEFAULT_PQ_BITS),
+        )
+        config.validate()
+        return config
+
+    def validate(self) -> None:
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"FAISS_INDEX_TYPE must be one of {', '.join(INDEX_TYPES)}; got {self.index_type!r}."
+            )
+        if self.nlist < 0:
+            raise ValueError("FAISS_NLIST must be zero (automatic) or a positive integer.")
+        for name, value in (
+            ("FAISS_NPROBE", self.nprobe),
+            ("FAISS_HNSW_M", self.hnsw_m),
+            ("FAISS_EF_CONSTRUCTION", self.ef_construction),
+            ("FAISS_EF_SEARCH", self.ef_search),
+            ("FAISS_PQ_M", self.pq_m),
+        ):
+            if value <= 0:
+                raise ValueError(f"{name} must be greater than zero.")
+        if not 1 <= self.pq_bits <= 16:
+            raise ValueError("FAISS_PQ_BITS must be between 1 and 16.")
+
+
+def _auto_nlist(count: int) -> int:
+    return max(1, min(int(4 * math.sqrt(count)), count // MIN_POINTS_PER_CENTROID))
+
+
+def _pq_subquantizers(dim: int, requested: int) -> int:
+    for m in range(min(requested, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def resolve_factory(config: IndexConfig, dim: int, count: int) -> Tuple[str, Dict[str, object]]:
+    index_type = config.index_type
+    info: Dict[str, object] = {"requested_type": index_type}
+
+    needs_ivf = index_type.startswith("ivf")
+    nlist = config.nlist or _auto_nlist(count)
+    if needs_ivf and count < nlist * MIN_POINTS_PER_CENTROID:
+        nlist = _auto_nlist(count)
+    if needs_ivf and count < MIN_POINTS_PER_CENTROID * 2:
+        info["fallback_reason"] = f"{count} vectors are too few to train IVF centroids"
+        index_type = "flat"
+
+    pq_m = _pq_subquantizers(dim, config.pq_m)
+    if index_type == "ivfpq" and count < MIN_POINTS_PER_CENTROID * (2 ** config.pq_bits):
+        info["fallback_reason"] = (
+            f"{count} vectors are too few to train {config.pq_bits}-bit PQ codebooks"
+        )
+        index_type = "ivfsq8"
+
+    if index_type == "flat":
+        spec = "Flat"
+    elif index_type == "sq8":
+        spec = "SQ8"
+    elif index_type == "ivf":
+        spec = f"IVF{nlist},Flat"
+    elif index_type == "ivfsq8":
+        spec = f"IVF{nlist},SQ8"
+    elif index_type == "ivfpq":
+        spec = f"IVF{nlist},PQ{pq_m}x{config.pq_bits}"
+    elif index_type == "hnsw":
+        spec = f"HNSW{config.hnsw_m}"
+    else:
+        spec = f"HNSW{config.hnsw_m}_SQ8"
+
+    info.update(
+        {
+            "type": index_type,
+            "factory": spec,
+            "metric": "l2",
+            "dimension": dim,
+            "vector_count": count,
+        }
+    )
+    if index_type.startswith("ivf"):
+        info["nlist"] = nlist
+        info["search_params"] = {"nprobe": min(config.nprobe, nlist)}
+    if index_type == "ivfpq":
+        info["pq_m"] = pq_m
+        info["pq_bits"] = config.pq_bits
+    if index_type.startswith("hnsw"):
+        info["hnsw_m"] = config.hnsw_m
+        info["ef_construction"] = config.ef_construction
+        info["search_params"] = {"efSearch": config.ef_search}
+    info.setdefault("search_params", {})
+    return spec, info
+
+
+def apply_search_params(index: faiss.Index, params: Dict[str, object]) -> None:
+    space = faiss.ParameterSpace()
+    for name, value in params.items():
+        if value is None:
+            continue
+        space.set_index_parameter(index, name, float(value) if name == "efSearch" else int(value))
+
+
+def build_faiss_index(
+    vectors: np.ndarray,
+    config: IndexConfig,
+) -> Tuple[faiss.Index, Dict[str, object]]:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    spec, info = resolve_factory(config, dim, count)
+
+    index = faiss.index_factory(dim, spec, faiss.METRIC_L2)
+    if info["type"].startswith("hnsw"):
+        faiss.downcast_index(index).hnsw.efConstruction = config.ef_construction
+
+    started = time.perf_counter()
+    if not index.is_trained:
+        nlist = int(info.get("nlist") or 1)
+        train_size = min(count, max(nlist, 2 ** config.pq_bits) * MAX_TRAINING_POINTS_PER_CENTROID)
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(count, size=train_size, replace=False)] if train_size < count else vectors
+        index.train(sample)
+    info["train_seconds"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    index.add(vectors)
+    info["add_seconds"] = round(time.perf_counter() - started, 3)
+
+    apply_search_params(index, info["search_params"])
+    return index, info
+
+
+def _percentile_ms(samples: List[float], pct: float) -> float:
+    return round(float(np.percentile(samples, pct)) * 1000, 4) if samples else 0.0
+
+
+def _measure(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    hits = 0
+    for row, query in enumerate(queries):
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - started)
+        hits += len(set(ids[0].tolist()) & set(truth[row].tolist()))
+    return {
+        "recall_at_k": round(hits / float(truth.size), 4) if truth.size else 1.0,
+        "p50_ms": _percentile_ms(latencies, 50),
+        "p95_ms": _percentile_ms(latencies, 95),
+        "p99_ms": _percentile_ms(latencies, 99),
+    }
+
+
+def _exact_search(vectors: np.ndarray, queries: np.ndarray, k: int) -> Tuple[np.ndarray, Dict[str, float]]:
+    latencies: List[float] = []
+    truth = np.empty((len(queries), k), dtype=np.int64)
+    for row, query in enumerate(queries):
+        started = time.perf_counter()
+        _, ids = faiss.knn(query.reshape(1, -1), vectors, k)
+        latencies.append(time.perf_counter() - started)
+        truth[row] = ids[0]
+    return truth, {
+        "recall_at_k": 1.0,
+        "p50_ms": _percentile_ms(latencies, 50),
+        "p95_ms": _percentile_ms(latencies, 95),
+        "p99_ms": _percentile_ms(latencies, 99),
+    }
+
+
+def evaluate_index(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    info: Dict[str, object],
+    k: int = REPORT_K,
+    query_count: int = REPORT_QUERIES,
+) -> Dict[str, object]:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    k = min(k, count)
+    rng = np.random.default_rng(1)
+    rows = rng.choice(count, size=min(query_count, count), replace=False)
+    noise = rng.normal(scale=0.01, size=(len(rows), dim)).astype(np.float32)
+    queries = vectors[rows] + noise
+
+    truth, exact = _exact_search(vectors, queries, k)
+
+    report: Dict[str, object] = {
+        "k": k,
+        "queries": len(rows),
+        "exact": exact,
+        "configured": {**info["search_params"], **_measure(index, queries, truth, k)},
+    }
+
+    sweep: List[Dict[str, object]] = []
+    if info["type"].startswith("ivf"):
+        nlist = int(info["nlist"])
+        for nprobe in [value for value in NPROBE_SWEEP if value <= nlist]:
+            apply_search_params(index, {"nprobe": nprobe})
+            sweep.append({"nprobe": nprobe, **_measure(index, queries, truth, k)})
+    elif info["type"].startswith("hnsw"):
+        for ef_search in EF_SEARCH_SWEEP:
+            apply_search_params(index, {"efSearch": ef_search})
+            sweep.append({"efSearch": ef_search, **_measure(index, queries, truth, k)})
+    apply_search_params(index, info["search_params"])
+
+    report["sweep"] = sweep
+    return report
+
+
+def save_index_report(
+    storage_dir: Union[str, Path],
+    config: IndexConfig,
+    info: Dict[str, object],
+    report: Dict[str, object],
+) -> Path:
+    report_path = Path(storage_dir) / REPORT_FILENAME
+    with report_path.open("w", encoding="utf-8") as f:
+        json.dump({"config": asdict(config), "index": info, "report": report}, f, indent=2)
+    return report_path
+
+
+def search_params_from_env(info: Dict[str, object]) -> Dict[str, object]:
+    params = dict(info.get("search_params") or {})
+    if "nprobe" in params:
+        params["nprobe"] = settings.get_int(ENV_INDEX_NPROBE, int(params["nprobe"]))
+    if "efSearch" in params:
+        params["efSearch"] = settings.get_int(ENV_INDEX_EF_SEARCH, int(params["efSearch"]))
+    return params
+
+
+def load_index_info(storage_dir: Union[str, Path]) -> Optional[Dict[str, object]]:
+    manifest_path = Path(storage_dir) / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    with manifest_path.open("r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest.get("index")
@@ -2,24 +2,65 @@ from __future__ import annotations
 
 import json
 import os
+import shutil
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterable, List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 
 from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from src.app import settings
+from src.app.ingest.dedup import DedupConfig, Deduplicator
+from src.app.ingest.embedding_pipeline import (
+    EMBED_CHECKPOINT_DIRNAME,
+    BatchEmbedder,
+    EmbeddingCheckpoint,
+    EmbedSettings,
+    ProgressCallback,
+)
+from src.app.ingest.incremental import (
+    CHUNK_HASH_ALGORITHM,
+    CHUNK_HASHES_FILENAME,
+    DEFAULT_INDEX_INCREMENTAL,
+    ENV_INDEX_INCREMENTAL,
+    VECTORS_FILENAME,
+    ChangeTracker,
+    ChunkDataWriter,
+    chunk_hash,
+    load_previous_index,
+)
+from src.app.ingest.index_factory import (
+    IndexConfig,
+    build_faiss_index,
+    evaluate_index,
+    save_index_report,
+)
+from src.app.ingest.pipeline import batched, clean_documents, prefetch, prefetch_depth, stream_batch_size
+from src.app.rag.docstore import DOCSTORE_FORMAT, DocstoreWriter, remove_index_files, write_index
+from src.app.rag.embeddings import (
+    DEFAULT_EMBED_CACHE_ENABLED,
+    EMBED_CACHE_FILENAME,
+    ENV_EMBED_CACHE_ENABLED,
+    CachedEmbeddings,
+)
+from src.app.rag.versions import new_version_id, prune_versions, publish_version, version_dir
+
 ENV_BASE_URL = "OLLAMA_BASE_URL"
 ENV_EMBED_MODEL = "OLLAMA_EMBED_MODEL"
+ENV_INDEX_REPORT = "FAISS_INDEX_REPORT"
+ENV_KEEP_VERSIONS = "INDEX_KEEP_VERSIONS"
 
 DEFAULT_BASE_URL = "http://localhost:11434"
 DEFAULT_EMBED_MODEL = "nomic-embed-text"
 
 DEFAULT_CHUNK_SIZE = 1000
 DEFAULT_CHUNK_OVERLAP = 150
+DEFAULT_INDEX_REPORT = True
+DEFAULT_KEEP_VERSIONS = 3
 
 
 @dataclass(frozen=True)
@@ -28,6 +69,15 @@ class IndexStats:
     chunk_count: int
     storage_dir: Path
     manifest_path: Path
+    index_type: str = "flat"
+    report_path: Optional[Path] = None
+    version: Optional[str] = None
+    pruned_versions: tuple = ()
+    added: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    base_version: Optional[str] = None
+    duplicates: int = 0
 
 
 def split_documents(
@@ -38,10 +88,25 @@ def split_documents(
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
+        add_start_index=True,
     )
     return splitter.split_documents(list(docs))
 
 
+def iter_chunks(
+    docs: Iterable[Document],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+) -> Iterator[Document]:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        add_start_index=True,
+    )
+    for doc in docs:
+        yield from splitter.split_documents([doc])
+
+
 def get_ollama_settings() -> tuple[str, str]:
     base_url = os.getenv(ENV_BASE_URL, DEFAULT_BASE_URL).strip()
     model = os.getenv(ENV_EMBED_MODEL, DEFAULT_EMBED_MODEL).strip()
@@ -63,9 +128,21 @@ def get_embeddings(base_url: str, model: str) -> OllamaEmbeddings:
     )
 
 
-def probe_embeddings(base_url: str, model: str, embeddings: OllamaEmbeddings) -> None:
+def probe_embeddings(
+    base_url: str,
+    model: str,
+    embeddings: OllamaEmbeddings,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> None:
+    probe: Embeddings = embeddings
+    if cache_dir is not None and settings.get_bool(
+        ENV_EMBED_CACHE_ENABLED, DEFAULT_EMBED_CACHE_ENABLED
+    ):
+        probe = CachedEmbeddings(
+            embeddings, model=model, path=Path(cache_dir) / EMBED_CACHE_FILENAME
+        )
     try:
-        embeddings.embed_query("ping")
+        probe.embed_query("ping")
     except Exception as exc:  # noqa: BLE001 -
         message = str(exc).lower()
         if "connect" in message or "connection" in message or "refused" in message:
@@ -107,6 +184,9 @@ def save_manifest(
     base_url: str,
     embed_model: str,
     vector_store: str,
+    index_info: Optional[Dict[str, object]] = None,
+    chunk_info: Optional[Dict[str, object]] = None,
+    dedup_info: Optional[Dict[str, object]] = None,
 ) -> Path:
     storage_path = Path(storage_dir)
     storage_path.mkdir(parents=True, exist_ok=True)
@@ -128,9 +208,15 @@ def save_manifest(
         },
         "vector_store": {
             "type": vector_store,
+            "format": DOCSTORE_FORMAT,
             "path": str(storage_path.resolve()),
         },
+        "index": index_info or {"type": "flat", "factory": "Flat", "search_params": {}},
     }
+    if chunk_info is not None:
+        manifest["chunks"] = chunk_info
+    if dedup_info is not None:
+        manifest["dedup"] = dedup_info
 
     manifest_path = storage_path / "manifest.json"
     with manifest_path.open("w", encoding="utf-8") as f:
@@ -145,43 +231,161 @@ def index_documents(
     storage_dir: Union[str, Path] = "storage",
     chunk_size: int = DEFAULT_CHUNK_SIZE,
     chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+    index_config: Optional[IndexConfig] = None,
+    embed_settings: Optional[EmbedSettings] = None,
+    progress: Optional[ProgressCallback] = None,
+    dedup_config: Optional[DedupConfig] = None,
 ) -> IndexStats:
-    docs_list = list(docs)
-    if not docs_list:
-        raise ValueError("No documents were received for indexing.")
+    if index_config is None:
+        index_config = IndexConfig.from_env()
+    else:
+        index_config.validate()
+    if embed_settings is None:
+        embed_settings = EmbedSettings.from_env()
+    else:
+        embed_settings.validate()
 
-    chunks = split_documents(
-        docs_list,
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-    )
-    if not chunks:
-        raise ValueError("The chunking process produced no results. Check the content of the documents.")
+    deduplicator = Deduplicator(dedup_config)
 
     storage_path = ensure_storage_dir(storage_dir)
+    version = new_version_id()
+    build_path = ensure_storage_dir(version_dir(storage_path, version))
 
     base_url, embed_model = get_ollama_settings()
-    embeddings = get_embeddings(base_url=base_url, model=embed_model)
-    probe_embeddings(base_url=base_url, model=embed_model, embeddings=embeddings)
+    previous = None
+    if settings.get_bool(ENV_INDEX_INCREMENTAL, DEFAULT_INDEX_INCREMENTAL):
+        previous = load_previous_index(storage_path, embed_model)
+    tracker = ChangeTracker(previous)
 
-    vector_index = FAISS.from_documents(chunks, embeddings)
-    vector_index.save_local(str(storage_path))
+    doc_count = 0
 
-    manifest_path = save_manifest(
-        storage_dir=storage_path,
+    def counted(items: Iterable[Document]) -> Iterator[Document]:
+        nonlocal doc_count
+        for doc in items:
+            doc_count += 1
+            yield doc
+
+    chunk_batches = prefetch(
+        batched(
+            deduplicator.filter(
+                iter_chunks(counted(clean_documents(docs)), chunk_size, chunk_overlap)
+            ),
+            stream_batch_size(),
+        ),
+        prefetch_depth(),
+    )
+
+    checkpoint = None
+    embedder: Optional[BatchEmbedder] = None
+    chunk_data = ChunkDataWriter(build_path)
+    try:
+        with DocstoreWriter(build_path) as docstore:
+            for chunks in chunk_batches:
+                hashes = [chunk_hash(chunk) for chunk in chunks]
+                plan = tracker.plan(hashes)
+                vectors = plan.vectors
+                if plan.to_embed:
+                    if embedder is None:
+                        embeddings = get_embeddings(base_url=base_url, model=embed_model)
+                        probe_embeddings(
+                            base_url=base_url,
+                            model=embed_model,
+                            embeddings=embeddings,
+                            cache_dir=storage_path,
+                        )
+                        if embed_settings.checkpoint:
+                            checkpoint = EmbeddingCheckpoint(
+                                storage_path / EMBED_CHECKPOINT_DIRNAME, embed_model
+                            )
+                        embedder = BatchEmbedder(embeddings, embed_settings, checkpoint, progress)
+                    embedded = embedder.embed(
+                        [chunks[i].page_content for i in plan.to_embed],
+                        [hashes[i] for i in plan.to_embed],
+                    )
+                    if vectors.shape[1] == 0:
+                        vectors = embedded
+                    elif embedded.shape[1] != vectors.shape[1]:
+                        raise ValueError(
+                            f"Embedding dimension changed from {vectors.shape[1]} to "
+                            f"{embedded.shape[1]} with the same model; set "
+                            f"{ENV_INDEX_INCREMENTAL}=false to rebuild."
+                        )
+                    else:
+                        vectors[plan.to_embed] = embedded
+                docstore.add_all(chunks)
+                chunk_data.add(hashes, vectors)
+        vectors = chunk_data.close()
+        deduplicator.save(build_path)
+    except BaseException:
+        chunk_data.discard()
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise
+    finally:
+        chunk_batches.close()
+        if embedder is not None:
+            embedder.close()
+
+    if not doc_count:
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise ValueError("No documents were received for indexing.")
+    if not chunk_data.count:
+        shutil.rmtree(build_path, ignore_errors=True)
+        raise ValueError("The chunking process produced no results. Check the content of the documents.")
+
+    faiss_index, index_info = build_faiss_index(vectors, index_config)
+
+    report_path = None
+    if settings.get_bool(ENV_INDEX_REPORT, DEFAULT_INDEX_REPORT):
+        report = evaluate_index(faiss_index, vectors, index_info)
+        report_path = save_index_report(build_path, index_config, index_info, report)
+        index_info["recall_at_k"] = report["configured"]["recall_at_k"]
+        index_info["report"] = report_path.name
+
+    write_index(build_path, faiss_index)
+    del faiss_index, vectors
+
+    save_manifest(
+        storage_dir=build_path,
         seeds=seeds or [],
-        doc_count=len(docs_list),
-        chunk_count=len(chunks),
+        doc_count=doc_count,
+        chunk_count=chunk_data.count,
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         base_url=base_url,
         embed_model=embed_model,
         vector_store="faiss",
+        index_info=index_info,
+        chunk_info={
+            "hash": CHUNK_HASH_ALGORITHM,
+            "hashes_file": CHUNK_HASHES_FILENAME,
+            "vectors_file": VECTORS_FILENAME,
+            "base_version": tracker.base_version,
+            "added": tracker.added,
+            "removed": tracker.removed,
+            "unchanged": tracker.unchanged,
+        },
+        dedup_info=deduplicator.stats(),
+    )
+    manifest_path = publish_version(storage_path, version)
+    if checkpoint is not None:
+        checkpoint.clear()
+    remove_index_files(storage_path)
+    pruned = prune_versions(
+        storage_path, settings.get_int(ENV_KEEP_VERSIONS, DEFAULT_KEEP_VERSIONS)
     )
 
     return IndexStats(
-        doc_count=len(docs_list),
-        chunk_count=len(chunks),
+        doc_count=doc_count,
+        chunk_count=chunk_data.count,
         storage_dir=storage_path,
         manifest_path=manifest_path,
+        index_type=str(index_info["type"]),
+        report_path=report_path,
+        version=version,
+        pruned_versions=tuple(pruned),
+        added=tracker.added,
+        removed=tracker.removed,
+        unchanged=tracker.unchanged,
+        base_version=tracker.base_version,
+        duplicates=deduplicator.duplicates,
     )
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import glob
+from collections import deque
 from datetime import datetime, timezone
-from typing import Iterable, List, Optional
+from typing import Deque, Iterable, Iterator, List, Optional, Sized, Union
 from pathlib import Path
 
 import requests
-from bs4 import BeautifulSoup
 from langchain_core.documents import Document
-from langchain_community.document_loaders import PyPDFLoader
+
+from src.app import settings
+from src.app.ingest.fetch_cache import FetchCache, build_fetch_cache
+from src.app.ingest.parsing import (
+    ParsePool,
+    extract_text,
+    extract_title,
+    parse_html,
+    parse_pdf_pages,
+    pdf_page_ranges,
+)
 
 
 DEFAULT_SEEDS = [
@@ -15,76 +26,154 @@ DEFAULT_SEEDS = [
     "https://www.promtior.ai/service",
 ]
 
+USER_AGENT = "Mozilla/5.0 (compatible; RAGLoader/1.0; +https://www.promtior.ai/)"
+ROBOTS_AGENT = "RAGLoader"
+
+ENV_CRAWL_ENABLED = "CRAWL_ENABLED"
+
+DEFAULT_CRAWL_ENABLED = False
+
+_session: Optional[requests.Session] = None
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers["User-Agent"] = USER_AGENT
+    return _session
+
 def fetch_page(url: str, timeout: int = 20) -> str:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; RAGLoader/1.0; +https://www.promtior.ai/)"
-    }
-    response = requests.get(url, headers=headers, timeout=timeout)
+    response = _get_session().get(url, timeout=timeout)
     response.raise_for_status()
     response.encoding = response.apparent_encoding
     return response.text   
 
-def extract_title(soup: BeautifulSoup) -> str:
-    if soup.title and soup.title.string:
-        return soup.title.string.strip()
-    h1 = soup.find("h1")
-    if h1 and h1.get_text(strip=True):
-        return h1.get_text(strip=True)
-    return "untitled"
-
-def extract_text(html: BeautifulSoup) -> str:
-    soup = BeautifulSoup(html, "lxml")
-
-    for tag in soup(["script", "style", "noscript", "svg", "footer", "header", "nav"]):
-        tag.decompose()
-    
-    text = soup.get_text(separator=" ", strip=True)
-    text = " ".join(text.split())
-    return text
-
-def load_urls(urls: Optional[Iterable[str]] = None) -> List[Document]:
+def iter_urls(
+    urls: Optional[Iterable[str]] = None,
+    cache: Optional[FetchCache] = None,
+    pool: Optional[ParsePool] = None,
+) -> Iterator[Document]:
     if urls is None:
         urls = DEFAULT_SEEDS
 
-    documents: List[Document] = []
     fetched_at = datetime.now(timezone.utc).isoformat()
-
-    for url in urls:
-        html = fetch_page(url)
-        soup = BeautifulSoup(html, "lxml")
-        title = extract_title(soup)
-        text = extract_text(html)
-
+    owns_pool = pool is None
+    if pool is None:
+        pool = ParsePool(tasks=len(urls) if isinstance(urls, Sized) else None)
+    pending: Deque[tuple] = deque()
+
+    def finish(url, result, response) -> Document:
+        if response is None:
+            return result
+        page = result.result()
         doc = Document(
-            page_content=text,
+            page_content=page.text,
             metadata={
                 "source": url,
                 "fetched_at": fetched_at,
-                "title": title,
+                "title": page.title,
             },
         )
-        documents.append(doc)
-    
-    return documents
-
-def load_presentation_pdf(pdf_path: str) -> List[Document]:
+        if cache is not None:
+            cache.put(url, response.headers, response.content, doc, list(page.links))
+        return doc
+
+    try:
+        for url in urls:
+            if cache is None:
+                response = _get_session().get(url, timeout=20)
+            else:
+                cached = cache.get(url)
+                response = _get_session().get(
+                    url, headers=cache.conditional_headers(cached), timeout=20
+                )
+                hit = cache.resolve(cached, response.status_code, response.headers, response.content)
+                if hit is not None:
+                    pending.append((url, hit.document, None))
+                    continue
+            response.raise_for_status()
+            response.encoding = response.apparent_encoding
+            pending.append((url, pool.submit(parse_html, response.text, response.url), response))
+
+            while len(pending) > pool.workers:
+                yield finish(*pending.popleft())
+        while pending:
+            yield finish(*pending.popleft())
+    finally:
+        if owns_pool:
+            pool.close()
+
+def load_urls(
+    urls: Optional[Iterable[str]] = None,
+    cache: Optional[FetchCache] = None,
+) -> List[Document]:
+    return list(iter_urls(urls, cache=cache))
+
+def iter_web_documents(
+    urls: Optional[Iterable[str]] = None,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> Iterator[Document]:
+    if urls is None:
+        urls = DEFAULT_SEEDS
+    cache = build_fetch_cache(cache_dir)
+    try:
+        if settings.get_bool(ENV_CRAWL_ENABLED, DEFAULT_CRAWL_ENABLED):
+            from src.app.ingest.crawler import crawl_site
+
+            yield from crawl_site(urls, cache=cache)
+        else:
+            yield from iter_urls(urls, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+def load_web_documents(
+    urls: Optional[Iterable[str]] = None,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> List[Document]:
+    return list(iter_web_documents(urls, cache_dir=cache_dir))
+
+def resolve_pdf_paths(pdf_path: Union[str, Path]) -> List[Path]:
     path = Path(pdf_path)
-    loader = PyPDFLoader(str(path))
-    docs = loader.load()
-
-    normalized_docs: List[Document] = []
-
-    for d in docs:
-        page_number = d.metadata.get("page", 0)
-
-        normalized_docs.append(
-            Document(
-                page_content=d.page_content,
-                metadata={
-                    "source": f"presentation{path.name}#page={page_number + 1}",
-                    "source_type": "presentation",
-                },
-            )
-        )
-
-    return normalized_docs
\ No newline at end of file
+    if path.is_file():
+        return [path]
+    if path.is_dir():
+        paths = sorted(p for p in path.rglob("*") if p.suffix.lower() == ".pdf" and p.is_file())
+    elif glob.has_magic(str(pdf_path)):
+        paths = sorted(Path(p) for p in glob.glob(str(pdf_path), recursive=True) if Path(p).is_file())
+    else:
+        raise FileNotFoundError(f"PDF path does not exist: {pdf_path}")
+    if not paths:
+        raise FileNotFoundError(f"No PDF files found at: {pdf_path}")
+    return paths
+
+def iter_presentation_pdf(
+    pdf_path: Union[str, Path],
+    pool: Optional[ParsePool] = None,
+) -> Iterator[Document]:
+    return _iter_pdf_pages(resolve_pdf_paths(pdf_path), pool)
+
+def _iter_pdf_pages(paths: List[Path], pool: Optional[ParsePool]) -> Iterator[Document]:
+    owns_pool = pool is None
+    if pool is None:
+        pool = ParsePool()
+
+    tasks = pdf_page_ranges([str(path) for path in paths], pool)
+    try:
+        for path, pages in pool.map_ordered(parse_pdf_pages, tasks):
+            name = Path(path).name
+            for page_number, text in pages:
+                yield Document(
+                    page_content=text,
+                    metadata={
+                        "source": f"presentation{name}#page={page_number + 1}",
+                        "source_type": "presentation",
+                    },
+                )
+    finally:
+        if owns_pool:
+            pool.close()
+
+def load_presentation_pdf(pdf_path: Union[str, Path]) -> List[Document]:
+    return list(iter_presentation_pdf(pdf_path))
\ No newline at end of file
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple, TypeVar
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from src.app import settings
+
+ENV_INGEST_PARSE_WORKERS = "INGEST_PARSE_WORKERS"
+
+DEFAULT_INGEST_PARSE_WORKERS = 0
+
+PDF_PAGES_PER_TASK = 8
+PDF_READER_CACHE_SIZE = 4
+STRIPPED_TAGS = ["script", "style", "noscript", "svg", "footer", "header", "nav"]
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ParsedPage:
+    title: str
+    text: str
+    links: Tuple[str, ...] = ()
+
+
+def extract_title(soup: BeautifulSoup) -> str:
+    if soup.title and soup.title.string:
+        return soup.title.string.strip()
+    h1 = soup.find("h1")
+    if h1 and h1.get_text(strip=True):
+        return h1.get_text(strip=True)
+    return "untitled"
+
+
+def clean_text(soup: BeautifulSoup) -> str:
+    for tag in soup(STRIPPED_TAGS):
+        tag.decompose()
+
+    text = soup.get_text(separator=" ", strip=True)
+    return " ".join(text.split())
+
+
+def extract_text(html: str) -> str:
+    return clean_text(BeautifulSoup(html, "lxml"))
+
+
+def parse_html(html: str, base_url: Optional[str] = None) -> ParsedPage:
+    soup = BeautifulSoup(html, "lxml")
+    title = extract_title(soup)
+    links: Tuple[str, ...] = ()
+    if base_url is not None:
+        links = tuple(urljoin(base_url, anchor["href"]) for anchor in soup.find_all("a", href=True))
+    return ParsedPage(title=title, text=clean_text(soup), links=links)
+
+
+@lru_cache(maxsize=PDF_READER_CACHE_SIZE)
+def _cached_pdf_reader(path: str, mtime_ns: int, size: int):
+    from pypdf import PdfReader
+
+    return PdfReader(path)
+
+
+def _pdf_reader(path: str):
+    stat = os.stat(path)
+    return _cached_pdf_reader(path, stat.st_mtime_ns, stat.st_size)
+
+
+def parse_pdf_pages(path: str, start: int, stop: int) -> Tuple[str, List[Tuple[int, str]]]:
+    reader = _pdf_reader(path)
+    return path, [(number, reader.pages[number].extract_text().strip()) for number in range(start, stop)]
+
+
+def pdf_page_count(path: str) -> int:
+    return len(_pdf_reader(path).pages)
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    if workers is None:
+        workers = settings.get_int(ENV_INGEST_PARSE_WORKERS, DEFAULT_INGEST_PARSE_WORKERS)
+    if workers < 0:
+        raise ValueError("INGEST_PARSE_WORKERS must not be negative (0 uses every core).")
+    return workers or os.cpu_count() or 1
+
+
+class ParsePool:
+    def __init__(self, workers: Optional[int] = None, tasks: Optional[int] = None) -> None:
+        self.workers = resolve_workers(workers)
+        if tasks is not None:
+            self.workers = max(1, min(self.workers, tasks))
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, fn: Callable[..., T], *args) -> "Future[T]":
+        if self.workers <= 1:
+            future: "Future[T]" = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:  # noqa: BLE001 - delivered through the future
+                future.set_exception(exc)
+            return future
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=get_context("spawn")
+            )
+        return self._executor.submit(fn, *args)
+
+    def map_ordered(
+        self,
+        fn: Callable[..., T],
+        calls: Iterable[tuple],
+        window: Optional[int] = None,
+    ) -> Iterator[T]:
+        window = window or self.workers * 2
+        pending: Deque["Future[T]"] = deque()
+        for args in calls:
+            pending.append(self.submit(fn, *args))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        _cached_pdf_reader.cache_clear()
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def pdf_page_ranges(
+    paths: Iterable[str],
+    pool: ParsePool,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+) -> Iterator[Tuple[str, int, int]]:
+    paths = list(paths)
+    counts = pool.map_ordered(pdf_page_count, ((path,) for path in paths))
+    for path, count in zip(paths, counts):
+        for start in range(0, count, pages_per_task):
+            yield path, start, min(start + pages_per_task, count)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Iterable, Iterator, List, TypeVar
+
+from langchain_core.documents import Document
+
+from src.app import settings
+
+ENV_INGEST_STREAM_BATCH_SIZE = "INGEST_STREAM_BATCH_SIZE"
+ENV_INGEST_PREFETCH_BATCHES = "INGEST_PREFETCH_BATCHES"
+
+DEFAULT_INGEST_STREAM_BATCH_SIZE = 512
+DEFAULT_INGEST_PREFETCH_BATCHES = 2
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    if size <= 0:
+        raise ValueError("Batch size must be greater than zero.")
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Failure:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def prefetch(items: Iterable[T], depth: int) -> Iterator[T]:
+    if depth <= 0:
+        yield from items
+        return
+
+    buffer: "queue.Queue[object]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce() -> None:
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                while not stop.is_set():
+                    try:
+                        buffer.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            buffer.put(_DONE)
+        except BaseException as exc:  # noqa: BLE001 - handed to the consumer thread
+            buffer.put(_Failure(exc))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=produce, name="ingest-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                producer.join(timeout=0.1)
+
+
+def clean_documents(docs: Iterable[Document]) -> Iterator[Document]:
+    for doc in docs:
+        if doc.page_content and doc.page_content.strip():
+            yield doc
+
+
+def stream_batch_size() -> int:
+    size = settings.get_int(ENV_INGEST_STREAM_BATCH_SIZE, DEFAULT_INGEST_STREAM_BATCH_SIZE)
+    if size <= 0:
+        raise ValueError("INGEST_STREAM_BATCH_SIZE must be greater than zero.")
+    return size
+
+
+def prefetch_depth() -> int:
+    depth = settings.get_int(ENV_INGEST_PREFETCH_BATCHES, DEFAULT_INGEST_PREFETCH_BATCHES)
+    if depth < 0:
+        raise ValueError("INGEST_PREFETCH_BATCHES must not be negative.")
+    return depth
@@ -1,39 +1,253 @@
 from __future__ import annotations
 
+import json
 import os
+import secrets
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Optional
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from langserve import add_routes
 
-from src.app.rag.chain import build_chain
+from src.app import settings
+from src.app.locks import exclusive_lock
+from src.app.metrics import (
+    CONTENT_TYPE,
+    DEFAULT_SERVER_TIMING,
+    ENV_SERVER_TIMING,
+    TRACE_HEADER,
+    end_trace,
+    render_metrics,
+    start_trace,
+    trace_id_from,
+)
+from src.app.rag.cache import build_answer_cache
+from src.app.rag.chain import (
+    build_chain,
+    get_query_embeddings,
+    manifest_path,
+    open_index,
+    warm_up_embeddings,
+    warm_up_llm,
+)
+from src.app.rag.registry import Collection, build_collection_registry
+from src.app.rag.reloader import DEFAULT_INDEX_WATCH_INTERVAL, ENV_INDEX_WATCH_INTERVAL
+from src.app.rag.scheduler import (
+    PRIORITY_HEADER,
+    Scheduler,
+    SchedulerBusy,
+    parse_priority,
+    reset_priority,
+    set_priority,
+)
+from src.app.rag.sessions import (
+    InvalidSessionId,
+    UnknownSession,
+    build_session_store,
+    session_from_input,
+)
+from src.app.rag.versions import resolve_index_dir
+from src.app.startup import (
+    DEFAULT_STARTUP_RETRY_SECONDS,
+    DEFAULT_STARTUP_WARMUP,
+    ENV_STARTUP_RETRY_SECONDS,
+    ENV_STARTUP_WARMUP,
+    Readiness,
+    start_background_startup,
+)
 
 DEFAULT_PORT = 8000
+ENV_WORKERS = "WEB_CONCURRENCY"
+BOOTSTRAP_LOCK_FILENAME = ".bootstrap.lock"
+ENV_ADMIN_TOKEN = "ADMIN_TOKEN"
+NOT_READY_RETRY_AFTER = "5"
+
+def _index_present(storage_dir: Path) -> bool:
+    from src.app.rag.docstore import has_docstore, raise_if_legacy
+
+    marker = storage_dir / "manifest.json"
+    if not marker.exists():
+        return False
+    index_dir = resolve_index_dir(storage_dir)
+    raise_if_legacy(index_dir)
+    return has_docstore(index_dir)
+
 
 def ensure_vectorstore() -> None:
     storage_dir = Path(os.getenv("VECTORSTORE_DIR", "storage"))
     storage_dir.mkdir(parents=True, exist_ok=True)
     
-    marker = storage_dir / "manifest.json"
-    if marker.exists():
+    if _index_present(storage_dir):
         return
-    
-    from src.app.ingest.loader import DEFAULT_SEEDS, load_urls
-    from src.app.ingest.indexer import index_documents
-
-    docs = load_urls(DEFAULT_SEEDS)
-    index_documents(
-        docs=docs,
-        seeds=DEFAULT_SEEDS,
-        storage_dir=storage_dir,
+
+    with exclusive_lock(storage_dir / BOOTSTRAP_LOCK_FILENAME):
+        if _index_present(storage_dir):
+            return
+
+        from src.app.ingest.loader import DEFAULT_SEEDS, iter_web_documents
+        from src.app.ingest.indexer import index_documents
+
+        docs = iter_web_documents(DEFAULT_SEEDS, cache_dir=storage_dir)
+        index_documents(
+            docs=docs,
+            seeds=DEFAULT_SEEDS,
+            storage_dir=storage_dir,
+        )
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    expected = os.getenv(ENV_ADMIN_TOKEN, "").strip()
+    if not expected:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled.")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+
+def _is_question(request: Request) -> bool:
+    path = request.url.path
+    return request.method == "POST" and (
+        path.startswith("/chat/")
+        or (path.startswith("/collections/") and path.endswith(("/invoke", "/stream")))
     )
 
 
+def _sse(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="Promtior RAG API", version="1.0.0")
+    answer_cache = build_answer_cache(manifest_path=manifest_path())
+    query_embeddings = get_query_embeddings()
+    index = open_index(query_embeddings, load=False)
+    scheduler = Scheduler()
+    sessions = build_session_store()
+    chain = build_chain(
+        answer_cache=answer_cache,
+        embeddings=query_embeddings,
+        index=index,
+        scheduler=scheduler,
+        sessions=sessions,
+    )
+    watch_interval = settings.get_float(ENV_INDEX_WATCH_INTERVAL, DEFAULT_INDEX_WATCH_INTERVAL)
+
+    def _open_collection(name: str, storage_dir: Path):
+        collection_index = open_index(query_embeddings, load=False, storage_dir=storage_dir)
+        collection_chain = build_chain(
+            answer_cache=build_answer_cache(manifest_path=collection_index.manifest_path),
+            embeddings=query_embeddings,
+            index=collection_index,
+            scheduler=scheduler,
+            sessions=sessions,
+            session_scope=name,
+        )
+        return collection_index, collection_chain
+
+    collections = build_collection_registry(
+        manifest_path().parent, _open_collection, watch_interval=watch_interval
+    )
+
+    def _load_index() -> None:
+        ensure_vectorstore()
+        index.reload(force=True)
+        index.start_watching(watch_interval)
+
+    steps = [("vectorstore", _load_index)]
+    if settings.get_bool(ENV_STARTUP_WARMUP, DEFAULT_STARTUP_WARMUP):
+        steps += [("embeddings", warm_up_embeddings), ("llm", warm_up_llm)]
+    readiness = Readiness(name for name, _ in steps)
+
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        stop = start_background_startup(
+            readiness,
+            steps,
+            retry_seconds=settings.get_float(
+                ENV_STARTUP_RETRY_SECONDS, DEFAULT_STARTUP_RETRY_SECONDS
+            ),
+        )
+        yield
+        stop.set()
+        index.stop_watching()
+        collections.close()
+
+    app = FastAPI(title="Promtior RAG API", version="1.0.0", lifespan=lifespan)
+
+    @app.middleware("http")
+    async def reject_until_loaded(request: Request, call_next):
+        if (
+            request.method == "POST"
+            and request.url.path.startswith("/chat/")
+            and not index.loaded
+        ):
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "The vector index is still loading."},
+                headers={"Retry-After": NOT_READY_RETRY_AFTER},
+            )
+        return await call_next(request)
+
+    def _busy_response(exc: SchedulerBusy) -> JSONResponse:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    @app.exception_handler(SchedulerBusy)
+    async def scheduler_busy(_request: Request, exc: SchedulerBusy):
+        return _busy_response(exc)
+
+    @app.exception_handler(InvalidSessionId)
+    async def invalid_session(_request: Request, exc: InvalidSessionId):
+        return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+    @app.exception_handler(UnknownSession)
+    async def unknown_session(_request: Request, exc: UnknownSession):
+        return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+    async def check_session(request: Request) -> None:
+        if request.method != "POST":
+            return
+        try:
+            payload = await request.json()
+        except ValueError:
+            return
+        if isinstance(payload, dict):
+            session_from_input(payload.get("input"), sessions)
+
+    @app.middleware("http")
+    async def admission_control(request: Request, call_next):
+        if not _is_question(request):
+            return await call_next(request)
+        priority = parse_priority(request.headers.get(PRIORITY_HEADER))
+        if scheduler.saturated(priority):
+            return _busy_response(scheduler.busy("queue full"))
+        token = set_priority(priority)
+        try:
+            return await call_next(request)
+        finally:
+            reset_priority(token)
 
+    server_timing = settings.get_bool(ENV_SERVER_TIMING, DEFAULT_SERVER_TIMING)
+
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        trace, token = start_trace(trace_id_from(request.headers.get(TRACE_HEADER)))
+        try:
+            response = await call_next(request)
+        finally:
+            end_trace(token)
+        response.headers[TRACE_HEADER] = trace.trace_id
+        if server_timing and trace.stages:
+            response.headers["Server-Timing"] = trace.server_timing()
+        return response
+
+    # Added last so it is the outermost middleware and early 429/503 replies carry CORS headers.
     allow_origins = [
         "http://localhost",
         "http://127.0.0.1",
@@ -48,20 +262,177 @@ def create_app() -> FastAPI:
         allow_credentials=False,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[TRACE_HEADER, "Server-Timing"],
     )
-    
+
     @app.get("/health")
     def health():
         return {"status": "ok"}    
 
-    ensure_vectorstore()
-    chain = build_chain()
+    @app.get("/ready")
+    def ready():
+        snapshot = readiness.snapshot()
+        snapshot["index"] = {"loaded": index.loaded, "version": index.version}
+        snapshot["pid"] = os.getpid()
+        return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
+
+    @app.get("/cache/stats")
+    def cache_stats():
+        if answer_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **answer_cache.stats()}
+
+    @app.get("/embeddings/stats")
+    def embeddings_stats():
+        stats = getattr(query_embeddings, "stats", None)
+        return stats() if stats is not None else {}
+
+    @app.get("/scheduler/stats")
+    def scheduler_stats():
+        return scheduler.stats()
+
+    @app.get("/sessions/stats")
+    def session_stats():
+        if sessions is None:
+            return {"enabled": False}
+        return {"enabled": True, **sessions.stats()}
+
+    @app.post("/sessions")
+    def session_create():
+        if sessions is None:
+            raise HTTPException(status_code=404, detail="Sessions are disabled.")
+        return {"session_id": sessions.create()}
+
+    def _session_detail(scope: str, session_id: str):
+        session = sessions.get((scope, session_id)) if sessions is not None else None
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired session.")
+        return session
+
+    def _session_delete(scope: str, session_id: str):
+        if sessions is None or not sessions.delete((scope, session_id)):
+            raise HTTPException(status_code=404, detail="Unknown or expired session.")
+        return {"deleted": session_id}
+
+    @app.get("/admin/sessions/{session_id}", dependencies=[Depends(require_admin)])
+    def session_detail(session_id: str):
+        return _session_detail("", session_id)
+
+    @app.delete("/sessions/{session_id}")
+    def session_delete(session_id: str):
+        return _session_delete("", session_id)
+
+    @app.get(
+        "/admin/collections/{name}/sessions/{session_id}",
+        dependencies=[Depends(require_admin)],
+    )
+    def collection_session_detail(name: str, session_id: str):
+        return _session_detail(name, session_id)
+
+    @app.delete("/collections/{name}/sessions/{session_id}")
+    def collection_session_delete(name: str, session_id: str):
+        return _session_delete(name, session_id)
+
+    async def _collection(name: str) -> Collection:
+        try:
+            return await run_in_threadpool(collections.get, name)
+        except (FileNotFoundError, ValueError) as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    async def _collection_input(request: Request):
+        try:
+            payload = await request.json()
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail="Request body must be JSON.") from exc
+        if not isinstance(payload, dict) or "input" not in payload:
+            raise HTTPException(status_code=422, detail='Request body must contain "input".')
+        return payload["input"]
+
+    @app.get("/collections")
+    def collections_stats():
+        return collections.stats()
+
+    @app.post("/collections/{name}/sessions")
+    def collection_session_create(name: str):
+        if sessions is None:
+            raise HTTPException(status_code=404, detail="Sessions are disabled.")
+        try:
+            exists = collections.exists(name)
+        except ValueError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        if not exists:
+            raise HTTPException(status_code=404, detail=f"Collection {name} does not exist.")
+        return {"session_id": sessions.create(name)}
+
+    @app.post("/collections/{name}/invoke")
+    async def collection_invoke(name: str, request: Request):
+        input_data = await _collection_input(request)
+        session_from_input(input_data, sessions, name)
+        collection = await _collection(name)
+        output = await collection.chain.ainvoke(input_data)
+        return {"output": output}
+
+    @app.post("/collections/{name}/stream")
+    async def collection_stream(name: str, request: Request):
+        input_data = await _collection_input(request)
+        session_from_input(input_data, sessions, name)
+        collection = await _collection(name)
+
+        async def events():
+            try:
+                async for chunk in collection.chain.astream(input_data):
+                    yield _sse("data", chunk)
+            except SchedulerBusy as exc:
+                yield _sse("error", {"status_code": 429, "message": str(exc)})
+            except InvalidSessionId as exc:
+                yield _sse("error", {"status_code": 400, "message": str(exc)})
+            except UnknownSession as exc:
+                yield _sse("error", {"status_code": 404, "message": str(exc)})
+            except Exception as exc:  # noqa: BLE001 - reported to the client as an SSE error
+                yield _sse("error", {"status_code": 500, "message": str(exc)})
+            else:
+                yield "event: end\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+    @app.get("/admin/index", dependencies=[Depends(require_admin)])
+    def index_status():
+        return index.status()
+
+    @app.post("/admin/index/reload", dependencies=[Depends(require_admin)])
+    def index_reload():
+        try:
+            index.reload(force=True)
+        except Exception as exc:  # noqa: BLE001 - previous index keeps serving
+            raise HTTPException(status_code=500, detail=f"Reload failed: {exc}") from exc
+        return index.status()
+
+    @app.post("/admin/index/activate/{version}", dependencies=[Depends(require_admin)])
+    def index_activate(version: str):
+        try:
+            index.activate(version)
+        except (FileNotFoundError, ValueError) as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        except Exception as exc:  # noqa: BLE001 - previous index keeps serving
+            raise HTTPException(status_code=500, detail=f"Activation failed: {exc}") from exc
+        return index.status()
+
+    @app.post("/admin/collections/{name}/unload", dependencies=[Depends(require_admin)])
+    def collection_unload(name: str):
+        if not collections.evict(name):
+            raise HTTPException(status_code=404, detail=f"Collection {name} is not loaded.")
+        return collections.stats()
 
     add_routes(
         app,
         chain,
         path="/chat",
         playground_type="default",
+        dependencies=[Depends(check_session)],
     )
     
     return app
@@ -70,4 +441,5 @@ app = create_app()
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", str(DEFAULT_PORT)))
-    uvicorn.run("src.app.main:app", host="0.0.0.0", port=port, reload=False)
\ No newline at end of file
+    workers = settings.get_int(ENV_WORKERS, 1)
+    uvicorn.run("src.app.main:app", host="0.0.0.0", port=port, reload=False, workers=workers)
\ No newline at end of file
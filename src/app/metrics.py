@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+ENV_SERVER_TIMING = "SERVER_TIMING_ENABLED"
+
+DEFAULT_SERVER_TIMING = False
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+TRACE_HEADER = "X-Request-ID"
+MAX_TRACE_ID_LENGTH = 128
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0, 320.0)
+
+STAGE_QUEUE = "queue"
+STAGE_EMBED = "embed"
+STAGE_RETRIEVE = "retrieve"
+STAGE_CONTEXT = "context"
+STAGE_LLM_TTFT = "llm_ttft"
+STAGE_LLM_GENERATE = "llm_generate"
+STAGE_TOTAL = "total"
+
+OUTCOME_ANSWERED = "answered"
+OUTCOME_CACHE_HIT = "cache_hit"
+OUTCOME_NOT_FOUND = "not_found"
+
+_TRACE_ID_RE = re.compile(r"^[A-Za-z0-9._:-]+$")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(
+                    f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                )
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key in sorted(self._counts):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), self._counts[key]):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                    )
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "rag_stage_seconds",
+        "Time spent per question in each pipeline stage.",
+        ("stage",),
+    )
+)
+LLM_PIECES_PER_SECOND = REGISTRY.register(
+    Histogram(
+        "rag_llm_pieces_per_second",
+        "Streamed LLM pieces per second after the first piece (a piece may hold several tokens).",
+        buckets=RATE_BUCKETS,
+    )
+)
+QUESTIONS_TOTAL = REGISTRY.register(
+    Counter("rag_questions_total", "Questions answered, by outcome.", ("outcome",))
+)
+ANSWER_CACHE_HITS_TOTAL = REGISTRY.register(
+    Counter("rag_answer_cache_hits_total", "Answers served from the answer cache.", ("kind",))
+)
+EMPTY_RETRIEVALS_TOTAL = REGISTRY.register(
+    Counter("rag_empty_retrievals_total", "Questions for which retrieval found no chunk above CONTEXT_MIN_RELEVANCE.")
+)
+NOT_FOUND_TOTAL = REGISTRY.register(
+    Counter("rag_not_found_total", "Questions answered with the not-found message.")
+)
+SCHEDULER_REJECTED_TOTAL = REGISTRY.register(
+    Counter("rag_scheduler_rejected_total", "Questions turned away with 429, by reason.", ("reason",))
+)
+SINGLE_FLIGHT_SHARED_TOTAL = REGISTRY.register(
+    Counter(
+        "rag_single_flight_shared_total",
+        "Questions that joined an identical question already in flight.",
+    )
+)
+SESSION_RETRIEVALS_TOTAL = REGISTRY.register(
+    Counter(
+        "rag_session_retrievals_total",
+        "Conversation turns by how retrieval was served (reuse, extend or new).",
+        ("mode",),
+    )
+)
+COLLECTION_LOAD_SECONDS = REGISTRY.register(
+    Histogram(
+        "rag_collection_load_seconds",
+        "Time to lazily load a collection index on first use.",
+        ("collection",),
+    )
+)
+COLLECTION_EVICTIONS_TOTAL = REGISTRY.register(
+    Counter(
+        "rag_collection_evictions_total",
+        "Collections unloaded to stay within COLLECTIONS_MAX_BYTES.",
+    )
+)
+
+
+@dataclass
+class RequestTrace:
+    trace_id: str
+    stages: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()
+        )
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("rag_request_trace", default=None)
+
+
+def trace_id_from(header: Optional[str]) -> str:
+    if header and len(header) <= MAX_TRACE_ID_LENGTH and _TRACE_ID_RE.match(header):
+        return header
+    return uuid.uuid4().hex
+
+
+def start_trace(trace_id: str) -> Tuple[RequestTrace, Token]:
+    trace = RequestTrace(trace_id=trace_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: Token) -> None:
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+class QuestionTimer:
+    def __init__(self) -> None:
+        self._started = time.perf_counter()
+        self._llm_started: Optional[float] = None
+        self._first_piece: Optional[float] = None
+        self._last_piece: Optional[float] = None
+        self._pieces = 0
+        self._finished = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            record_stage(name, time.perf_counter() - started)
+
+    def llm_started(self) -> None:
+        self._llm_started = time.perf_counter()
+
+    def piece(self) -> None:
+        now = time.perf_counter()
+        if self._first_piece is None:
+            self._first_piece = now
+            if self._llm_started is not None:
+                record_stage(STAGE_LLM_TTFT, now - self._llm_started)
+        self._last_piece = now
+        self._pieces += 1
+
+    def cache_hit(self, kind: str) -> None:
+        ANSWER_CACHE_HITS_TOTAL.inc(kind=kind)
+        self.finish(OUTCOME_CACHE_HIT)
+
+    def finish(self, outcome: str) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        if self._first_piece is not None and self._last_piece is not None:
+            generation = self._last_piece - self._first_piece
+            record_stage(STAGE_LLM_GENERATE, generation)
+            if generation > 0 and self._pieces > 1:
+                LLM_PIECES_PER_SECOND.observe((self._pieces - 1) / generation)
+        if outcome == OUTCOME_NOT_FOUND:
+            NOT_FOUND_TOTAL.inc()
+        QUESTIONS_TOTAL.inc(outcome=outcome)
+        record_stage(STAGE_TOTAL, time.perf_counter() - self._started)
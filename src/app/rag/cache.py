@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.app import settings
+
+ENV_ANSWER_CACHE_ENABLED = "ANSWER_CACHE_ENABLED"
+ENV_ANSWER_CACHE_TTL_SECONDS = "ANSWER_CACHE_TTL_SECONDS"
+ENV_ANSWER_CACHE_MAX_ENTRIES = "ANSWER_CACHE_MAX_ENTRIES"
+ENV_ANSWER_CACHE_MAX_BYTES = "ANSWER_CACHE_MAX_BYTES"
+ENV_ANSWER_CACHE_SIMILARITY = "ANSWER_CACHE_SIMILARITY"
+
+DEFAULT_ANSWER_CACHE_ENABLED = True
+DEFAULT_ANSWER_CACHE_TTL_SECONDS = 3600.0
+DEFAULT_ANSWER_CACHE_MAX_ENTRIES = 512
+DEFAULT_ANSWER_CACHE_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_ANSWER_CACHE_SIMILARITY = 0.95
+
+ENTRY_OVERHEAD_BYTES = 256
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.¿¡]+$")
+_LEADING_PUNCTUATION = re.compile(r"^[\s¿¡]+")
+
+
+def normalize_question(question: str) -> str:
+    text = " ".join(str(question).split()).lower()
+    text = _LEADING_PUNCTUATION.sub("", text)
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def unit_vector(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if vector.ndim != 1 or norm == 0.0:
+        return None
+    return vector / norm
+
+
+def _manifest_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class _Entry:
+    answer: str
+    vector: Optional[np.ndarray]
+    expires_at: float
+    size: int
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = DEFAULT_ANSWER_CACHE_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_ANSWER_CACHE_MAX_BYTES,
+        similarity_threshold: float = DEFAULT_ANSWER_CACHE_SIMILARITY,
+        manifest_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        if ttl_seconds <= 0:
+            raise ValueError("Answer cache TTL must be greater than zero.")
+        if max_entries <= 0:
+            raise ValueError("Answer cache max entries must be greater than zero.")
+        if max_bytes <= 0:
+            raise ValueError("Answer cache max bytes must be greater than zero.")
+        if not 0.0 < similarity_threshold <= 1.0:
+            raise ValueError("Answer cache similarity threshold must be in (0, 1].")
+
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.similarity_threshold = similarity_threshold
+        self.manifest_path = Path(manifest_path) if manifest_path else None
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._manifest_signature = (
+            _manifest_signature(self.manifest_path) if self.manifest_path else None
+        )
+        self._counters: Dict[str, int] = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "puts": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get_exact(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        now = time.monotonic()
+        with self._lock:
+            self._check_manifest()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= now:
+                self._remove(key)
+                self._counters["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["exact_hits"] += 1
+            return entry.answer
+
+    def get_similar(self, embedding: Sequence[float]) -> Optional[str]:
+        query = unit_vector(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_manifest()
+            best_key = None
+            best_score = self.similarity_threshold
+            for key, entry in list(self._entries.items()):
+                if entry.expires_at <= now:
+                    self._remove(key)
+                    self._counters["expirations"] += 1
+                    continue
+                if query is None or entry.vector is None:
+                    continue
+                if entry.vector.shape != query.shape:
+                    continue
+                score = float(np.dot(entry.vector, query))
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self._counters["semantic_hits"] += 1
+            return self._entries[best_key].answer
+
+    def put(
+        self,
+        question: str,
+        answer: str,
+        embedding: Optional[Sequence[float]] = None,
+    ) -> None:
+        key = normalize_question(question)
+        vector = unit_vector(embedding) if embedding is not None else None
+        size = (
+            len(key.encode("utf-8"))
+            + len(answer.encode("utf-8"))
+            + (vector.nbytes if vector is not None else 0)
+            + ENTRY_OVERHEAD_BYTES
+        )
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._check_manifest()
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(
+                answer=answer,
+                vector=vector,
+                expires_at=time.monotonic() + self.ttl_seconds,
+                size=size,
+            )
+            self._bytes += size
+            self._counters["puts"] += 1
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            hits = self._counters["exact_hits"] + self._counters["semantic_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "hits": hits,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _check_manifest(self) -> None:
+        if self.manifest_path is None:
+            return
+        signature = _manifest_signature(self.manifest_path)
+        if signature == self._manifest_signature:
+            return
+        self._manifest_signature = signature
+        if self._entries:
+            self._entries.clear()
+            self._bytes = 0
+        self._counters["invalidations"] += 1
+
+
+def build_answer_cache(
+    manifest_path: Optional[Union[str, Path]] = None,
+) -> Optional[AnswerCache]:
+    if not settings.get_bool(ENV_ANSWER_CACHE_ENABLED, DEFAULT_ANSWER_CACHE_ENABLED):
+        return None
+    return AnswerCache(
+        ttl_seconds=settings.get_float(
+            ENV_ANSWER_CACHE_TTL_SECONDS, DEFAULT_ANSWER_CACHE_TTL_SECONDS
+        ),
+        max_entries=settings.get_int(
+            ENV_ANSWER_CACHE_MAX_ENTRIES, DEFAULT_ANSWER_CACHE_MAX_ENTRIES
+        ),
+        max_bytes=settings.get_int(
+            ENV_ANSWER_CACHE_MAX_BYTES, DEFAULT_ANSWER_CACHE_MAX_BYTES
+        ),
+        similarity_threshold=settings.get_float(
+            ENV_ANSWER_CACHE_SIMILARITY, DEFAULT_ANSWER_CACHE_SIMILARITY
+        ),
+        manifest_path=manifest_path,
+    )
@@ -2,18 +2,53 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Iterable, List
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
 
-from langchain_community.llms import Ollama
-from langchain_community.vectorstores import Chroma, FAISS
+from langchain_core.embeddings import Embeddings
 from langchain_core.runnables import RunnableLambda
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
+
+from src.app import settings
+from src.app.metrics import (
+    EMPTY_RETRIEVALS_TOTAL,
+    OUTCOME_ANSWERED,
+    OUTCOME_NOT_FOUND,
+    STAGE_CONTEXT,
+    STAGE_EMBED,
+    STAGE_RETRIEVE,
+    SESSION_RETRIEVALS_TOTAL,
+    QuestionTimer,
+)
+from src.app.rag.cache import AnswerCache, normalize_question
+from src.app.rag.context import (
+    MERGED_SOURCES_KEY,
+    ContextSettings,
+    ScoredDocs,
+    assemble_context,
+    asearch_with_relevance,
+    search_with_relevance,
+)
+from src.app.rag.embeddings import build_query_embeddings
+from src.app.rag.reloader import IndexHandle
+from src.app.rag.scheduler import Scheduler, SingleFlight
+from src.app.rag.sessions import (
+    RETRIEVAL_EXTEND,
+    Retrieval,
+    SessionKey,
+    SessionStore,
+    session_from_input,
+)
+from src.app.rag.versions import resolve_index_dir
+
+if TYPE_CHECKING:
+    from langchain_ollama import OllamaEmbeddings, OllamaLLM
 
 ENV_BASE_URL = "OLLAMA_BASE_URL"
 ENV_LLM_MODEL = "OLLAMA_LLM_MODEL"
 ENV_EMBED_MODEL = "OLLAMA_EMBED_MODEL"
 ENV_VECTORSTORE_DIR = "VECTORSTORE_DIR"
 ENV_VECTORSTORE_IMPL = "VECTORSTORE_IMPL"
+ENV_FAISS_OMP_THREADS = "FAISS_OMP_THREADS"
+ENV_WORKERS = "WEB_CONCURRENCY"
 
 DEFAULT_BASE_URL = "http://localhost:11434"
 DEFAULT_LLM_MODEL = "llama2"
@@ -21,7 +56,12 @@ DEFAULT_EMBED_MODEL = "nomic-embed-text"
 DEFAULT_VECTORSTORE_DIR = "./storage"
 DEFAULT_VECTORSTORE_IMPL = "faiss"
 
+WARMUP_TEXT = "warmup"
+
 TOP_K = 5
+MAX_MERGED_SOURCES = 3
+
+NOT_FOUND_ANSWER = "I did not find that information in the indexed sources."
 
 PROMPT_TEMPLATE = """Your are an assistant that answers ONLY using the provided context.
 Respond in the same language as the question.
@@ -36,11 +76,30 @@ Question:
 
 Answer:"""
 
+SESSION_PROMPT_TEMPLATE = """Your are an assistant that answers ONLY using the provided context.
+Respond in the same language as the question.
+Use the conversation only to understand what the question refers to.
+If the context does NOT support the answer, respond EXACTLY:
+I did not find that information in the indexed sources. 
+
+Conversation so far:
+{history}
+
+Context:
+{context}
+
+Question:
+{question}
+
+Answer:"""
+
 
 def _get_env(name: str, default: str) -> str:
     return os.getenv(name, default).strip()
 
 def _get_embeddings() -> OllamaEmbeddings:
+    from langchain_ollama import OllamaEmbeddings
+
     base_url = _get_env(ENV_BASE_URL, DEFAULT_BASE_URL)
     embed_model = _get_env(ENV_EMBED_MODEL, DEFAULT_EMBED_MODEL)
     if not base_url:
@@ -49,73 +108,346 @@ def _get_embeddings() -> OllamaEmbeddings:
         raise ValueError("OLLAMA_EMBED_MODEL is empty.")
     return OllamaEmbeddings(model=embed_model, base_url=base_url)
 
-def _load_vectorstore() -> object:
+def _get_llm(**kwargs) -> OllamaLLM:
+    from langchain_ollama import OllamaLLM
+
+    return OllamaLLM(
+        model =_get_env(ENV_LLM_MODEL, DEFAULT_LLM_MODEL),
+        temperature=0,
+        base_url=_get_env(ENV_BASE_URL, DEFAULT_BASE_URL),
+        **kwargs,
+    )
+
+def warm_up_embeddings() -> None:
+    _get_embeddings().embed_query(WARMUP_TEXT)
+
+def warm_up_llm() -> None:
+    _get_llm(num_predict=1).invoke(WARMUP_TEXT)
+
+def _vectorstore_dir() -> Path:
+    return Path(_get_env(ENV_VECTORSTORE_DIR, DEFAULT_VECTORSTORE_DIR))
+
+def get_query_embeddings() -> Embeddings:
+    return build_query_embeddings(_get_embeddings(), cache_dir=_vectorstore_dir())
+
+def manifest_path() -> Path:
+    return _vectorstore_dir() / "manifest.json"
+
+def _load_vectorstore(
+    embeddings: Optional[Embeddings] = None,
+    dir_path: Optional[Path] = None,
+) -> object:
     impl = _get_env(ENV_VECTORSTORE_IMPL, DEFAULT_VECTORSTORE_IMPL).lower()
-    dir_path = Path(_get_env(ENV_VECTORSTORE_DIR, DEFAULT_VECTORSTORE_DIR))
+    if dir_path is None:
+        dir_path = resolve_index_dir(_vectorstore_dir())
     if not dir_path.exists():
         raise FileNotFoundError(
             f"Vectorstore directory does not exist: {dir_path}"
         )
     
-    embeddings = _get_embeddings()
+    if embeddings is None:
+        embeddings = _get_embeddings()
 
     if impl == "faiss":
-        return FAISS.load_local(
-            str(dir_path),
-            embeddings,
-            allow_dangerous_deserialization=True,
+        from src.app.ingest.index_factory import (
+            apply_search_params,
+            load_index_info,
+            search_params_from_env,
         )
+        from src.app.rag.docstore import load_faiss_docstore
+
+        _limit_faiss_threads()
+        vectorstore = load_faiss_docstore(dir_path, embeddings)
+        index_info = load_index_info(dir_path)
+        if index_info:
+            apply_search_params(vectorstore.index, search_params_from_env(index_info))
+        return vectorstore
     if impl == "chroma":
+        from langchain_community.vectorstores import Chroma
+
         return Chroma(
             persist_directory=str(dir_path),
             embedding_function=embeddings,
         )
     raise ValueError("VECTORSTORE_IMPL must be 'faiss' or 'chroma'.")
 
+def _limit_faiss_threads() -> None:
+    import faiss
+
+    workers = settings.get_int(ENV_WORKERS, 1)
+    threads = settings.get_int(ENV_FAISS_OMP_THREADS, 1 if workers > 1 else 0)
+    if threads > 0:
+        faiss.omp_set_num_threads(threads)
+
+def open_index(
+    embeddings: Optional[Embeddings] = None,
+    load: bool = True,
+    storage_dir: Optional[Path] = None,
+) -> IndexHandle:
+    if embeddings is None:
+        embeddings = get_query_embeddings()
+    index = IndexHandle(
+        storage_dir or _vectorstore_dir(),
+        lambda dir_path: _load_vectorstore(embeddings, dir_path),
+    )
+    if load:
+        index.reload()
+    return index
+
 
 def _unique_sources(docs: Iterable) -> List[str]:
     seen = set()
     sources: List[str] = []
     for doc in docs:
-        source = doc.metadata.get("source")
-        if source and source not in seen:
-            seen.add(source)
-            sources.append(source)
+        merged = doc.metadata.get(MERGED_SOURCES_KEY) or []
+        for source in [doc.metadata.get("source"), *merged[:MAX_MERGED_SOURCES]]:
+            if source and source not in seen:
+                seen.add(source)
+                sources.append(source)
     return sources
 
-def build_chain():
-    vectorstore = _load_vectorstore()
-    retriever = vectorstore.as_retriever(search_kwargs={"k": TOP_K})
+def _question_from(input_data) -> str:
+    return input_data["question"] if isinstance(input_data, dict) else str(input_data)
 
-    llm = OllamaLLM(
-        model =_get_env(ENV_LLM_MODEL, DEFAULT_LLM_MODEL),
-        temperature=0,
-        base_url=_get_env(ENV_BASE_URL, DEFAULT_BASE_URL),
-    )
+def _sources_block(sources: List[str]) -> str:
+    return "\n\nSources:\n" + "\n".join(f"- {url}" for url in sources)
+
+def _prepare_prompt(
+    question: str,
+    scored_docs: ScoredDocs,
+    context_settings: ContextSettings,
+    history: str = "",
+) -> Optional[Tuple[str, List[str]]]:
+    if not scored_docs:
+        return None
 
-    def _invoke(input_data):
-        question = input_data["question"] if isinstance(input_data, dict) else str(input_data)
-        docs = retriever.invoke(question)
-
-        if not docs:
-            return "I did not find that information in the indexed sources."
-        
-        context = "\n\n".join(
-            doc.page_content for doc in docs if getattr(doc, "page_content", None)
-        ).strip()
-
-        if not context:
-            return "I did not find that information in the indexed sources."
-        
-        sources = _unique_sources(docs)
-        if not sources:
-            return "I did not find that information in the indexed sources."
-        
+    assembled = assemble_context(scored_docs, context_settings)
+    context = assembled.text.strip()
+    if not context:
+        return None
+
+    sources = _unique_sources(assembled.docs)
+    if not sources:
+        return None
+
+    if history:
+        prompt = SESSION_PROMPT_TEMPLATE.format(history=history, context=context, question=question)
+    else:
         prompt = PROMPT_TEMPLATE.format(context=context, question=question)
-        answer = llm.invoke(prompt)
+    return prompt, sources
+
+def _has_relevant(scored_docs: ScoredDocs, context_settings: ContextSettings) -> bool:
+    return any(score >= context_settings.min_relevance for _, score in scored_docs)
+
+def _answer_outcome(pieces: List[str]) -> str:
+    if "".join(pieces).strip().startswith(NOT_FOUND_ANSWER.rstrip(".")):
+        return OUTCOME_NOT_FOUND
+    return OUTCOME_ANSWERED
+
+def _trim_tokens(tokens: Iterable[str]) -> Iterator[str]:
+    started = False
+    pending = ""
+    for token in tokens:
+        if not isinstance(token, str):
+            token = str(token)
+        if not started:
+            token = token.lstrip()
+            if not token:
+                continue
+            started = True
+        content = token.rstrip()
+        if not content:
+            pending += token
+            continue
+        yield pending + content
+        pending = token[len(content):]
+
+async def _atrim_tokens(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    started = False
+    pending = ""
+    async for token in tokens:
+        if not isinstance(token, str):
+            token = str(token)
+        if not started:
+            token = token.lstrip()
+            if not token:
+                continue
+            started = True
+        content = token.rstrip()
+        if not content:
+            pending += token
+            continue
+        yield pending + content
+        pending = token[len(content):]
+
+def build_chain(
+    answer_cache: Optional[AnswerCache] = None,
+    embeddings: Optional[Embeddings] = None,
+    index: Optional[IndexHandle] = None,
+    scheduler: Optional[Scheduler] = None,
+    sessions: Optional[SessionStore] = None,
+    session_scope: str = "",
+):
+    if embeddings is None:
+        embeddings = get_query_embeddings()
+    if index is None:
+        index = open_index(embeddings)
+
+    llm = _get_llm()
+
+    if scheduler is None:
+        scheduler = Scheduler()
+    single_flight = SingleFlight() if scheduler.config.single_flight else None
+    context_settings = ContextSettings.from_env(max_chunks=TOP_K)
+
+    def _plan(session_key: Optional[SessionKey], embedding) -> Optional[Retrieval]:
+        if session_key is None:
+            return None
+        retrieval = sessions.retrieval_for(session_key, embedding)
+        SESSION_RETRIEVALS_TOTAL.inc(mode=retrieval.mode)
+        return retrieval
+
+    def _extend(session_key: Optional[SessionKey], retrieval: Optional[Retrieval], scored_docs):
+        if retrieval is None or retrieval.mode != RETRIEVAL_EXTEND:
+            return scored_docs
+        return sessions.merge(session_key, scored_docs, context_settings.fetch_k)
+
+    def _remember(session_key, question, answer, sources, retrieval, scored_docs) -> None:
+        if session_key is not None:
+            sessions.remember(session_key, question, answer, sources, retrieval, scored_docs)
+
+    # Sync callers (scripts/ask.py) skip the scheduler and single-flight, which are asyncio-only.
+    def _stream(input_data):
+        question = _question_from(input_data)
+        session_key = session_from_input(input_data, sessions, session_scope)
+        timer = QuestionTimer()
+
+        if answer_cache is not None and session_key is None:
+            cached = answer_cache.get_exact(question)
+            if cached is not None:
+                timer.cache_hit("exact")
+                yield cached
+                return
+
+        with timer.stage(STAGE_EMBED):
+            embedding = embeddings.embed_query(question)
+
+        if answer_cache is not None and session_key is None:
+            cached = answer_cache.get_similar(embedding)
+            if cached is not None:
+                timer.cache_hit("similar")
+                yield cached
+                return
+
+        retrieval = _plan(session_key, embedding)
+        with timer.stage(STAGE_RETRIEVE):
+            if retrieval is not None and retrieval.scored_docs is not None:
+                scored_docs = retrieval.scored_docs
+            else:
+                query = retrieval.query if retrieval is not None else embedding
+                scored_docs = search_with_relevance(index.current(), query, context_settings.fetch_k)
+                scored_docs = _extend(session_key, retrieval, scored_docs)
+        if not _has_relevant(scored_docs, context_settings):
+            EMPTY_RETRIEVALS_TOTAL.inc()
+        history = retrieval.history if retrieval is not None else ""
+        with timer.stage(STAGE_CONTEXT):
+            prepared = _prepare_prompt(question, scored_docs, context_settings, history)
+        if prepared is None:
+            timer.finish(OUTCOME_NOT_FOUND)
+            _remember(session_key, question, NOT_FOUND_ANSWER, [], retrieval, scored_docs)
+            yield NOT_FOUND_ANSWER
+            return
+        prompt, sources = prepared
+
+        pieces: List[str] = []
+        timer.llm_started()
+        for piece in _trim_tokens(llm.stream(prompt)):
+            timer.piece()
+            pieces.append(piece)
+            yield piece
+        timer.finish(_answer_outcome(pieces))
+
+        sources_block = _sources_block(sources)
+        yield sources_block
+
+        _remember(session_key, question, "".join(pieces), sources, retrieval, scored_docs)
+        if answer_cache is not None and session_key is None:
+            answer_cache.put(question, "".join(pieces) + sources_block, embedding)
+
+    async def _answer(question: str, session_key: Optional[SessionKey] = None):
+        timer = QuestionTimer()
+        async with scheduler.slot():
+            with timer.stage(STAGE_EMBED):
+                embedding = await embeddings.aembed_query(question)
+
+            if answer_cache is not None and session_key is None:
+                cached = answer_cache.get_similar(embedding)
+                if cached is not None:
+                    timer.cache_hit("similar")
+                    yield cached
+                    return
+
+            retrieval = _plan(session_key, embedding)
+            with timer.stage(STAGE_RETRIEVE):
+                if retrieval is not None and retrieval.scored_docs is not None:
+                    scored_docs = retrieval.scored_docs
+                else:
+                    scored_docs = await asearch_with_relevance(
+                        index.current(),
+                        retrieval.query if retrieval is not None else embedding,
+                        context_settings.fetch_k,
+                    )
+                    scored_docs = _extend(session_key, retrieval, scored_docs)
+            if not _has_relevant(scored_docs, context_settings):
+                EMPTY_RETRIEVALS_TOTAL.inc()
+            history = retrieval.history if retrieval is not None else ""
+            with timer.stage(STAGE_CONTEXT):
+                prepared = _prepare_prompt(question, scored_docs, context_settings, history)
+            if prepared is None:
+                timer.finish(OUTCOME_NOT_FOUND)
+                _remember(session_key, question, NOT_FOUND_ANSWER, [], retrieval, scored_docs)
+                yield NOT_FOUND_ANSWER
+                return
+            prompt, sources = prepared
+
+            pieces: List[str] = []
+            timer.llm_started()
+            async for piece in _atrim_tokens(llm.astream(prompt)):
+                timer.piece()
+                pieces.append(piece)
+                yield piece
+            timer.finish(_answer_outcome(pieces))
+
+        sources_block = _sources_block(sources)
+        yield sources_block
+
+        _remember(session_key, question, "".join(pieces), sources, retrieval, scored_docs)
+        if answer_cache is not None and session_key is None:
+            answer_cache.put(question, "".join(pieces) + sources_block, embedding)
+
+    async def _astream(input_data):
+        question = _question_from(input_data)
+        session_key = session_from_input(input_data, sessions, session_scope)
+
+        if answer_cache is not None and session_key is None:
+            cached = answer_cache.get_exact(question)
+            if cached is not None:
+                QuestionTimer().cache_hit("exact")
+                yield cached
+                return
+
+        if single_flight is None or session_key is not None:
+            async for piece in _answer(question, session_key):
+                yield piece
+            return
 
-        answer_text = answer.strip() if isinstance(answer, str) else str(answer).strip()
-        sources_block = "\n".join(f"- {url}" for url in sources)
-        return f"{answer_text}\n\nSources:\n{sources_block}"
+        key = normalize_question(question)
+        follower = QuestionTimer() if single_flight.in_flight(key) else None
+        pieces: List[str] = []
+        async for piece in single_flight.run(key, lambda: _answer(question)):
+            pieces.append(piece)
+            yield piece
+        if follower is not None:
+            follower.finish(_answer_outcome(pieces))
     
-    return RunnableLambda(_invoke)
+    return RunnableLambda(_stream, afunc=_astream)
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from src.app import settings
+
+ENV_CONTEXT_FETCH_K = "CONTEXT_FETCH_K"
+ENV_CONTEXT_MAX_CHUNKS = "CONTEXT_MAX_CHUNKS"
+ENV_CONTEXT_MIN_RELEVANCE = "CONTEXT_MIN_RELEVANCE"
+ENV_CONTEXT_TOKEN_BUDGET = "CONTEXT_TOKEN_BUDGET"
+
+DEFAULT_CONTEXT_FETCH_K = 8
+DEFAULT_CONTEXT_MAX_CHUNKS = 5
+DEFAULT_CONTEXT_MIN_RELEVANCE = 0.2
+DEFAULT_CONTEXT_TOKEN_BUDGET = 1000
+
+CHARS_PER_TOKEN = 4
+MAX_TEXT_OVERLAP = 400
+MIN_TEXT_OVERLAP = 20
+MIN_TRUNCATED_TOKENS = 64
+MERGED_SOURCES_KEY = "duplicate_sources"
+
+ScoredDocs = List[Tuple[Document, float]]
+
+
+@dataclass(frozen=True)
+class ContextSettings:
+    fetch_k: int = DEFAULT_CONTEXT_FETCH_K
+    max_chunks: int = DEFAULT_CONTEXT_MAX_CHUNKS
+    min_relevance: float = DEFAULT_CONTEXT_MIN_RELEVANCE
+    token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET
+
+    @classmethod
+    def from_env(cls, max_chunks: int = DEFAULT_CONTEXT_MAX_CHUNKS) -> "ContextSettings":
+        context_settings = cls(
+            fetch_k=settings.get_int(ENV_CONTEXT_FETCH_K, DEFAULT_CONTEXT_FETCH_K),
+            max_chunks=settings.get_int(ENV_CONTEXT_MAX_CHUNKS, max_chunks),
+            min_relevance=settings.get_float(
+                ENV_CONTEXT_MIN_RELEVANCE, DEFAULT_CONTEXT_MIN_RELEVANCE
+            ),
+            token_budget=settings.get_int(ENV_CONTEXT_TOKEN_BUDGET, DEFAULT_CONTEXT_TOKEN_BUDGET),
+        )
+        if context_settings.fetch_k <= 0 or context_settings.max_chunks <= 0:
+            raise ValueError("CONTEXT_FETCH_K and CONTEXT_MAX_CHUNKS must be greater than zero.")
+        if context_settings.token_budget <= 0:
+            raise ValueError("CONTEXT_TOKEN_BUDGET must be greater than zero.")
+        return context_settings
+
+
+@dataclass
+class _Segment:
+    source: str
+    text: str
+    score: float
+    start: Optional[int]
+    end: Optional[int]
+    docs: List[Document] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class AssembledContext:
+    text: str
+    docs: List[Document]
+    candidates: int
+    kept_chunks: int
+    segments: int
+    estimated_tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _relevance_fn(vectorstore):
+    select = getattr(vectorstore, "_select_relevance_score_fn", None)
+    if select is None:
+        return lambda score: score
+    return select()
+
+
+def search_with_relevance(vectorstore, embedding: Sequence[float], k: int) -> ScoredDocs:
+    if hasattr(vectorstore, "similarity_search_with_score_by_vector"):
+        pairs = vectorstore.similarity_search_with_score_by_vector(list(embedding), k=k)
+    else:
+        pairs = vectorstore.similarity_search_by_vector_with_relevance_scores(
+            list(embedding), k=k
+        )
+    relevance = _relevance_fn(vectorstore)
+    return [(doc, float(relevance(score))) for doc, score in pairs]
+
+
+async def asearch_with_relevance(vectorstore, embedding: Sequence[float], k: int) -> ScoredDocs:
+    if hasattr(vectorstore, "asimilarity_search_with_score_by_vector"):
+        pairs = await vectorstore.asimilarity_search_with_score_by_vector(list(embedding), k=k)
+        relevance = _relevance_fn(vectorstore)
+        return [(doc, float(relevance(score))) for doc, score in pairs]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, search_with_relevance, vectorstore, embedding, k)
+
+
+def _text_overlap(left: str, right: str) -> int:
+    longest = min(MAX_TEXT_OVERLAP, len(left), len(right))
+    for size in range(longest, MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _start_of(doc: Document) -> Optional[int]:
+    start = doc.metadata.get("start_index")
+    return start if isinstance(start, int) and start >= 0 else None
+
+
+def _merge_into(segment: _Segment, doc: Document, score: float) -> bool:
+    text = doc.page_content
+    start = _start_of(doc)
+
+    if segment.start is not None and start is not None:
+        if start > segment.end + 1:
+            return False
+        if start == segment.end + 1:
+            segment.text = f"{segment.text} {text}"
+        else:
+            segment.text += text[segment.end - start:]
+        segment.end = max(segment.end, start + len(text))
+    else:
+        overlap = _text_overlap(segment.text, text)
+        if overlap:
+            segment.text += text[overlap:]
+        else:
+            overlap = _text_overlap(text, segment.text)
+            if not overlap:
+                return False
+            segment.text = text + segment.text[overlap:]
+        segment.start = segment.end = None
+
+    segment.score = max(segment.score, score)
+    segment.docs.append(doc)
+    return True
+
+
+def _merge_adjacent(scored: ScoredDocs) -> List[_Segment]:
+    by_source: Dict[str, ScoredDocs] = {}
+    for doc, score in scored:
+        by_source.setdefault(str(doc.metadata.get("source", "")), []).append((doc, score))
+
+    segments: List[_Segment] = []
+    for source, items in by_source.items():
+        items.sort(key=lambda item: (_start_of(item[0]) is None, _start_of(item[0]) or 0))
+        current: Optional[_Segment] = None
+        for doc, score in items:
+            if current is not None and _merge_into(current, doc, score):
+                continue
+            start = _start_of(doc)
+            current = _Segment(
+                source=source,
+                text=doc.page_content,
+                score=score,
+                start=start,
+                end=start + len(doc.page_content) if start is not None else None,
+                docs=[doc],
+            )
+            segments.append(current)
+
+    segments.sort(key=lambda segment: segment.score, reverse=True)
+    return segments
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary < max_chars // 2:
+        boundary = cut.rfind(" ")
+    return cut[: boundary + 1].rstrip() if boundary > 0 else cut
+
+
+def assemble_context(scored: ScoredDocs, context_settings: ContextSettings) -> AssembledContext:
+    candidates = len(scored)
+    relevant = [
+        (doc, score)
+        for doc, score in sorted(scored, key=lambda item: item[1], reverse=True)
+        if getattr(doc, "page_content", None) and score >= context_settings.min_relevance
+    ][: context_settings.max_chunks]
+
+    budget = context_settings.token_budget * CHARS_PER_TOKEN
+    parts: List[str] = []
+    docs: List[Document] = []
+    for segment in _merge_adjacent(relevant):
+        text = segment.text.strip()
+        remaining = budget - sum(len(part) + 2 for part in parts)
+        if remaining <= 0:
+            break
+        if len(text) > remaining:
+            if remaining < MIN_TRUNCATED_TOKENS * CHARS_PER_TOKEN:
+                break
+            text = _truncate(text, remaining)
+        if text:
+            parts.append(text)
+            docs.extend(segment.docs)
+
+    text = "\n\n".join(parts)
+    return AssembledContext(
+        text=text,
+        docs=docs,
+        candidates=candidates,
+        kept_chunks=len(docs),
+        segments=len(parts),
+        estimated_tokens=estimate_tokens(text),
+    )
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.app.rag.context import MERGED_SOURCES_KEY
+
+INDEX_FILENAME = "index.faiss"
+DOCSTORE_BLOB_FILENAME = "docstore.bin"
+DOCSTORE_OFFSETS_FILENAME = "docstore.offsets.npy"
+LEGACY_PICKLE_FILENAME = "index.pkl"
+MERGED_SOURCES_FILENAME = "docstore.sources.json"
+DOCSTORE_FORMAT = "mmap-v1"
+
+logger = logging.getLogger(__name__)
+
+
+def has_docstore(storage_dir: Union[str, Path]) -> bool:
+    storage_path = Path(storage_dir)
+    return all(
+        (storage_path / name).exists()
+        for name in (INDEX_FILENAME, DOCSTORE_BLOB_FILENAME, DOCSTORE_OFFSETS_FILENAME)
+    )
+
+
+def resident_bytes(storage_dir: Union[str, Path]) -> int:
+    storage_path = Path(storage_dir)
+    return sum(
+        (storage_path / name).stat().st_size
+        for name in (INDEX_FILENAME, DOCSTORE_OFFSETS_FILENAME, MERGED_SOURCES_FILENAME)
+        if (storage_path / name).exists()
+    )
+
+
+def load_merged_sources(storage_dir: Union[str, Path]) -> Dict[int, List[str]]:
+    path = Path(storage_dir) / MERGED_SOURCES_FILENAME
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return {int(position): list(sources) for position, sources in json.load(f).items()}
+
+
+class DocstoreWriter:
+    def __init__(self, storage_dir: Union[str, Path]) -> None:
+        self.storage_path = Path(storage_dir)
+        self._blob = (self.storage_path / DOCSTORE_BLOB_FILENAME).open("wb")
+        self._offsets: List[int] = [0]
+
+    def add(self, doc: Document) -> int:
+        record = json.dumps(
+            {"page_content": doc.page_content, "metadata": doc.metadata},
+            ensure_ascii=False,
+            default=str,
+        ).encode("utf-8")
+        self._blob.write(record)
+        self._offsets.append(self._offsets[-1] + len(record))
+        return len(self._offsets) - 2
+
+    def add_all(self, docs: Iterable[Document]) -> None:
+        for doc in docs:
+            self.add(doc)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def close(self) -> None:
+        if self._blob.closed:
+            return
+        self._blob.close()
+        np.save(
+            self.storage_path / DOCSTORE_OFFSETS_FILENAME,
+            np.asarray(self._offsets, dtype=np.int64),
+        )
+
+    def __enter__(self) -> "DocstoreWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class MmapDocstore(Docstore):
+    def __init__(self, storage_dir: Union[str, Path]) -> None:
+        storage_path = Path(storage_dir)
+        self._offsets = np.load(storage_path / DOCSTORE_OFFSETS_FILENAME, mmap_mode="r")
+        blob_path = storage_path / DOCSTORE_BLOB_FILENAME
+        self._blob: Optional[mmap.mmap] = None
+        if blob_path.stat().st_size:
+            with blob_path.open("rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._merged_sources = load_merged_sources(storage_path)
+
+    def __len__(self) -> int:
+        return max(len(self._offsets) - 1, 0)
+
+    def get(self, position: int) -> Document:
+        if not 0 <= position < len(self):
+            raise KeyError(position)
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        record = json.loads(self._blob[start:end].decode("utf-8"))
+        metadata = record["metadata"]
+        merged = self._merged_sources.get(position)
+        if merged:
+            metadata[MERGED_SOURCES_KEY] = list(merged)
+        return Document(page_content=record["page_content"], metadata=metadata)
+
+    def search(self, search: str) -> Union[str, Document]:
+        try:
+            return self.get(int(search))
+        except (KeyError, ValueError):
+            return f"ID {search} not found."
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        raise NotImplementedError("MmapDocstore is read-only; re-run the ingestion to add documents.")
+
+    def delete(self, ids: List) -> None:
+        raise NotImplementedError("MmapDocstore is read-only; re-run the ingestion to delete documents.")
+
+    def close(self) -> None:
+        if self._blob is not None:
+            self._blob.close()
+            self._blob = None
+
+
+class PositionalIds(Mapping):
+    def __init__(self, count: int) -> None:
+        self._count = count
+
+    def __getitem__(self, position: int) -> str:
+        if not isinstance(position, (int, np.integer)) or not 0 <= position < self._count:
+            raise KeyError(position)
+        return str(position)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self._count))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def _mmap_flags() -> int:
+    flags = getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+    for name in ("IO_FLAG_MMAP", "IO_FLAG_MMAP_IFC"):
+        flags |= getattr(faiss, name, 0)
+    return flags
+
+
+def read_index(storage_dir: Union[str, Path]) -> faiss.Index:
+    index_path = str(Path(storage_dir) / INDEX_FILENAME)
+    try:
+        return faiss.read_index(index_path, _mmap_flags())
+    except RuntimeError:
+        logger.warning(
+            "%s cannot be memory-mapped (IVF inverted lists are not mmap-able); "
+            "loading it into process memory, so workers do not share it.",
+            index_path,
+        )
+        return faiss.read_index(index_path)
+
+
+def remove_index_files(storage_dir: Union[str, Path]) -> None:
+    storage_path = Path(storage_dir)
+    for name in (
+        INDEX_FILENAME,
+        DOCSTORE_BLOB_FILENAME,
+        DOCSTORE_OFFSETS_FILENAME,
+        MERGED_SOURCES_FILENAME,
+        LEGACY_PICKLE_FILENAME,
+    ):
+        path = storage_path / name
+        if path.exists():
+            path.unlink()
+
+
+def write_index(storage_dir: Union[str, Path], index: faiss.Index) -> Path:
+    index_path = Path(storage_dir) / INDEX_FILENAME
+    faiss.write_index(index, str(index_path))
+    return index_path
+
+
+def raise_if_legacy(storage_dir: Union[str, Path]) -> None:
+    storage_path = Path(storage_dir)
+    if not has_docstore(storage_path) and (storage_path / LEGACY_PICKLE_FILENAME).exists():
+        raise RuntimeError(
+            f"{storage_path} holds a legacy pickled index. Re-run "
+            "`python scripts/ingest.py` to rebuild it in the memory-mapped format."
+        )
+
+
+def load_faiss_docstore(storage_dir: Union[str, Path], embeddings: Embeddings):
+    from langchain_community.vectorstores import FAISS
+
+    storage_path = Path(storage_dir)
+    raise_if_legacy(storage_path)
+    if not has_docstore(storage_path):
+        raise FileNotFoundError(f"No FAISS index found in {storage_path}.")
+
+    index = read_index(storage_path)
+    docstore = MmapDocstore(storage_path)
+    if index.ntotal != len(docstore):
+        raise ValueError(
+            f"Index/docstore mismatch in {storage_path}: "
+            f"{index.ntotal} vectors but {len(docstore)} documents."
+        )
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=PositionalIds(len(docstore)),
+    )
@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.app import settings
+
+ENV_EMBED_BATCH_ENABLED = "EMBED_BATCH_ENABLED"
+ENV_EMBED_BATCH_WINDOW_MS = "EMBED_BATCH_WINDOW_MS"
+ENV_EMBED_BATCH_MAX_SIZE = "EMBED_BATCH_MAX_SIZE"
+ENV_EMBED_QUERY_TIMEOUT = "EMBED_QUERY_TIMEOUT_SECONDS"
+ENV_EMBED_CACHE_ENABLED = "EMBED_CACHE_ENABLED"
+ENV_EMBED_CACHE_MAX_ENTRIES = "EMBED_CACHE_MAX_ENTRIES"
+ENV_EMBED_CACHE_MAX_DISK_ENTRIES = "EMBED_CACHE_MAX_DISK_ENTRIES"
+
+DEFAULT_EMBED_BATCH_ENABLED = True
+DEFAULT_EMBED_BATCH_WINDOW_MS = 5.0
+DEFAULT_EMBED_BATCH_MAX_SIZE = 16
+DEFAULT_EMBED_QUERY_TIMEOUT = 60.0
+DEFAULT_EMBED_CACHE_ENABLED = True
+DEFAULT_EMBED_CACHE_MAX_ENTRIES = 4096
+DEFAULT_EMBED_CACHE_MAX_DISK_ENTRIES = 200_000
+
+EMBED_CACHE_FILENAME = "embedding_cache.sqlite"
+DISK_PRUNE_INTERVAL = 256
+
+
+@dataclass
+class _Pending:
+    text: str
+    future: Future
+    enqueued_at: float
+
+
+class BatchingEmbeddings(Embeddings):
+    def __init__(
+        self,
+        base: Embeddings,
+        window_ms: float = DEFAULT_EMBED_BATCH_WINDOW_MS,
+        max_batch_size: int = DEFAULT_EMBED_BATCH_MAX_SIZE,
+        timeout_seconds: float = DEFAULT_EMBED_QUERY_TIMEOUT,
+    ) -> None:
+        if window_ms < 0:
+            raise ValueError("Embedding batch window must not be negative.")
+        if max_batch_size <= 0:
+            raise ValueError("Embedding batch size must be greater than zero.")
+        if timeout_seconds <= 0:
+            raise ValueError("Embedding query timeout must be greater than zero.")
+
+        self.base = base
+        self.window_seconds = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.timeout_seconds = timeout_seconds
+
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._queries = 0
+        self._errors = 0
+        self._max_batch = 0
+        self._batch_sizes: Dict[int, int] = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.base.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        future = self._submit(text)
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except FuturesTimeout:
+            future.cancel()
+            raise TimeoutError(
+                f"Query embedding did not finish within {self.timeout_seconds}s."
+            ) from None
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._submit(text))
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "queries": self._queries,
+                "errors": self._errors,
+                "avg_batch_size": round(self._queries / self._batches, 3) if self._batches else 0.0,
+                "max_batch_size": self._max_batch,
+                "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+                "avg_queue_wait_ms": round(self._wait_total * 1000 / self._queries, 3) if self._queries else 0.0,
+                "max_queue_wait_ms": round(self._wait_max * 1000, 3),
+                "queue_depth": self._queue.qsize(),
+                "window_ms": self.window_seconds * 1000,
+                "batch_limit": self.max_batch_size,
+            }
+
+    def _submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put(_Pending(text=text, future=future, enqueued_at=time.perf_counter()))
+        return future
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self) -> List[_Pending]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = [
+                item for item in self._collect() if item.future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            try:
+                self._record(batch, time.perf_counter())
+                vectors = self.base.embed_documents([item.text for item in batch])
+                if len(vectors) != len(batch):
+                    raise RuntimeError(
+                        f"Embedding server returned {len(vectors)} vectors for {len(batch)} inputs."
+                    )
+                for item, vector in zip(batch, vectors):
+                    item.future.set_result(vector)
+            except Exception as exc:  # noqa: BLE001 - forwarded to every caller
+                with self._stats_lock:
+                    self._errors += 1
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(exc)
+
+    def _record(self, batch: List[_Pending], started: float) -> None:
+        size = len(batch)
+        waits = [started - item.enqueued_at for item in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._queries += size
+            self._max_batch = max(self._max_batch, size)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    normalized = " ".join(str(text).split())
+    return hashlib.sha256(f"{model}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(
+        self,
+        base: Embeddings,
+        model: str,
+        path: Optional[Union[str, Path]] = None,
+        max_entries: int = DEFAULT_EMBED_CACHE_MAX_ENTRIES,
+        max_disk_entries: int = DEFAULT_EMBED_CACHE_MAX_DISK_ENTRIES,
+    ) -> None:
+        if not model:
+            raise ValueError("The embedding cache needs the embedding model name.")
+        if max_entries <= 0:
+            raise ValueError("Embedding cache max entries must be greater than zero.")
+
+        self.base = base
+        self.model = model
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._inserts = 0
+        self._counters: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if path is not None:
+            self._db = self._open(Path(path))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.base.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_cache_key(self.model, text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = embedding_cache_key(self.model, text)
+        vector = self._from_memory(key)
+        if vector is not None:
+            return vector
+        if self._db is None:
+            vector = self._from_disk(key)
+            if vector is None:
+                vector = await self.base.aembed_query(text)
+                self._store(key, vector)
+            return vector
+
+        loop = asyncio.get_running_loop()
+        vector = await loop.run_in_executor(None, self._from_disk, key)
+        if vector is None:
+            vector = await self.base.aembed_query(text)
+            await loop.run_in_executor(None, self._store, key, vector)
+        return vector
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats: Dict[str, object] = {
+                **self._counters,
+                "model": self.model,
+                "memory_entries": len(self._memory),
+                "memory_bytes": sum(vector.nbytes for vector in self._memory.values()),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+            }
+        base_stats = getattr(self.base, "stats", None)
+        if base_stats is not None:
+            stats["batching"] = base_stats()
+        return stats
+
+    def _open(self, path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, "
+            "vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)")
+        db.commit()
+        return db
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vector = self._from_memory(key)
+        if vector is None:
+            vector = self._from_disk(key)
+        return vector
+
+    def _from_memory(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is None:
+                return None
+            self._memory.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            return vector.tolist()
+
+    def _from_disk(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE key = ? AND model = ?",
+                    (key, self.model),
+                ).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+                    self._counters["disk_hits"] += 1
+                    return vector.tolist()
+
+            self._counters["misses"] += 1
+            return None
+
+    def _store(self, key: str, vector: List[float]) -> None:
+        array = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, array)
+            if self._db is None:
+                return
+            blob = array.tobytes()
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, self.model, len(vector), blob, time.time()),
+            )
+            self._inserts += 1
+            if self._inserts % DISK_PRUNE_INTERVAL == 0:
+                self._prune_disk()
+            self._db.commit()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self) -> None:
+        if self.max_disk_entries <= 0:
+            return
+        self._db.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+
+def build_query_embeddings(
+    base: Embeddings,
+    cache_dir: Optional[Union[str, Path]] = None,
+) -> Embeddings:
+    embeddings = base
+    if settings.get_bool(ENV_EMBED_BATCH_ENABLED, DEFAULT_EMBED_BATCH_ENABLED):
+        embeddings = BatchingEmbeddings(
+            base,
+            window_ms=settings.get_float(ENV_EMBED_BATCH_WINDOW_MS, DEFAULT_EMBED_BATCH_WINDOW_MS),
+            max_batch_size=settings.get_int(ENV_EMBED_BATCH_MAX_SIZE, DEFAULT_EMBED_BATCH_MAX_SIZE),
+            timeout_seconds=settings.get_float(
+                ENV_EMBED_QUERY_TIMEOUT, DEFAULT_EMBED_QUERY_TIMEOUT
+            ),
+        )
+    if settings.get_bool(ENV_EMBED_CACHE_ENABLED, DEFAULT_EMBED_CACHE_ENABLED):
+        embeddings = CachedEmbeddings(
+            embeddings,
+            model=getattr(base, "model", "") or type(base).__name__,
+            path=Path(cache_dir) / EMBED_CACHE_FILENAME if cache_dir is not None else None,
+            max_entries=settings.get_int(
+                ENV_EMBED_CACHE_MAX_ENTRIES, DEFAULT_EMBED_CACHE_MAX_ENTRIES
+            ),
+            max_disk_entries=settings.get_int(
+                ENV_EMBED_CACHE_MAX_DISK_ENTRIES, DEFAULT_EMBED_CACHE_MAX_DISK_ENTRIES
+            ),
+        )
+    return embeddings
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from src.app import settings
+from src.app.metrics import COLLECTION_EVICTIONS_TOTAL, COLLECTION_LOAD_SECONDS
+from src.app.rag.reloader import IndexHandle
+from src.app.rag.versions import MANIFEST_FILENAME
+
+ENV_COLLECTIONS_DIR = "COLLECTIONS_DIR"
+ENV_COLLECTIONS_MAX_BYTES = "COLLECTIONS_MAX_BYTES"
+
+DEFAULT_COLLECTIONS_DIRNAME = "collections"
+DEFAULT_COLLECTIONS_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+CollectionOpener = Callable[[str, Path], Tuple[IndexHandle, object]]
+
+
+def collections_root(storage_dir: Union[str, Path]) -> Path:
+    configured = os.getenv(ENV_COLLECTIONS_DIR, "").strip()
+    return Path(configured) if configured else Path(storage_dir) / DEFAULT_COLLECTIONS_DIRNAME
+
+
+def collection_dir(root: Union[str, Path], name: str) -> Path:
+    if not _NAME_RE.match(name or ""):
+        raise ValueError(
+            f"Invalid collection name: {name!r}. Use up to 64 letters, digits, '_' or '-'."
+        )
+    return Path(root) / name
+
+
+def list_collections(root: Union[str, Path]) -> List[str]:
+    root_path = Path(root)
+    if not root_path.exists():
+        return []
+    return sorted(
+        path.name
+        for path in root_path.iterdir()
+        if path.is_dir() and _NAME_RE.match(path.name) and (path / MANIFEST_FILENAME).exists()
+    )
+
+
+def _resident_bytes(index_dir: Optional[Path]) -> int:
+    from src.app.rag.docstore import has_docstore, resident_bytes
+
+    if index_dir is None or not index_dir.exists():
+        return 0
+    if has_docstore(index_dir):
+        return resident_bytes(index_dir)
+    return sum(path.stat().st_size for path in index_dir.rglob("*") if path.is_file())
+
+
+@dataclass
+class Collection:
+    name: str
+    index: IndexHandle
+    chain: object
+    resident_bytes: int
+    loaded_at: str
+    load_seconds: float
+    last_used: float
+    hits: int = 0
+    measured_reloads: int = 0
+
+    def status(self, now: float) -> Dict[str, object]:
+        return {
+            "loaded": True,
+            "version": self.index.version,
+            "resident_bytes": self.resident_bytes,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "hits": self.hits,
+            "idle_seconds": round(now - self.last_used, 3),
+        }
+
+
+class CollectionRegistry:
+    def __init__(
+        self,
+        root: Union[str, Path],
+        opener: CollectionOpener,
+        max_bytes: int = DEFAULT_COLLECTIONS_MAX_BYTES,
+        watch_interval: float = 0.0,
+    ) -> None:
+        if max_bytes <= 0:
+            raise ValueError("COLLECTIONS_MAX_BYTES must be greater than zero.")
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.watch_interval = watch_interval
+        self._opener = opener
+        self._loaded: "OrderedDict[str, Collection]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._counters: Dict[str, int] = {"loads": 0, "hits": 0, "evictions": 0, "load_errors": 0}
+
+    def exists(self, name: str) -> bool:
+        return (collection_dir(self.root, name) / MANIFEST_FILENAME).exists()
+
+    def get(self, name: str) -> Collection:
+        storage_dir = collection_dir(self.root, name)
+        with self._lock:
+            collection = self._use(name)
+            if collection is not None:
+                evicted = self._rebalance(keep=name)
+        if collection is not None:
+            self._stop(evicted)
+            return collection
+
+        if not (storage_dir / MANIFEST_FILENAME).exists():
+            raise FileNotFoundError(f"Collection {name} does not exist.")
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        try:
+            with load_lock:
+                with self._lock:
+                    collection = self._use(name)
+                    if collection is not None:
+                        return collection
+                collection = self._load(name, storage_dir)
+                with self._lock:
+                    self._loaded[name] = collection
+                    self._bytes += collection.resident_bytes
+                    self._counters["loads"] += 1
+                    evicted = self._rebalance(keep=name)
+        finally:
+            with self._lock:
+                if self._load_locks.get(name) is load_lock:
+                    del self._load_locks[name]
+        self._stop(evicted)
+        return collection
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            collection = self._loaded.pop(name, None)
+            if collection is None:
+                return False
+            self._bytes -= collection.resident_bytes
+            self._counters["evictions"] += 1
+        COLLECTION_EVICTIONS_TOTAL.inc()
+        collection.index.stop_watching()
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            collections = list(self._loaded.values())
+            self._loaded.clear()
+            self._bytes = 0
+        for collection in collections:
+            collection.index.stop_watching()
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            self._remeasure()
+            loaded = {name: collection.status(now) for name, collection in self._loaded.items()}
+            resident = self._bytes
+            counters = dict(self._counters)
+        available = {
+            name: loaded.get(name, {"loaded": False}) for name in list_collections(self.root)
+        }
+        return {
+            **counters,
+            "root": str(self.root),
+            "loaded": len(loaded),
+            "resident_bytes": resident,
+            "max_bytes": self.max_bytes,
+            "collections": available,
+        }
+
+    def _use(self, name: str) -> Optional[Collection]:
+        collection = self._loaded.get(name)
+        if collection is None:
+            return None
+        collection.hits += 1
+        collection.last_used = time.monotonic()
+        self._loaded.move_to_end(name)
+        self._counters["hits"] += 1
+        return collection
+
+    def _load(self, name: str, storage_dir: Path) -> Collection:
+        started = time.perf_counter()
+        try:
+            index, chain = self._opener(name, storage_dir)
+            index.reload(force=True)
+        except Exception:
+            with self._lock:
+                self._counters["load_errors"] += 1
+            raise
+        index.start_watching(self.watch_interval)
+        load_seconds = time.perf_counter() - started
+        COLLECTION_LOAD_SECONDS.observe(load_seconds, collection=name)
+        return Collection(
+            name=name,
+            index=index,
+            chain=chain,
+            resident_bytes=_resident_bytes(index.index_dir),
+            loaded_at=datetime.now(timezone.utc).isoformat(),
+            load_seconds=round(load_seconds, 4),
+            last_used=time.monotonic(),
+            measured_reloads=index.reloads,
+        )
+
+    def _remeasure(self) -> None:
+        for collection in self._loaded.values():
+            reloads = collection.index.reloads
+            if reloads == collection.measured_reloads:
+                continue
+            resident = _resident_bytes(collection.index.index_dir)
+            self._bytes += resident - collection.resident_bytes
+            collection.resident_bytes = resident
+            collection.measured_reloads = reloads
+
+    def _rebalance(self, keep: str) -> List[Collection]:
+        self._remeasure()
+        return self._evict(keep)
+
+    def _stop(self, evicted: List[Collection]) -> None:
+        for collection in evicted:
+            collection.index.stop_watching()
+
+    def _evict(self, keep: str) -> List[Collection]:
+        evicted: List[Collection] = []
+        while self._bytes > self.max_bytes and len(self._loaded) > 1:
+            oldest = next(iter(self._loaded))
+            if oldest == keep:
+                break
+            collection = self._loaded.pop(oldest)
+            self._bytes -= collection.resident_bytes
+            self._counters["evictions"] += 1
+            COLLECTION_EVICTIONS_TOTAL.inc()
+            evicted.append(collection)
+        return evicted
+
+
+def build_collection_registry(
+    storage_dir: Union[str, Path],
+    opener: CollectionOpener,
+    watch_interval: float = 0.0,
+) -> CollectionRegistry:
+    return CollectionRegistry(
+        collections_root(storage_dir),
+        opener,
+        max_bytes=settings.get_int(ENV_COLLECTIONS_MAX_BYTES, DEFAULT_COLLECTIONS_MAX_BYTES),
+        watch_interval=watch_interval,
+    )
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from src.app.rag.versions import (
+    MANIFEST_FILENAME,
+    current_version,
+    list_versions,
+    publish_version,
+    resolve_index_dir,
+)
+
+ENV_INDEX_WATCH_INTERVAL = "INDEX_WATCH_INTERVAL_SECONDS"
+
+DEFAULT_INDEX_WATCH_INTERVAL = 5.0
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class IndexHandle:
+    def __init__(
+        self,
+        storage_dir: Union[str, Path],
+        loader: Callable[[Path], object],
+    ) -> None:
+        self.storage_dir = Path(storage_dir)
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._vectorstore: Optional[object] = None
+        self._version: Optional[str] = None
+        self._index_dir: Optional[Path] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._loaded_at: Optional[str] = None
+        self._load_seconds: Optional[float] = None
+        self._reloads = 0
+        self._last_error: Optional[str] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.storage_dir / MANIFEST_FILENAME
+
+    def current(self) -> object:
+        vectorstore = self._vectorstore
+        if vectorstore is None:
+            raise RuntimeError("The vector index is not loaded yet.")
+        return vectorstore
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+    @property
+    def index_dir(self) -> Optional[Path]:
+        return self._index_dir
+
+    @property
+    def reloads(self) -> int:
+        return self._reloads
+
+    @property
+    def loaded(self) -> bool:
+        return self._vectorstore is not None
+
+    def reload(self, force: bool = False) -> bool:
+        with self._reload_lock:
+            signature = _signature(self.manifest_path)
+            if not force and self._vectorstore is not None and signature == self._signature:
+                return False
+
+            version = current_version(self.storage_dir)
+            index_dir = resolve_index_dir(self.storage_dir)
+            started = time.perf_counter()
+            try:
+                vectorstore = self._loader(index_dir)
+            except Exception as exc:  # noqa: BLE001 - keep serving the previous index
+                self._last_error = f"{type(exc).__name__}: {exc}"
+                raise
+
+            with self._lock:
+                self._vectorstore = vectorstore
+                self._version = version
+                self._index_dir = index_dir
+                self._signature = signature
+                self._loaded_at = datetime.now(timezone.utc).isoformat()
+                self._load_seconds = round(time.perf_counter() - started, 4)
+                self._reloads += 1
+                self._last_error = None
+            return True
+
+    def activate(self, version: str) -> None:
+        if version not in list_versions(self.storage_dir):
+            raise FileNotFoundError(f"Index version {version} does not exist.")
+        publish_version(self.storage_dir, version)
+        self.reload(force=True)
+
+    def start_watching(self, interval: float = DEFAULT_INDEX_WATCH_INTERVAL) -> None:
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="index-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.join(timeout=5)
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "loaded": self._vectorstore is not None,
+                "version": self._version,
+                "index_dir": str(self._index_dir) if self._index_dir else None,
+                "loaded_at": self._loaded_at,
+                "load_seconds": self._load_seconds,
+                "reloads": self._reloads,
+                "last_error": self._last_error,
+                "watching": self._watcher is not None,
+                "available_versions": list_versions(self.storage_dir),
+            }
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.reload()
+            except Exception:  # noqa: BLE001 - recorded in last_error, retried next tick
+                continue
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from src.app import settings
+from src.app.metrics import (
+    SCHEDULER_REJECTED_TOTAL,
+    SINGLE_FLIGHT_SHARED_TOTAL,
+    STAGE_QUEUE,
+    record_stage,
+)
+
+ENV_CHAT_MAX_CONCURRENCY = "CHAT_MAX_CONCURRENCY"
+ENV_CHAT_MAX_QUEUE = "CHAT_MAX_QUEUE"
+ENV_CHAT_QUEUE_TIMEOUT = "CHAT_QUEUE_TIMEOUT_SECONDS"
+ENV_CHAT_RETRY_AFTER = "CHAT_RETRY_AFTER_SECONDS"
+ENV_CHAT_SINGLE_FLIGHT = "CHAT_SINGLE_FLIGHT"
+
+DEFAULT_CHAT_MAX_CONCURRENCY = 4
+DEFAULT_CHAT_MAX_QUEUE = 32
+DEFAULT_CHAT_QUEUE_TIMEOUT = 30.0
+DEFAULT_CHAT_RETRY_AFTER = 5
+DEFAULT_CHAT_SINGLE_FLIGHT = True
+
+PRIORITY_HEADER = "X-Priority"
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITY_RANKS = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 1}
+
+_priority: ContextVar[str] = ContextVar("rag_request_priority", default=PRIORITY_INTERACTIVE)
+
+
+class SchedulerBusy(RuntimeError):
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    max_concurrency: int = DEFAULT_CHAT_MAX_CONCURRENCY
+    max_queue: int = DEFAULT_CHAT_MAX_QUEUE
+    queue_timeout: float = DEFAULT_CHAT_QUEUE_TIMEOUT
+    retry_after: int = DEFAULT_CHAT_RETRY_AFTER
+    single_flight: bool = DEFAULT_CHAT_SINGLE_FLIGHT
+
+    @classmethod
+    def from_env(cls) -> "SchedulerConfig":
+        config = cls(
+            max_concurrency=settings.get_int(ENV_CHAT_MAX_CONCURRENCY, DEFAULT_CHAT_MAX_CONCURRENCY),
+            max_queue=settings.get_int(ENV_CHAT_MAX_QUEUE, DEFAULT_CHAT_MAX_QUEUE),
+            queue_timeout=settings.get_float(ENV_CHAT_QUEUE_TIMEOUT, DEFAULT_CHAT_QUEUE_TIMEOUT),
+            retry_after=settings.get_int(ENV_CHAT_RETRY_AFTER, DEFAULT_CHAT_RETRY_AFTER),
+            single_flight=settings.get_bool(ENV_CHAT_SINGLE_FLIGHT, DEFAULT_CHAT_SINGLE_FLIGHT),
+        )
+        config.validate()
+        return config
+
+    def validate(self) -> None:
+        if self.max_concurrency <= 0:
+            raise ValueError("CHAT_MAX_CONCURRENCY must be greater than zero.")
+        if self.max_queue < 0:
+            raise ValueError("CHAT_MAX_QUEUE must not be negative.")
+        if self.queue_timeout <= 0:
+            raise ValueError("CHAT_QUEUE_TIMEOUT_SECONDS must be greater than zero.")
+        if self.retry_after < 0:
+            raise ValueError("CHAT_RETRY_AFTER_SECONDS must not be negative.")
+
+
+def parse_priority(value: Optional[str]) -> str:
+    value = (value or "").strip().lower()
+    return value if value in PRIORITY_RANKS else PRIORITY_INTERACTIVE
+
+
+def set_priority(priority: str) -> Token:
+    return _priority.set(parse_priority(priority))
+
+
+def reset_priority(token: Token) -> None:
+    _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class Scheduler:
+    def __init__(self, config: Optional[SchedulerConfig] = None) -> None:
+        self.config = config or SchedulerConfig.from_env()
+        self.config.validate()
+        self._active = 0
+        self._queued = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def queue_limit(self, priority: str) -> int:
+        if priority == PRIORITY_BATCH:
+            return self.config.max_queue // 2
+        return self.config.max_queue
+
+    def saturated(self, priority: str) -> bool:
+        return (
+            self._active >= self.config.max_concurrency
+            and self._queued >= self.queue_limit(priority)
+        )
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None) -> AsyncIterator[None]:
+        await self._acquire(parse_priority(priority or current_priority()))
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "max_concurrency": self.config.max_concurrency,
+            "max_queue": self.config.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def busy(self, reason: str) -> SchedulerBusy:
+        self.rejected += 1
+        SCHEDULER_REJECTED_TOTAL.inc(reason=reason)
+        return SchedulerBusy(
+            f"The server is busy ({reason}); retry in {self.config.retry_after}s.",
+            self.config.retry_after,
+        )
+
+    async def _acquire(self, priority: str) -> None:
+        if self._active < self.config.max_concurrency and not self._queued:
+            self._active += 1
+            self.admitted += 1
+            record_stage(STAGE_QUEUE, 0.0)
+            return
+        if self._queued >= self.queue_limit(priority):
+            raise self.busy("queue full")
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._waiters, (PRIORITY_RANKS[priority], self._sequence, waiter))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.config.queue_timeout)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                waiter.cancel()
+                self._queued -= 1
+            if isinstance(exc, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise self.busy("queue timeout") from None
+            raise
+        self.admitted += 1
+        record_stage(STAGE_QUEUE, time.perf_counter() - started)
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.cancelled():
+                continue
+            self._queued -= 1
+            waiter.set_result(None)
+            return
+        self._active -= 1
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.pieces: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def push(self, piece: str) -> None:
+        self.pieces.append(piece)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._wake()
+
+    async def follow(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            while position < len(self.pieces):
+                yield self.pieces[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+    def _wake(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._flights
+
+    async def run(
+        self,
+        key: str,
+        produce: Callable[[], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._produce(key, flight, produce()))
+        else:
+            self.shared += 1
+            SINGLE_FLIGHT_SHARED_TOTAL.inc()
+
+        flight.subscribers += 1
+        try:
+            async for piece in flight.follow():
+                yield piece
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.done:
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    async def _produce(self, key: str, flight: _Flight, pieces: AsyncIterator[str]) -> None:
+        try:
+            async for piece in pieces:
+                flight.push(piece)
+        except BaseException as exc:  # noqa: BLE001 - delivered to every subscriber
+            flight.finish(exc)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+        else:
+            flight.finish()
+        finally:
+            self._forget(key, flight)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import logging
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app import settings
+from src.app.rag.cache import unit_vector
+from src.app.rag.context import ScoredDocs, estimate_tokens
+
+ENV_SESSIONS_ENABLED = "SESSIONS_ENABLED"
+ENV_SESSION_IDLE_SECONDS = "SESSION_IDLE_SECONDS"
+ENV_SESSION_MAX_BYTES = "SESSION_MAX_BYTES"
+ENV_SESSION_MAX_TURNS = "SESSION_MAX_TURNS"
+ENV_SESSION_HISTORY_TOKENS = "SESSION_HISTORY_TOKENS"
+ENV_SESSION_REUSE_SIMILARITY = "SESSION_REUSE_SIMILARITY"
+ENV_SESSION_FOLLOWUP_SIMILARITY = "SESSION_FOLLOWUP_SIMILARITY"
+ENV_WORKERS = "WEB_CONCURRENCY"
+
+DEFAULT_SESSIONS_ENABLED = True
+DEFAULT_SESSION_IDLE_SECONDS = 1800.0
+DEFAULT_SESSION_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_SESSION_MAX_TURNS = 4
+DEFAULT_SESSION_HISTORY_TOKENS = 300
+DEFAULT_SESSION_REUSE_SIMILARITY = 0.9
+DEFAULT_SESSION_FOLLOWUP_SIMILARITY = 0.5
+
+SESSION_OVERHEAD_BYTES = 512
+TURN_OVERHEAD_BYTES = 128
+MAX_SESSION_ID_LENGTH = 128
+SESSION_ID_BYTES = 24
+
+RETRIEVAL_REUSE = "reuse"
+RETRIEVAL_EXTEND = "extend"
+RETRIEVAL_NEW = "new"
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+SessionKey = Tuple[str, str]
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidSessionId(ValueError):
+    pass
+
+
+class UnknownSession(LookupError):
+    pass
+
+
+def valid_session_id(session_id: object) -> bool:
+    return (
+        isinstance(session_id, str)
+        and 0 < len(session_id) <= MAX_SESSION_ID_LENGTH
+        and bool(_SESSION_ID_RE.match(session_id))
+    )
+
+
+def _doc_key(doc) -> Tuple[object, object, str]:
+    return doc.metadata.get("source"), doc.metadata.get("start_index"), doc.page_content
+
+
+def _docs_bytes(scored_docs: ScoredDocs) -> int:
+    return sum(
+        len(doc.page_content.encode("utf-8")) + TURN_OVERHEAD_BYTES for doc, _ in scored_docs
+    )
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+    sources: List[str]
+
+    @property
+    def size(self) -> int:
+        return (
+            len(self.question.encode("utf-8"))
+            + len(self.answer.encode("utf-8"))
+            + sum(len(source.encode("utf-8")) for source in self.sources)
+            + TURN_OVERHEAD_BYTES
+        )
+
+
+@dataclass
+class Session:
+    scope: str
+    session_id: str
+    created_at: float
+    last_used: float
+    turns: List[Turn] = field(default_factory=list)
+    topic: Optional[np.ndarray] = None
+    scored_docs: ScoredDocs = field(default_factory=list)
+    size: int = SESSION_OVERHEAD_BYTES
+
+    def measure(self) -> int:
+        self.size = (
+            SESSION_OVERHEAD_BYTES
+            + sum(turn.size for turn in self.turns)
+            + (self.topic.nbytes if self.topic is not None else 0)
+            + _docs_bytes(self.scored_docs)
+        )
+        return self.size
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "collection": self.scope or None,
+            "session_id": self.session_id,
+            "turns": [
+                {"question": turn.question, "answer": turn.answer, "sources": turn.sources}
+                for turn in self.turns
+            ],
+            "retained_chunks": len(self.scored_docs),
+            "bytes": self.size,
+        }
+
+
+@dataclass(frozen=True)
+class Retrieval:
+    mode: str
+    query: Sequence[float]
+    scored_docs: Optional[ScoredDocs] = None
+    history: str = ""
+
+
+class SessionStore:
+    def __init__(
+        self,
+        idle_seconds: float = DEFAULT_SESSION_IDLE_SECONDS,
+        max_bytes: int = DEFAULT_SESSION_MAX_BYTES,
+        max_turns: int = DEFAULT_SESSION_MAX_TURNS,
+        history_tokens: int = DEFAULT_SESSION_HISTORY_TOKENS,
+        reuse_similarity: float = DEFAULT_SESSION_REUSE_SIMILARITY,
+        followup_similarity: float = DEFAULT_SESSION_FOLLOWUP_SIMILARITY,
+    ) -> None:
+        if idle_seconds <= 0:
+            raise ValueError("Session idle timeout must be greater than zero.")
+        if max_bytes <= 0:
+            raise ValueError("Session max bytes must be greater than zero.")
+        if max_turns < 0 or history_tokens < 0:
+            raise ValueError("Session max turns and history tokens must not be negative.")
+        if not 0.0 < followup_similarity <= reuse_similarity <= 1.0:
+            raise ValueError(
+                "Session similarities must satisfy 0 < follow-up <= reuse <= 1."
+            )
+
+        self.idle_seconds = idle_seconds
+        self.max_bytes = max_bytes
+        self.max_turns = max_turns
+        self.history_tokens = history_tokens
+        self.reuse_similarity = reuse_similarity
+        self.followup_similarity = followup_similarity
+
+        self._sessions: "OrderedDict[SessionKey, Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "created": 0,
+            "turns": 0,
+            "reused_retrievals": 0,
+            "extended_retrievals": 0,
+            "new_retrievals": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def create(self, scope: str = "") -> str:
+        session_id = secrets.token_urlsafe(SESSION_ID_BYTES)
+        key = (scope, session_id)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = Session(scope=scope, session_id=session_id, created_at=now, last_used=now)
+            self._sessions[key] = session
+            self._bytes += session.size
+            self._counters["created"] += 1
+            self._evict(keep=key)
+        return session_id
+
+    def exists(self, key: SessionKey) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return key in self._sessions
+
+    def retrieval_for(self, key: SessionKey, embedding: Sequence[float]) -> Retrieval:
+        query = unit_vector(embedding)
+        with self._lock:
+            session = self._touch(key)
+            history = self._history(session)
+            if query is None or session.topic is None or session.topic.shape != query.shape:
+                self._counters["new_retrievals"] += 1
+                return Retrieval(RETRIEVAL_NEW, embedding, history=history)
+
+            similarity = float(np.dot(session.topic, query))
+            if similarity >= self.reuse_similarity and session.scored_docs:
+                self._counters["reused_retrievals"] += 1
+                return Retrieval(
+                    RETRIEVAL_REUSE, session.topic, list(session.scored_docs), history=history
+                )
+            blended = unit_vector(session.topic + query)
+            if similarity >= self.followup_similarity and blended is not None:
+                self._counters["extended_retrievals"] += 1
+                return Retrieval(RETRIEVAL_EXTEND, blended.tolist(), history=history)
+            self._counters["new_retrievals"] += 1
+            return Retrieval(RETRIEVAL_NEW, embedding, history=history)
+
+    def merge(self, key: SessionKey, scored_docs: ScoredDocs, limit: int) -> ScoredDocs:
+        with self._lock:
+            session = self._sessions.get(key)
+            previous = session.scored_docs if session is not None else []
+        best: Dict[Tuple[object, object, str], Tuple[object, float]] = {}
+        for doc, score in [*previous, *scored_docs]:
+            key = _doc_key(doc)
+            if key not in best or score > best[key][1]:
+                best[key] = (doc, score)
+        merged = sorted(best.values(), key=lambda item: item[1], reverse=True)
+        return merged[:limit]
+
+    def remember(
+        self,
+        key: SessionKey,
+        question: str,
+        answer: str,
+        sources: List[str],
+        retrieval: Retrieval,
+        scored_docs: ScoredDocs,
+    ) -> None:
+        with self._lock:
+            if key not in self._sessions:
+                return
+            session = self._touch(key)
+            self._bytes -= session.size
+            if self.max_turns:
+                session.turns.append(
+                    Turn(question=question, answer=self._compact(answer), sources=sources)
+                )
+                del session.turns[: -self.max_turns]
+            session.topic = unit_vector(retrieval.query)
+            session.scored_docs = list(scored_docs)
+            self._bytes += session.measure()
+            self._counters["turns"] += 1
+            self._evict(keep=key)
+
+    def get(self, key: SessionKey) -> Optional[Dict[str, object]]:
+        with self._lock:
+            self._expire(time.monotonic())
+            session = self._sessions.get(key)
+            return session.snapshot() if session is not None else None
+
+    def delete(self, key: SessionKey) -> bool:
+        with self._lock:
+            if key not in self._sessions:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                **self._counters,
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "idle_seconds": self.idle_seconds,
+                "max_turns": self.max_turns,
+                "history_tokens": self.history_tokens,
+                "reuse_similarity": self.reuse_similarity,
+                "followup_similarity": self.followup_similarity,
+            }
+
+    def _touch(self, key: SessionKey) -> Session:
+        now = time.monotonic()
+        self._expire(now)
+        session = self._sessions.get(key)
+        if session is None:
+            raise UnknownSession("Unknown or expired session.")
+        session.last_used = now
+        self._sessions.move_to_end(key)
+        return session
+
+    def _history(self, session: Session) -> str:
+        budget = self.history_tokens
+        lines: List[str] = []
+        for turn in reversed(session.turns):
+            entry = f"User: {turn.question}\nAssistant: {turn.answer}"
+            cost = estimate_tokens(entry)
+            if cost > budget:
+                break
+            lines.append(entry)
+            budget -= cost
+        return "\n".join(reversed(lines))
+
+    def _compact(self, answer: str) -> str:
+        text = " ".join(answer.split())
+        max_chars = self.history_tokens * 4 // max(1, self.max_turns)
+        if len(text) <= max_chars:
+            return text
+        cut = text[:max_chars]
+        boundary = cut.rfind(" ")
+        return (cut[:boundary] if boundary > 0 else cut) + "…"
+
+    def _expire(self, now: float) -> None:
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.idle_seconds:
+                return
+            self._remove(key)
+            self._counters["expirations"] += 1
+
+    def _evict(self, keep: SessionKey) -> None:
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            self._remove(oldest)
+            self._counters["evictions"] += 1
+
+    def _remove(self, key: SessionKey) -> None:
+        session = self._sessions.pop(key)
+        self._bytes -= session.size
+
+
+def session_from_input(
+    input_data,
+    sessions: Optional[SessionStore],
+    scope: str = "",
+) -> Optional[SessionKey]:
+    session_id = input_data.get("session_id") if isinstance(input_data, dict) else None
+    if session_id is None or sessions is None:
+        return None
+    if not valid_session_id(session_id):
+        raise InvalidSessionId(
+            "session_id must be 1-128 letters, digits, '_' or '-'."
+        )
+    key = (scope, session_id)
+    if not sessions.exists(key):
+        raise UnknownSession("Unknown or expired session.")
+    return key
+
+
+def build_session_store() -> Optional[SessionStore]:
+    if not settings.get_bool(ENV_SESSIONS_ENABLED, DEFAULT_SESSIONS_ENABLED):
+        return None
+    workers = settings.get_int(ENV_WORKERS, 1)
+    if workers > 1:
+        logger.warning(
+            "Sessions are disabled because %s=%d: each worker keeps its own session "
+            "store, so a follow-up could reach a worker that does not know the session.",
+            ENV_WORKERS,
+            workers,
+        )
+        return None
+    return SessionStore(
+        idle_seconds=settings.get_float(ENV_SESSION_IDLE_SECONDS, DEFAULT_SESSION_IDLE_SECONDS),
+        max_bytes=settings.get_int(ENV_SESSION_MAX_BYTES, DEFAULT_SESSION_MAX_BYTES),
+        max_turns=settings.get_int(ENV_SESSION_MAX_TURNS, DEFAULT_SESSION_MAX_TURNS),
+        history_tokens=settings.get_int(
+            ENV_SESSION_HISTORY_TOKENS, DEFAULT_SESSION_HISTORY_TOKENS
+        ),
+        reuse_similarity=settings.get_float(
+            ENV_SESSION_REUSE_SIMILARITY, DEFAULT_SESSION_REUSE_SIMILARITY
+        ),
+        followup_similarity=settings.get_float(
+            ENV_SESSION_FOLLOWUP_SIMILARITY, DEFAULT_SESSION_FOLLOWUP_SIMILARITY
+        ),
+    )
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+VERSIONS_DIRNAME = "versions"
+MANIFEST_FILENAME = "manifest.json"
+
+
+def new_version_id() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+def versions_root(storage_dir: Union[str, Path]) -> Path:
+    return Path(storage_dir) / VERSIONS_DIRNAME
+
+
+def version_dir(storage_dir: Union[str, Path], version: str) -> Path:
+    if not version or "/" in version or "\\" in version or version.startswith("."):
+        raise ValueError(f"Invalid index version: {version!r}")
+    return versions_root(storage_dir) / version
+
+
+def read_manifest(manifest_path: Union[str, Path]) -> Optional[Dict[str, object]]:
+    path = Path(manifest_path)
+    if not path.exists():
+        return None
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json_atomic(path: Union[str, Path], payload: Dict[str, object]) -> Path:
+    target = Path(path)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, target)
+    return target
+
+
+def current_version(storage_dir: Union[str, Path]) -> Optional[str]:
+    manifest = read_manifest(Path(storage_dir) / MANIFEST_FILENAME)
+    if not manifest:
+        return None
+    version = manifest.get("version")
+    return str(version) if version else None
+
+
+def resolve_index_dir(storage_dir: Union[str, Path]) -> Path:
+    version = current_version(storage_dir)
+    if version is None:
+        return Path(storage_dir)
+    return version_dir(storage_dir, version)
+
+
+def list_versions(storage_dir: Union[str, Path]) -> List[str]:
+    root = versions_root(storage_dir)
+    if not root.exists():
+        return []
+    return sorted(
+        path.name
+        for path in root.iterdir()
+        if path.is_dir() and (path / MANIFEST_FILENAME).exists()
+    )
+
+
+def publish_version(storage_dir: Union[str, Path], version: str) -> Path:
+    source = version_dir(storage_dir, version) / MANIFEST_FILENAME
+    manifest = read_manifest(source)
+    if manifest is None:
+        raise FileNotFoundError(f"Index version {version} has no manifest at {source}.")
+    manifest["version"] = version
+    manifest["published_at"] = datetime.now(timezone.utc).isoformat()
+    return write_json_atomic(Path(storage_dir) / MANIFEST_FILENAME, manifest)
+
+
+def prune_versions(storage_dir: Union[str, Path], keep: int) -> List[str]:
+    if keep <= 0:
+        return []
+    active = current_version(storage_dir)
+    versions = list_versions(storage_dir)
+    removable = [version for version in versions[:-keep] if version != active]
+    for version in removable:
+        shutil.rmtree(version_dir(storage_dir, version), ignore_errors=True)
+    return removable
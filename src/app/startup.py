@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+ENV_STARTUP_WARMUP = "STARTUP_WARMUP"
+ENV_STARTUP_RETRY_SECONDS = "STARTUP_RETRY_SECONDS"
+
+DEFAULT_STARTUP_WARMUP = True
+DEFAULT_STARTUP_RETRY_SECONDS = 10.0
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+StartupStep = Tuple[str, Callable[[], object]]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class ComponentState:
+    status: str = STATUS_PENDING
+    seconds: Optional[float] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class Readiness:
+    def __init__(self, components: Iterable[str]) -> None:
+        self._lock = threading.Lock()
+        self._components: Dict[str, ComponentState] = {
+            name: ComponentState() for name in components
+        }
+        self._started_at = _now()
+        self._ready_at: Optional[str] = None
+
+    def run(self, name: str, func: Callable[[], object]) -> bool:
+        with self._lock:
+            state = self._components.setdefault(name, ComponentState())
+            state.status = STATUS_RUNNING
+            state.attempts += 1
+            state.updated_at = _now()
+
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception as exc:  # noqa: BLE001 - reported on /ready and retried
+            ok, error = False, f"{type(exc).__name__}: {exc}"
+        else:
+            ok, error = True, None
+        elapsed = round(time.perf_counter() - started, 4)
+
+        with self._lock:
+            state.status = STATUS_READY if ok else STATUS_FAILED
+            state.seconds = elapsed
+            state.error = error
+            state.updated_at = _now()
+            if self._ready_at is None and self._all_ready():
+                self._ready_at = state.updated_at
+        return ok
+
+    def is_ready(self, name: Optional[str] = None) -> bool:
+        with self._lock:
+            if name is not None:
+                state = self._components.get(name)
+                return state is not None and state.status == STATUS_READY
+            return self._all_ready()
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return [
+                name for name, state in self._components.items() if state.status != STATUS_READY
+            ]
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "ready": self._all_ready(),
+                "started_at": self._started_at,
+                "ready_at": self._ready_at,
+                "components": {name: asdict(state) for name, state in self._components.items()},
+            }
+
+    def _all_ready(self) -> bool:
+        return all(state.status == STATUS_READY for state in self._components.values())
+
+
+def run_startup(
+    readiness: Readiness,
+    steps: List[StartupStep],
+    stop: threading.Event,
+    retry_seconds: float = DEFAULT_STARTUP_RETRY_SECONDS,
+) -> None:
+    while not stop.is_set():
+        for name, func in steps:
+            if stop.is_set():
+                return
+            if readiness.is_ready(name):
+                continue
+            if not readiness.run(name, func):
+                break
+        if readiness.is_ready() or retry_seconds <= 0:
+            return
+        stop.wait(retry_seconds)
+
+
+def start_background_startup(
+    readiness: Readiness,
+    steps: List[StartupStep],
+    retry_seconds: float = DEFAULT_STARTUP_RETRY_SECONDS,
+) -> threading.Event:
+    stop = threading.Event()
+    threading.Thread(
+        target=run_startup,
+        args=(readiness, steps, stop, retry_seconds),
+        name="startup",
+        daemon=True,
+    ).start()
+    return stop
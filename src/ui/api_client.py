@@ -1,19 +1,46 @@
 from __future__ import annotations
 
 import json
-import os 
-from typing import Iterator, Optional
+import os
+import threading
+from typing import Iterator, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 DEFAULT_BASE_URL = "http://localhost:8000"
 DEFAULT_TIMEOUT = 300
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 4
 
 ENV_BASE_URL = "LANGSERVE_BASE_URL"
 
+SHAPE_QUESTION = "question"
+SHAPE_STRING = "string"
+
+SSE_EVENT_DATA = "data"
+SSE_EVENT_ERROR = "error"
+SSE_EVENT_END = "end"
+
+SESSION_EXPIRED_DETAIL = "Unknown or expired session."
+
+
+class SessionExpired(RuntimeError):
+    pass
+
+
 def _base_url() -> str:
     return os.getenv(ENV_BASE_URL, DEFAULT_BASE_URL).rstrip("/")
 
+
+def _chat_path(collection: Optional[str] = None) -> str:
+    return f"/collections/{collection}" if collection else "/chat"
+
+
+def _sessions_path(collection: Optional[str] = None) -> str:
+    return f"/collections/{collection}/sessions" if collection else "/sessions"
+
+
 def _extract_output(data) -> str:
     if isinstance(data, dict):
         if "output" in data:
@@ -24,63 +51,216 @@ def _extract_output(data) -> str:
         return "\n".join(str(x) for x in data)
     return str(data)
 
-def invoke_chat(question: str, timeout: int = DEFAULT_TIMEOUT) -> str:
-    url = f"{_base_url()}/chat/invoke"
 
-    payload = {"input": {"question": question}}
-    resp = requests.post(url, json=payload, timeout=timeout)
+def _extract_chunk(data: str) -> str:
+    if data == "[DONE]":
+        return ""
+    try:
+        obj = json.loads(data)
+    except json.JSONDecodeError:
+        return data
+
+    if isinstance(obj, str):
+        return obj
+    if isinstance(obj, dict):
+        chunk = obj.get("output") or obj.get("chunk") or obj.get("delta") or obj.get("text")
+        if isinstance(chunk, dict):
+            chunk = chunk.get("content") or chunk.get("text") or ""
+        return str(chunk) if chunk else ""
+    return ""
+
+
+def _shape_from_schema(schema) -> str:
+    if isinstance(schema, dict):
+        if schema.get("type") == "string":
+            return SHAPE_STRING
+        properties = schema.get("properties")
+        if isinstance(properties, dict) and properties and "question" not in properties:
+            return SHAPE_STRING
+    return SHAPE_QUESTION
 
-    if resp.status_code == 422:
-        payload = {"input": question}
-        resp = requests.post(url, json=payload, timeout=(10, 600))
 
-    resp.raise_for_status()
-    data = resp.json()
-    return _extract_output(data)
+def iter_sse_data(lines: Iterator[str]) -> Iterator[str]:
+    event = SSE_EVENT_DATA
+    for line in lines:
+        if not line:
+            event = SSE_EVENT_DATA
+            continue
+        if line.startswith("event:"):
+            event = line[6:].strip()
+            if event == SSE_EVENT_END:
+                return
+            continue
+        if not line.startswith("data:"):
+            continue
 
-def stream_chat(question: str, timeout: int = DEFAULT_TIMEOUT) -> Iterator[str]:
-    url = f"{_base_url()}/chat/stream"
-    headers = {"Accept": "text/event-stream"}
+        data = line[5:].strip()
+        if event == SSE_EVENT_ERROR:
+            raise RuntimeError(f"The backend reported an error while streaming: {data}")
+        if event != SSE_EVENT_DATA:
+            continue
+        if data == "[DONE]":
+            return
+        chunk = _extract_chunk(data)
+        if chunk:
+            yield chunk
 
-    payload = {"input": {"question": question}}
-    with requests.post(url, json=payload, headers=headers, stream=True, timeout=(10, 600)) as resp:
-        if resp.status_code == 404:
-            raise RuntimeError("Streaming endpoint not available.")
-        if resp.status_code == 422:
-            payload = {"input": question}
-            resp = requests.post(url, json=payload, headers=headers, stream=True, timeout=timeout)
 
-        resp.raise_for_status()
+class ChatClient:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: int = DEFAULT_TIMEOUT,
+        connect_timeout: int = DEFAULT_CONNECT_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ) -> None:
+        self.base_url = (base_url or _base_url()).rstrip("/")
+        self.timeout: Tuple[int, int] = (connect_timeout, timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._shape: Optional[str] = None
+        self._lock = threading.Lock()
 
-        for raw in resp.iter_lines():
-            if not raw:
-                continue
-            line = raw.decode("utf-8")
-            if not line.startswith("data: "):
-                continue
+    @property
+    def input_shape(self) -> str:
+        if self._shape is None:
+            with self._lock:
+                if self._shape is None:
+                    self._shape = self._negotiate_shape()
+        return self._shape
 
-            data = line[6:].strip()
-            if data == "[DONE]":
-                break
+    def invoke(
+        self,
+        question: str,
+        timeout: Optional[int] = None,
+        session_id: Optional[str] = None,
+        collection: Optional[str] = None,
+    ) -> str:
+        resp = self._post(
+            f"{_chat_path(collection)}/invoke", question, timeout=timeout, session_id=session_id
+        )
+        try:
+            resp.raise_for_status()
+            return _extract_output(resp.json())
+        finally:
+            resp.close()
 
+    def stream(
+        self,
+        question: str,
+        timeout: Optional[int] = None,
+        session_id: Optional[str] = None,
+        collection: Optional[str] = None,
+    ) -> Iterator[str]:
+        resp = self._post(
+            f"{_chat_path(collection)}/stream",
+            question,
+            stream=True,
+            timeout=timeout,
+            session_id=session_id,
+        )
+        with resp:
+            if resp.status_code == 404:
+                raise RuntimeError("Streaming endpoint or collection not available.")
+            resp.raise_for_status()
+            resp.encoding = "utf-8"
+            yield from iter_sse_data(resp.iter_lines(chunk_size=None, decode_unicode=True))
+
+    def start_session(self, collection: Optional[str] = None) -> Optional[str]:
+        resp = self.session.post(
+            f"{self.base_url}{_sessions_path(collection)}", timeout=self.timeout
+        )
+        with resp:
+            if resp.status_code == 404:
+                return None
+            resp.raise_for_status()
+            return str(resp.json()["session_id"])
+
+    def end_session(self, session_id: str, collection: Optional[str] = None) -> None:
+        try:
+            resp = self.session.delete(
+                f"{self.base_url}{_sessions_path(collection)}/{session_id}", timeout=self.timeout
+            )
+            resp.close()
+        except requests.RequestException:
+            pass
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _payload(self, question: str, shape: str, session_id: Optional[str] = None) -> dict:
+        if shape == SHAPE_STRING:
+            return {"input": question}
+        if session_id:
+            return {"input": {"question": question, "session_id": session_id}}
+        return {"input": {"question": question}}
+
+    def _post(
+        self,
+        path: str,
+        question: str,
+        stream: bool = False,
+        timeout: Optional[int] = None,
+        session_id: Optional[str] = None,
+    ) -> requests.Response:
+        headers = {"Accept": "text/event-stream"} if stream else None
+        request_timeout = (self.timeout[0], timeout) if timeout else self.timeout
+        resp = self.session.post(
+            f"{self.base_url}{path}",
+            json=self._payload(question, self.input_shape, session_id),
+            headers=headers,
+            stream=stream,
+            timeout=request_timeout,
+        )
+        if session_id and resp.status_code == 404:
             try:
-                obj = json.loads(data)
-            except json.JSONDecodeError:
-                yield data
-                continue
-
-            if isinstance(obj, str):
-                yield obj
-                continue
-
-            if isinstance(obj, dict):
-                chunk = (
-                    obj.get("output")
-                    or obj.get("chunk")
-                    or obj.get("delta")
-                    or obj.get("text")
-                )
-                if isinstance(chunk, dict):
-                    chunk = chunk.get("content") or chunk.get("text") or ""
-                if chunk:
-                    yield str(chunk)
\ No newline at end of file
+                detail = resp.json().get("detail")
+            except ValueError:
+                detail = None
+            if detail == SESSION_EXPIRED_DETAIL:
+                resp.close()
+                raise SessionExpired(detail)
+        return resp
+
+    def _negotiate_shape(self) -> str:
+        try:
+            resp = self.session.get(f"{self.base_url}/chat/input_schema", timeout=self.timeout)
+            if resp.ok:
+                return _shape_from_schema(resp.json())
+        except (requests.RequestException, ValueError):
+            pass
+        return SHAPE_QUESTION
+
+
+_default_client: Optional[ChatClient] = None
+
+
+def _client() -> ChatClient:
+    global _default_client
+    if _default_client is None or _default_client.base_url != _base_url():
+        _default_client = ChatClient()
+    return _default_client
+
+
+def invoke_chat(
+    question: str,
+    timeout: int = DEFAULT_TIMEOUT,
+    session_id: Optional[str] = None,
+    collection: Optional[str] = None,
+) -> str:
+    return _client().invoke(
+        question, timeout=timeout, session_id=session_id, collection=collection
+    )
+
+
+def stream_chat(
+    question: str,
+    timeout: int = DEFAULT_TIMEOUT,
+    session_id: Optional[str] = None,
+    collection: Optional[str] = None,
+) -> Iterator[str]:
+    return _client().stream(
+        question, timeout=timeout, session_id=session_id, collection=collection
+    )
\ No newline at end of file
@@ -1,22 +1,52 @@
 from __future__ import annotations
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 import streamlit as st
 
 from pathlib import Path
+import os
 import sys
+import time
 
 ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(ROOT))
 
-from src.ui.api_client import invoke_chat, stream_chat
+from src.ui.api_client import ChatClient, SessionExpired
+
+ENV_RENDER_FPS = "UI_RENDER_FPS"
+DEFAULT_RENDER_FPS = 15.0
 
 st.set_page_config(page_title="Promtior RAG Chat", page_icon="🤖", layout="centered")
 st.title("Promtior RAG Chat")
 
 if "messages" not in st.session_state:
     st.session_state["messages"] = []
+if "session_ids" not in st.session_state:
+    st.session_state["session_ids"] = {}
+
+def get_client() -> ChatClient:
+    client = st.session_state.get("chat_client")
+    if client is None:
+        client = ChatClient()
+        st.session_state["chat_client"] = client
+    return client
+
+def session_for(client: ChatClient, collection: str) -> Optional[str]:
+    session_ids: Dict[str, Optional[str]] = st.session_state["session_ids"]
+    if collection not in session_ids:
+        session_ids[collection] = client.start_session(collection)
+    return session_ids[collection]
+
+def end_sessions(client: ChatClient) -> None:
+    for collection, session_id in st.session_state["session_ids"].items():
+        if session_id:
+            client.end_session(session_id, collection)
+    st.session_state["session_ids"] = {}
+
+def render_interval() -> float:
+    fps = float(os.getenv(ENV_RENDER_FPS, str(DEFAULT_RENDER_FPS)) or DEFAULT_RENDER_FPS)
+    return 1.0 / fps if fps > 0 else 0.0
 
 def split_sources(text: str) -> Tuple[str, List[str]]:
     marker ="\nSources:"
@@ -29,8 +59,10 @@ def split_sources(text: str) -> Tuple[str, List[str]]:
 
 st.sidebar.header("Controls")
 use_stream = st.sidebar.checkbox("Use streaming (if available)", value=False)
+collection = st.sidebar.text_input("Collection (blank for the default index)", value="").strip()
 if st.sidebar.button("Clear conversation"):
     st.session_state["messages"] = []
+    end_sessions(get_client())
 
 for msg in st.session_state["messages"]:
     with st.chat_message(msg["role"]):
@@ -47,17 +79,29 @@ if prompt:
         placeholder = st.empty()
         placeholder.markdown("Thinking...")
 
-        try:
+        def answer(client: ChatClient, session_id: Optional[str]) -> str:
             if use_stream:
                 chunks = []
-                for token in stream_chat(prompt):
+                interval = render_interval()
+                last_render = 0.0
+                for token in client.stream(prompt, session_id=session_id, collection=collection):
                     chunks.append(token)
-                    placeholder.markdown("".join(chunks))
+                    now = time.monotonic()
+                    if now - last_render >= interval:
+                        placeholder.markdown("".join(chunks) + "▌")
+                        last_render = now
                 answer_text = "".join(chunks).strip()
-                if not answer_text:
-                    answer_text = invoke_chat(prompt)
-            else:
-                answer_text = invoke_chat(prompt)
+                if answer_text:
+                    return answer_text
+            return client.invoke(prompt, session_id=session_id, collection=collection)
+
+        try:
+            client = get_client()
+            try:
+                answer_text = answer(client, session_for(client, collection))
+            except SessionExpired:
+                st.session_state["session_ids"].pop(collection, None)
+                answer_text = answer(client, session_for(client, collection))
 
             main_text, sources = split_sources(answer_text)
             placeholder.markdown(main_text)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+
+import pytest
+
+from src.app.ingest.crawler import CrawlConfig, crawl_site
+from src.app.ingest.fetch_cache import FetchCache
+from src.app.ingest.loader import iter_urls
+from src.app.ingest.parsing import ENV_INGEST_PARSE_WORKERS
+
+# The RAGLoader group replaces the "*" group for this crawler, so /b is only blocked for us.
+ROBOTS = (
+    "User-agent: RAGLoader\nDisallow: /b\nDisallow: /private/\n\n"
+    "User-agent: *\nDisallow: /private/\n"
+)
+
+
+def _page(title: str, *links: str) -> str:
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><head><title>{title}</title></head><body><p>{title} body.</p>{anchors}</body></html>"
+
+
+@pytest.fixture
+def site(monkeypatch) -> Iterator[str]:
+    monkeypatch.setenv(ENV_INGEST_PARSE_WORKERS, "1")
+    pages: Dict[str, str] = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path == "/robots.txt":
+                self._send(200, "text/plain", ROBOTS)
+            elif self.path in pages:
+                self._send(200, "text/html; charset=utf-8", pages[self.path])
+            else:
+                self._send(404, "text/plain", "not found")
+
+        def _send(self, status: int, content_type: str, body: str) -> None:
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port = server.server_address[1]
+    # "localhost" is a different site from the "127.0.0.1" seed, so it must not be followed.
+    pages.update(
+        {
+            "/": _page("Home", "/a", "/b", "/c", "/private/secret", f"http://localhost:{port}/elsewhere"),
+            "/a": _page("A", "/a/deep", "/#top"),
+            "/b": _page("B", "/"),
+            "/c": _page("C", "/"),
+            "/a/deep": _page("Deep", "/a/deeper"),
+            "/a/deeper": _page("Deeper"),
+            "/private/secret": _page("Secret"),
+            "/elsewhere": _page("Elsewhere"),
+        }
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _crawl(base: str, cache: Optional[FetchCache] = None, **overrides) -> Dict[str, int]:
+    config = CrawlConfig(
+        max_depth=overrides.pop("max_depth", 2),
+        per_host_rps=0,
+        max_retries=0,
+        timeout=5,
+        use_sitemap=False,
+        **overrides,
+    )
+    docs = list(crawl_site([base + "/"], config=config, cache=cache))
+    return {doc.metadata["source"][len(base):]: doc.metadata["depth"] for doc in docs}
+
+
+def test_crawl_respects_depth_domain_and_robots(site):
+    assert _crawl(site) == {"/": 0, "/a": 1, "/c": 1, "/a/deep": 2}
+
+
+def test_crawl_depth_zero_fetches_only_the_seed(site):
+    assert _crawl(site, max_depth=0) == {"/": 0}
+
+
+def test_crawl_follows_disallowed_paths_when_robots_is_off(site):
+    pages = _crawl(site, respect_robots=False)
+    assert "/private/secret" in pages and "/b" in pages
+
+
+def test_crawl_stops_at_max_pages(site):
+    assert len(_crawl(site, max_pages=2)) == 2
+
+
+def test_crawl_follows_links_of_pages_cached_by_a_plain_fetch(site, tmp_path):
+    cache = FetchCache(tmp_path / "fetch_cache.sqlite")
+    try:
+        assert len(list(iter_urls([site + "/"], cache=cache))) == 1
+        assert _crawl(site, cache=cache, max_depth=1) == {"/": 0, "/a": 1, "/c": 1}
+        assert cache.stats()["unchanged"] == 1
+    finally:
+        cache.close()
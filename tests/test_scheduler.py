@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, List
+
+import pytest
+
+from src.app.rag.scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    Scheduler,
+    SchedulerBusy,
+    SchedulerConfig,
+    SingleFlight,
+)
+
+
+def _scheduler(**overrides) -> Scheduler:
+    return Scheduler(SchedulerConfig(**{"max_concurrency": 1, "max_queue": 4, **overrides}))
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_interactive_questions_leave_the_queue_before_batch_ones():
+    async def scenario() -> List[str]:
+        scheduler = _scheduler()
+        order: List[str] = []
+        release = asyncio.Event()
+
+        async def ask(name: str, priority: str, hold: bool = False) -> None:
+            async with scheduler.slot(priority):
+                order.append(name)
+                if hold:
+                    await release.wait()
+
+        running = asyncio.create_task(ask("running", PRIORITY_INTERACTIVE, hold=True))
+        await _settle()
+        batch = asyncio.create_task(ask("batch", PRIORITY_BATCH))
+        await _settle()
+        interactive = asyncio.create_task(ask("interactive", PRIORITY_INTERACTIVE))
+        await _settle()
+        assert scheduler.stats()["queued"] == 2
+
+        release.set()
+        await asyncio.gather(running, batch, interactive)
+        assert scheduler.stats()["active"] == 0
+        return order
+
+    assert asyncio.run(scenario()) == ["running", "interactive", "batch"]
+
+
+def test_queue_timeout_raises_scheduler_busy_and_frees_the_queue():
+    async def scenario() -> Scheduler:
+        scheduler = _scheduler(queue_timeout=0.05, retry_after=7)
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await _settle()
+        with pytest.raises(SchedulerBusy) as busy:
+            async with scheduler.slot():
+                pass
+        assert busy.value.retry_after == 7
+        release.set()
+        await holder
+        return scheduler
+
+    stats = asyncio.run(scenario()).stats()
+    assert (stats["timed_out"], stats["queued"], stats["active"]) == (1, 0, 0)
+
+
+def test_batch_questions_may_fill_only_half_the_queue():
+    async def scenario() -> None:
+        scheduler = _scheduler(max_queue=2)
+        release = asyncio.Event()
+
+        async def ask(priority: str) -> None:
+            async with scheduler.slot(priority):
+                await release.wait()
+
+        tasks = [asyncio.create_task(ask(PRIORITY_INTERACTIVE))]
+        await _settle()
+        tasks.append(asyncio.create_task(ask(PRIORITY_BATCH)))
+        await _settle()
+        assert scheduler.saturated(PRIORITY_BATCH)
+        assert not scheduler.saturated(PRIORITY_INTERACTIVE)
+        with pytest.raises(SchedulerBusy):
+            async with scheduler.slot(PRIORITY_BATCH):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_shares_one_producer_between_subscribers():
+    async def scenario() -> None:
+        flights = SingleFlight()
+        calls = 0
+        gate = asyncio.Event()
+
+        async def produce() -> AsyncIterator[str]:
+            nonlocal calls
+            calls += 1
+            yield "a"
+            await gate.wait()
+            yield "b"
+
+        async def collect() -> List[str]:
+            return [piece async for piece in flights.run("q", produce)]
+
+        first = asyncio.create_task(collect())
+        await _settle()
+        second = asyncio.create_task(collect())
+        await _settle()
+        gate.set()
+        assert await asyncio.gather(first, second) == [["a", "b"], ["a", "b"]]
+        assert (calls, flights.shared, len(flights)) == (1, 1, 0)
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_cancels_the_producer_when_every_subscriber_leaves():
+    async def scenario() -> None:
+        flights = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def produce() -> AsyncIterator[str]:
+            try:
+                yield "a"
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        subscribers = [flights.run("q", produce) for _ in range(2)]
+        for subscriber in subscribers:
+            assert await subscriber.__anext__() == "a"
+        await subscribers[0].aclose()
+        await _settle()
+        assert not cancelled.is_set() and flights.in_flight("q")
+
+        await subscribers[1].aclose()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert len(flights) == 0
+
+    asyncio.run(scenario())